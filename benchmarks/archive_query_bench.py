@@ -0,0 +1,99 @@
+"""Query latency of the columnar message archive over a synthetic guild.
+
+Run from the repository root:
+
+    python benchmarks/archive_query_bench.py --rows 2000000
+
+Rows are written into a temporary archive directory with the same code path the bot uses,
+then the user-history, reply-pair and interaction queries are timed against it. Install
+numpy to measure the vectorized scans; without it the memoryview fallback is used.
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import bot  # noqa: E402
+
+GUILD_ID = 1
+TARGET_USER = 1001
+BATCH_ROWS = 50000
+
+
+def build_rows(count: int, users: int, start_ms: int) -> list[tuple[int, int, int, int, int, int, int, str]]:
+    rng = random.Random(7)
+    rows = []
+    last_author: dict[int, int] = {}
+    for index in range(count):
+        author = TARGET_USER + rng.randrange(users)
+        channel = rng.randrange(12)
+        reply_to = 0
+        reply_author = 0
+        if last_author and rng.random() < 0.3:
+            reply_to, reply_author = rng.choice(list(last_author.items()))
+        mention = TARGET_USER + rng.randrange(users) if rng.random() < 0.1 else 0
+        message_id = (10**17) + index
+        rows.append(
+            (
+                message_id,
+                author,
+                channel,
+                start_ms + index * 1000,
+                reply_to,
+                reply_author,
+                mention,
+                f"message {index} from {author}",
+            )
+        )
+        last_author[message_id] = author
+        if len(last_author) > 64:
+            last_author.pop(next(iter(last_author)))
+    return rows
+
+
+def timed(label: str, func, *args) -> object:
+    started = time.perf_counter()
+    result = func(*args)
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"{label:<28} {elapsed:10.1f} ms")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--users", type=int, default=400)
+    args = parser.parse_args()
+    count = max(1, args.rows)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        bot.ARCHIVE_DIR = Path(scratch)
+        start_ms = int(time.time() * 1000) - count * 1000
+        rows = build_rows(count, max(2, args.users), start_ms)
+        started = time.perf_counter()
+        for offset in range(0, count, BATCH_ROWS):
+            bot.append_archive_rows(GUILD_ID, rows[offset : offset + BATCH_ROWS])
+        write_seconds = time.perf_counter() - started
+        del rows
+
+        since_90d = int(time.time() * 1000) - 90 * 86400 * 1000
+        print(f"rows: {count}  backend: {'numpy' if bot.np is not None else 'memoryview'}")
+        print(f"{'append':<28} {write_seconds / count * 1e6:10.2f} us/row")
+        messages = timed("user messages (last 90d)", bot.query_archive_user_messages, GUILD_ID, TARGET_USER, since_90d, 8000)
+        replies = timed("replies to user", bot.query_archive_replies_to, GUILD_ID, TARGET_USER, 0, 8000)
+        targets = timed("user interaction targets", bot.query_archive_user_targets, GUILD_ID, TARGET_USER, 0)
+        pairs = timed("reply pairs (all users)", bot.query_archive_reply_pairs, GUILD_ID, 0)
+        timed("archive stats", bot.archive_guild_stats, GUILD_ID)
+        print(
+            f"results: {len(messages)} messages, {len(replies)} replies, "
+            f"{len(targets)} targets, {len(pairs)} distinct pairs"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Concurrent voice-stream capacity of one host, without a Discord connection.
+
+Run from the repository root:
+
+    python benchmarks/audio_capacity_bench.py --streams 20 --seconds 15
+    python benchmarks/audio_capacity_bench.py --streams 20 --codec both --opus-lib /usr/lib/libopus.so.0
+
+Each stream is discord.py's real AudioPlayer thread reading the same FFmpegPCMAudio /
+FFmpegOpusAudio source the bot builds (bot.music_audio_source), with a fake voice client in
+place of the UDP socket. PCM frames are Opus-encoded exactly as VoiceClient would when libopus
+is available. Reports frame-timing jitter, ffmpeg and player-thread CPU per stream, and the
+asyncio event-loop lag while all streams run. Without --file a looping test tone is generated.
+
+--codec defaults to pcm, the FFmpegPCMAudio transcode every non-Opus source goes through;
+opus measures the passthrough path and both runs the two back to back on the same file.
+"""
+
+import argparse
+import asyncio
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import discord  # noqa: E402
+from discord.player import AudioPlayer  # noqa: E402
+
+import bot  # noqa: E402
+
+TICK_SECONDS = 0.005
+FRAME_SECONDS = AudioPlayer.DELAY
+
+
+class FakeVoiceWebSocket:
+    async def speak(self, state) -> None:
+        return None
+
+
+class FakeVoiceClient:
+    # Just enough of discord.VoiceClient for AudioPlayer to drive it.
+    timeout = 5.0
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, encoder):
+        self.ws = FakeVoiceWebSocket()
+        self.client = self
+        self.loop = loop
+        self.encoder = encoder
+        self.sent_at: list[float] = []
+
+    def is_connected(self) -> bool:
+        return True
+
+    def wait_until_connected(self, timeout: float) -> bool:
+        return True
+
+    def send_audio_packet(self, data: bytes, *, encode: bool = True) -> None:
+        if encode and self.encoder is not None:
+            data = self.encoder.encode(data, self.encoder.SAMPLES_PER_FRAME)
+        self.sent_at.append(time.perf_counter())
+
+
+def make_test_file(directory: str) -> str:
+    path = str(Path(directory) / "tone.webm")
+    subprocess.run(
+        [
+            bot.FFMPEG_EXECUTABLE,
+            "-loglevel", "error", "-y",
+            "-f", "lavfi", "-i", "sine=frequency=440:duration=30",
+            "-f", "lavfi", "-i", "sine=frequency=660:duration=30",
+            "-filter_complex", "[0][1]amerge=inputs=2",
+            "-ac", "2", "-c:a", "libopus", "-b:a", "128k",
+            path,
+        ],
+        check=True,
+    )
+    return path
+
+
+def load_encoder(library: str | None):
+    if library:
+        discord.opus.load_opus(library)
+    elif not discord.opus.is_loaded():
+        discord.opus._load_default()
+    return discord.opus.Encoder() if discord.opus.is_loaded() else None
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values) or [0.0]
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def run_streams(codec_name: str, path: str, args: argparse.Namespace) -> None:
+    loop = asyncio.get_running_loop()
+    codec = "opus" if codec_name == "opus" else ""
+    clients = []
+    players = []
+    for _ in range(max(1, args.streams)):
+        client = FakeVoiceClient(loop, None if codec else load_encoder(args.opus_lib))
+        source = bot.music_audio_source(bot.ResolvedStream(path, "bench", path, 0.0, codec))
+        player = AudioPlayer(source, client)
+        clients.append(client)
+        players.append((player, source))
+        player.start()
+
+    lags: list[float] = []
+    deadline = time.perf_counter() + args.seconds
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        await asyncio.sleep(TICK_SECONDS)
+        lags.append((time.perf_counter() - started - TICK_SECONDS) * 1000)
+
+    ffmpeg_cpu = []
+    player_cpu = []
+    rss = []
+    for player, source in players:
+        usage = bot.proc_stat_usage(f"/proc/{source._process.pid}/stat")
+        if usage is not None:
+            ffmpeg_cpu.append(usage[0] / usage[1] * 100)
+            rss.append(usage[2] / 1048576)
+        usage = bot.proc_stat_usage(f"/proc/self/task/{player.native_id}/stat")
+        if usage is not None:
+            player_cpu.append(usage[0] / usage[1] * 100)
+    # Snapshot before stopping: AudioPlayer sends a burst of silence frames on stop.
+    sent = [list(client.sent_at) for client in clients]
+    for player, _ in players:
+        player.stop()
+    for player, _ in players:
+        player.join(timeout=5)
+
+    jitter = []
+    frames = 0
+    for times in sent:
+        frames += len(times)
+        # The first gap is AudioPlayer's start-up delay, not jitter.
+        jitter.extend(abs(later - earlier - FRAME_SECONDS) * 1000 for earlier, later in zip(times[1:], times[2:]))
+    encoder_state = "passthrough" if codec else ("libopus" if clients[0].encoder else "skipped (libopus not found)")
+    expected = int(args.seconds / FRAME_SECONDS) * len(clients)
+    print(f"streams: {len(clients)}  seconds: {args.seconds:g}  codec: {codec_name}  encode: {encoder_state}")
+    print(f"frames sent        {frames} / ~{expected} expected")
+    print(
+        f"frame jitter       p50 {statistics.median(jitter or [0]):6.2f} ms  "
+        f"p99 {percentile(jitter, 0.99):6.2f} ms  max {max(jitter or [0]):6.2f} ms"
+    )
+    if ffmpeg_cpu:
+        print(
+            f"ffmpeg per stream  {statistics.mean(ffmpeg_cpu):6.2f}% CPU  "
+            f"{statistics.mean(rss):6.1f} MB RSS  (total {sum(ffmpeg_cpu):.1f}% CPU)"
+        )
+    if player_cpu:
+        print(f"player per stream  {statistics.mean(player_cpu):6.2f}% CPU  (total {sum(player_cpu):.1f}% CPU)")
+    print(
+        f"event-loop lag     p50 {statistics.median(lags or [0]):6.2f} ms  "
+        f"p99 {percentile(lags, 0.99):6.2f} ms  max {max(lags or [0]):6.2f} ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--streams", type=int, default=10)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument(
+        "--codec",
+        choices=("pcm", "opus", "both"),
+        default="pcm",
+        help="pcm = FFmpegPCMAudio transcode, opus = passthrough",
+    )
+    parser.add_argument("--file", help="local audio file to play on every stream")
+    parser.add_argument("--opus-lib", help="path to libopus if discord.py cannot find it")
+    args = parser.parse_args()
+
+    bot.FFMPEG_EXECUTABLE = bot.resolve_ffmpeg_executable()
+    if not bot.FFMPEG_EXECUTABLE:
+        raise SystemExit("ffmpeg not found (install it or imageio-ffmpeg).")
+    # Local files loop instead of using the HTTP reconnect flags.
+    bot.FFMPEG_OPTIONS = {"before_options": "-stream_loop -1", "options": "-vn -loglevel warning"}
+
+    with tempfile.TemporaryDirectory() as scratch:
+        path = args.file or make_test_file(scratch)
+        codecs = ("pcm", "opus") if args.codec == "both" else (args.codec,)
+        for index, codec_name in enumerate(codecs):
+            if index:
+                print()
+            await run_streams(codec_name, path, args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,170 @@
+"""Per-message CPU and memory of MessageRecord versus per-collector discord.Message handling.
+
+Run from the repository root:
+
+    python benchmarks/message_record_bench.py --messages 7000
+
+"Legacy" replays what the channel collectors did before the shared window: every collector
+walked its own freshly fetched discord.Message objects and read `clean_content` on each one.
+"Record" builds one MessageRecord per message and lets all collectors share it.
+"""
+
+import argparse
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import discord  # noqa: E402
+
+import bot  # noqa: E402
+
+COLLECTORS = 4
+TARGET_USER = 1001
+WORDS = "yo bro that build is wild lol did you see the patch notes tonight ngl".split()
+
+
+class _StubState:
+    def store_user(self, data, *, cache=True):
+        return discord.User(state=self, data=data)
+
+    def create_user(self, data):
+        return discord.User(state=self, data=data)
+
+    def _get_guild(self, guild_id):
+        return None
+
+    def get_reaction_emoji(self, data):
+        return None
+
+
+class _StubChannel:
+    id = 4242
+    guild = None
+
+
+def _user_payload(user_id: int) -> dict:
+    return {
+        "id": str(user_id),
+        "username": f"user{user_id}",
+        "discriminator": "0",
+        "avatar": None,
+        "global_name": f"User {user_id}",
+        "bot": user_id >= 9000,
+    }
+
+
+def build_payloads(count: int) -> list[dict]:
+    rng = random.Random(7)
+    payloads = []
+    for index in range(count):
+        author = rng.choice([TARGET_USER, 1002, 1003, 1004, 9001])
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 24)))
+        mentions = []
+        if rng.random() < 0.25:
+            mentioned = rng.choice([TARGET_USER, 1002, 1003])
+            text = f"<@{mentioned:018d}> {text}"
+            mentions.append(_user_payload(mentioned))
+            mentions[0]["id"] = f"{mentioned:018d}"
+        payloads.append(
+            {
+                "id": str((10**17) + index),
+                "type": 0,
+                "content": text,
+                "author": _user_payload(author),
+                "mentions": mentions,
+                "mention_roles": [],
+                "attachments": [],
+                "embeds": [],
+                "timestamp": "2024-01-01T00:00:00+00:00",
+                "edited_timestamp": None,
+                "pinned": False,
+                "mention_everyone": False,
+                "tts": False,
+            }
+        )
+    return payloads
+
+
+def build_messages(payloads: list[dict]) -> list[discord.Message]:
+    state = _StubState()
+    channel = _StubChannel()
+    return [discord.Message(state=state, channel=channel, data=payload) for payload in payloads]
+
+
+def run_legacy(batches: list[list[discord.Message]]) -> int:
+    kept = 0
+    for messages in batches:
+        for msg in messages:
+            if msg.author.bot:
+                continue
+            content = msg.clean_content.strip()
+            if content and msg.author.id == TARGET_USER:
+                kept += 1
+    return kept
+
+
+def run_records(messages: list[discord.Message]) -> int:
+    records = [bot.MessageRecord.from_message(msg) for msg in messages]
+    kept = 0
+    for _ in range(COLLECTORS):
+        for record in records:
+            if record.is_bot or record.author_id != TARGET_USER:
+                continue
+            if record.content:
+                kept += 1
+    return kept
+
+
+def retained_bytes(factory) -> tuple[int, object]:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    value = factory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return total, value
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=7000)
+    args = parser.parse_args()
+    count = max(1, args.messages)
+    payloads = build_payloads(count)
+
+    # Legacy collectors each received their own fresh Message objects from channel.history().
+    batches = [build_messages(payloads) for _ in range(COLLECTORS)]
+    started = time.perf_counter()
+    legacy_kept = run_legacy(batches)
+    legacy_seconds = time.perf_counter() - started
+
+    messages = build_messages(payloads)
+    started = time.perf_counter()
+    record_kept = run_records(messages)
+    record_seconds = time.perf_counter() - started
+
+    message_bytes, held_messages = retained_bytes(lambda: build_messages(payloads))
+    for msg in held_messages:
+        msg.clean_content  # noqa: B018 - legacy windows kept the cleaned text around too.
+    record_bytes, _ = retained_bytes(lambda: [bot.MessageRecord.from_message(m) for m in held_messages])
+
+    print(f"messages: {count}  collectors: {COLLECTORS}  kept: {legacy_kept}/{record_kept}")
+    print(
+        f"cpu   legacy {legacy_seconds / count * 1e6:8.2f} us/msg   "
+        f"record {record_seconds / count * 1e6:8.2f} us/msg   "
+        f"speedup {legacy_seconds / max(record_seconds, 1e-9):.1f}x"
+    )
+    print(
+        f"memory discord.Message {message_bytes / count:8.0f} B/msg   "
+        f"MessageRecord {record_bytes / count:8.0f} B/msg"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Per-session memory and per-turn update cost of psych session state: dicts vs slotted objects.
+
+Run from the repository root:
+
+    python benchmarks/session_state_bench.py --sessions 20000 --turns 200000
+
+The "dict" rows replay the session layout and turn update the bot used before PsychSession
+(string-keyed dicts, isinstance checks, int() coercions and list re-slicing); the "slotted"
+rows use bot.PsychSession with bot._apply_psych_turn_update. Sessions are measured at steady
+state, with a full history and a half-full listen buffer.
+
+The slotted update also keeps the token budget (a token estimate per message and a trim
+against AI_MEMORY_TOKEN_BUDGET) that the dict layout never had, so its per-turn cost lands
+near the dict rows rather than well below them; the saving is mainly memory per session.
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import bot  # noqa: E402
+
+NOTES = "Stressed about exams. Sleeps late. Prefers short practical tips."
+USER_TURN = "I could not sleep again and tomorrow is the test"
+REPLY = "That sounds exhausting.\nTry a 10 minute wind-down.\nWhat usually keeps you up?"
+
+
+def legacy_session(now: float) -> dict[str, object]:
+    return {
+        "created_at": now,
+        "last_activity": now,
+        "turns": 0,
+        "history": [],
+        "notes": "",
+        "phase": "assessment",
+        "buffer": [],
+        "buffer_started_at": None,
+        "question_count": 0,
+        "last_solution_at": None,
+        "listening": True,
+    }
+
+
+def legacy_turn_update(session: dict[str, object], user_input: str, assistant_reply: str, notes: str) -> None:
+    history = session.get("history")
+    if not isinstance(history, list):
+        history = []
+        session["history"] = history
+    history_context = history[-(bot.AI_MAX_HISTORY * 2) :]
+    session["history"] = [
+        *history_context,
+        {"role": "user", "content": user_input},
+        {"role": "assistant", "content": assistant_reply},
+    ]
+    session["notes"] = notes
+    session["turns"] = int(session.get("turns", 0)) + 1
+    session["question_count"] = int(session.get("question_count", 0)) + 1
+    session["phase"] = "assessment"
+    session["last_activity"] = time.monotonic()
+
+
+def slotted_turn_update(session: bot.PsychSession, user_input: str, assistant_reply: str, notes: str) -> None:
+    bot._apply_psych_turn_update(
+        session,
+        user_input=user_input,
+        assistant_reply=assistant_reply,
+        updated_notes=notes,
+        asked_question=True,
+    )
+
+
+def fill(session, update, buffer_lines: int) -> None:
+    for turn in range(bot.AI_MAX_HISTORY * 2):
+        update(session, f"{USER_TURN} {turn}", REPLY, NOTES)
+    buffer = session["buffer"] if isinstance(session, dict) else session.buffer
+    buffer.extend(f"buffered line {index}" for index in range(buffer_lines))
+
+
+def measure_memory(make, update, count: int) -> float:
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    sessions = []
+    for _ in range(count):
+        session = make()
+        fill(session, update, bot.PSYCH_MAX_BUFFERED_MESSAGES // 2)
+        sessions.append(session)
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    # Strings shared between sessions are only counted once, so this is the per-session overhead.
+    return used / count
+
+
+def measure_turns(session, update, turns: int) -> float:
+    started = time.perf_counter()
+    for _ in range(turns):
+        update(session, USER_TURN, REPLY, NOTES)
+    return (time.perf_counter() - started) / turns * 1e9
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20000)
+    parser.add_argument("--turns", type=int, default=200000)
+    args = parser.parse_args()
+
+    now = time.monotonic()
+    variants = (
+        ("dict", lambda: legacy_session(now), legacy_turn_update),
+        ("slotted", lambda: bot.PsychSession(created_at=now, last_activity=now), slotted_turn_update),
+    )
+    print(f"sessions: {args.sessions}  turns: {args.turns}  history: {bot.AI_MAX_HISTORY * 2} messages")
+    for name, make, update in variants:
+        per_session = measure_memory(make, update, max(1, args.sessions))
+        per_turn = measure_turns(make(), update, max(1, args.turns))
+        print(f"{name:<8} {per_session:8.0f} B/session  {per_turn:8.0f} ns/turn update")
+
+
+if __name__ == "__main__":
+    main()
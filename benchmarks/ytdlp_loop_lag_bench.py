@@ -0,0 +1,97 @@
+"""Event-loop lag while yt-dlp extractions run on the thread vs process backend.
+
+Run from the repository root:
+
+    python benchmarks/ytdlp_loop_lag_bench.py --jobs 12
+    python benchmarks/ytdlp_loop_lag_bench.py --query "ytsearch1:lofi hip hop" --jobs 6
+
+A ticker coroutine sleeps for a fixed interval and records how late it wakes up while the
+extractions are in flight. Without --query each extraction is a synthetic pure-Python CPU
+burn (yt-dlp's parsing holds the GIL the same way), so no network access is needed.
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import bot  # noqa: E402
+
+TICK_SECONDS = 0.005
+
+
+class BurnExtractor:
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    def extract_info(self, query: str, download: bool = False) -> dict:
+        deadline = time.perf_counter() + self.seconds
+        total = 0
+        while time.perf_counter() < deadline:
+            for value in range(2000):
+                total += value * value
+        return {"id": query, "title": f"burn {total % 97}", "url": "https://example.invalid/audio"}
+
+
+async def measure(backend: str, jobs: int, query: str | None) -> tuple[list[float], float]:
+    bot.MUSIC_EXTRACT_BACKEND = backend
+    if backend == "process":
+        await bot.warm_ytdl_process_pool()
+    lags: list[float] = []
+    done = asyncio.Event()
+
+    async def ticker() -> None:
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(TICK_SECONDS)
+            lags.append((time.perf_counter() - started - TICK_SECONDS) * 1000)
+
+    tick_task = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(bot.run_ytdlp("search", bot.YTDL_BASE_OPTIONS, query or f"job-{index}") for index in range(jobs))
+    )
+    elapsed = time.perf_counter() - started
+    done.set()
+    await tick_task
+    return lags, elapsed
+
+
+def report(backend: str, lags: list[float], elapsed: float) -> None:
+    ordered = sorted(lags) or [0.0]
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(
+        f"{backend:<8} wall {elapsed:6.2f}s  ticks {len(lags):5d}  "
+        f"lag p50 {statistics.median(ordered):7.2f} ms  p99 {p99:7.2f} ms  max {ordered[-1]:7.2f} ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=bot.MUSIC_EXTRACT_WORKERS)
+    parser.add_argument("--burn", type=float, default=0.25, help="seconds of CPU per synthetic extraction")
+    parser.add_argument("--query", help="run real yt-dlp extractions for this query instead")
+    args = parser.parse_args()
+
+    bot.MUSIC_EXTRACT_WORKERS = max(1, args.workers)
+    if not args.query:
+        extractor = BurnExtractor(args.burn)
+        bot._thread_ytdl = lambda name, options: extractor
+        # fork so the patched module reaches the worker processes.
+        bot.YTDL_PROCESS_START_METHOD = "fork"
+
+    print(f"jobs: {args.jobs}  workers: {bot.MUSIC_EXTRACT_WORKERS}  mode: {'real' if args.query else 'synthetic'}")
+    for backend in ("thread", "process"):
+        lags, elapsed = await measure(backend, max(1, args.jobs), args.query)
+        report(backend, lags, elapsed)
+    if bot.YTDL_PROCESS_POOL is not None:
+        bot.YTDL_PROCESS_POOL.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,16 +1,26 @@
 import json
+import mmap
 import os
 import re
 import asyncio
+import heapq
+import struct
+import sys
+import threading
 import time
 import shutil
 import random
 import unicodedata
 from typing import Literal
-from dataclasses import dataclass
-from collections import Counter, defaultdict, deque
+from dataclasses import dataclass, field
+from array import array
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections import Counter, OrderedDict, defaultdict, deque
 from datetime import timedelta
 from pathlib import Path
+from urllib.parse import parse_qs, urlparse
 
 import aiohttp
 import discord
@@ -34,6 +44,11 @@ try:
 except Exception:
     imageio_ffmpeg = None
 
+try:
+    import numpy as np
+except Exception:
+    np = None
+
 
 load_dotenv()
 
@@ -90,6 +105,9 @@ GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant").strip()
 GROQ_API_URL = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions").strip()
 GROQ_MODELS_URL = os.getenv("GROQ_MODELS_URL", "https://api.groq.com/openai/v1/models").strip()
 AI_MAX_HISTORY = env_int("AI_MAX_HISTORY", 4, 2)
+AI_MEMORY_TOKEN_BUDGET = env_int("AI_MEMORY_TOKEN_BUDGET", 1200, 200)
+AI_MEMORY_SUMMARY_ENABLED = env_bool("AI_MEMORY_SUMMARY_ENABLED", True)
+AI_MEMORY_SUMMARY_TOKENS = env_int("AI_MEMORY_SUMMARY_TOKENS", 160, 40)
 AI_MAX_TOKENS = env_int("AI_MAX_TOKENS", 260, 80)
 AI_SUMMARY_MAX_TOKENS = env_int("AI_SUMMARY_MAX_TOKENS", 320, 120)
 AI_TIMEOUT_SECONDS = env_int("AI_TIMEOUT_SECONDS", 45, 10)
@@ -106,15 +124,43 @@ PSYCH_MAX_BUFFERED_MESSAGES = env_int("PSYCH_MAX_BUFFERED_MESSAGES", 25, 3)
 ARGUMENT_MODE_MAX_TURNS = env_int("ARGUMENT_MODE_MAX_TURNS", 14, 2)
 ARGUMENT_MODE_TIMEOUT_MINUTES = env_int("ARGUMENT_MODE_TIMEOUT_MINUTES", 45, 5)
 ARGUMENT_MODE_REPLY_TOKENS = env_int("ARGUMENT_MODE_REPLY_TOKENS", 180, 80)
+ARGUMENT_MODE_CONTEXT_LINES = 8
+CONVERSATION_MEMORY_TTL_MINUTES = env_int("CONVERSATION_MEMORY_TTL_MINUTES", 180, 5)
+SESSION_STORE_MAX_SESSIONS = env_int("SESSION_STORE_MAX_SESSIONS", 5000, 50)
+SESSION_SWEEP_SECONDS = env_int("SESSION_SWEEP_SECONDS", 30, 1)
+PSYCH_SESSION_PERSIST_ENABLED = env_bool("PSYCH_SESSION_PERSIST_ENABLED", True)
+PSYCH_SESSION_SAVE_SECONDS = env_float("PSYCH_SESSION_SAVE_SECONDS", 2.0, 0.5)
+REMINDER_MAX_PER_USER = env_int("REMINDER_MAX_PER_USER", 25, 1)
+REMINDER_SEND_BATCH = env_int("REMINDER_SEND_BATCH", 5, 1)
+REMINDER_SEND_INTERVAL_SECONDS = env_float("REMINDER_SEND_INTERVAL_SECONDS", 1.0, 0.2)
 SYNC_SLASH_COMMANDS = env_bool("SYNC_SLASH_COMMANDS", True)
 VIBE_DEFAULT_MESSAGE_COUNT = env_int("VIBE_DEFAULT_MESSAGE_COUNT", 200, 20)
 VIBE_MAX_MESSAGE_COUNT = env_int("VIBE_MAX_MESSAGE_COUNT", 800, 50)
 VIBE_MIN_REQUIRED_MESSAGES = env_int("VIBE_MIN_REQUIRED_MESSAGES", 25, 5)
 VIBE_MAX_PROMPT_MESSAGES = env_int("VIBE_MAX_PROMPT_MESSAGES", 80, 20)
 VIBE_MAX_PROMPT_CHARS = env_int("VIBE_MAX_PROMPT_CHARS", 12000, 2000)
+MESSAGE_CACHE_MAX_PER_CHANNEL = env_int("MESSAGE_CACHE_MAX_PER_CHANNEL", 7000, 200)
+MESSAGE_CACHE_MAX_CHANNELS = env_int("MESSAGE_CACHE_MAX_CHANNELS", 64, 1)
+STYLE_PROFILE_ENABLED = env_bool("STYLE_PROFILE_ENABLED", False)
+STYLE_PROFILE_BUCKET_MESSAGES = env_int("STYLE_PROFILE_BUCKET_MESSAGES", 50, 10)
+STYLE_PROFILE_MAX_BUCKETS = env_int("STYLE_PROFILE_MAX_BUCKETS", 8, 1)
+STYLE_PROFILE_SAMPLE_SIZE = env_int("STYLE_PROFILE_SAMPLE_SIZE", 40, 10)
+STYLE_PROFILE_MIN_MESSAGES = env_int("STYLE_PROFILE_MIN_MESSAGES", 40, 10)
+STYLE_PROFILE_MAX_USERS = env_int("STYLE_PROFILE_MAX_USERS", 5000, 100)
+STYLE_PROFILE_SAVE_SECONDS = env_int("STYLE_PROFILE_SAVE_SECONDS", 120, 15)
+MESSAGE_ARCHIVE_ENABLED = env_bool("MESSAGE_ARCHIVE_ENABLED", False)
+MESSAGE_ARCHIVE_TEXT_CHARS = env_int("MESSAGE_ARCHIVE_TEXT_CHARS", 280, 0)
+MESSAGE_ARCHIVE_SEGMENT_ROWS = env_int("MESSAGE_ARCHIVE_SEGMENT_ROWS", 262144, 1024)
+MESSAGE_ARCHIVE_FLUSH_SECONDS = env_int("MESSAGE_ARCHIVE_FLUSH_SECONDS", 30, 5)
+MESSAGE_ARCHIVE_RETENTION_DAYS = env_int("MESSAGE_ARCHIVE_RETENTION_DAYS", 365, 1)
+MESSAGE_ARCHIVE_MIN_USER_MESSAGES = env_int("MESSAGE_ARCHIVE_MIN_USER_MESSAGES", 200, 10)
 VOICE_CONNECT_RETRIES = env_int("VOICE_CONNECT_RETRIES", 4, 1)
 VOICE_CONNECT_TIMEOUT = env_int("VOICE_CONNECT_TIMEOUT", 25, 10)
 VOICE_INTERNAL_RECONNECT = env_bool("VOICE_INTERNAL_RECONNECT", False)
+VOICE_BACKOFF_BASE_SECONDS = env_float("VOICE_BACKOFF_BASE_SECONDS", 1.0, 0.1)
+VOICE_BACKOFF_MAX_SECONDS = env_float("VOICE_BACKOFF_MAX_SECONDS", 120.0, 1.0)
+VOICE_KEEPALIVE_SECONDS = env_int("VOICE_KEEPALIVE_SECONDS", 15, 5)
+VOICE_WARMUP_SAVED_QUEUES = env_bool("VOICE_WARMUP_SAVED_QUEUES", False)
 _AI_PROVIDER_RAW = os.getenv("AI_PROVIDER", "").strip().lower()
 if _AI_PROVIDER_RAW in {"openrouter", "groq"}:
     AI_PROVIDER = _AI_PROVIDER_RAW
@@ -141,6 +187,29 @@ GROQ_FALLBACK_MODELS = [
 
 FFMPEG_PATH = os.getenv("FFMPEG_PATH", "ffmpeg").strip() or "ffmpeg"
 MUSIC_MAX_PLAYLIST_ITEMS = env_int("MUSIC_MAX_PLAYLIST_ITEMS", 50, 1)
+MUSIC_PREFETCH_ENABLED = env_bool("MUSIC_PREFETCH_ENABLED", True)
+MUSIC_OPUS_PASSTHROUGH = env_bool("MUSIC_OPUS_PASSTHROUGH", True)
+MUSIC_SPOTIFY_SEARCH_CONCURRENCY = env_int("MUSIC_SPOTIFY_SEARCH_CONCURRENCY", 4, 1)
+MUSIC_LAZY_LOOKAHEAD = env_int("MUSIC_LAZY_LOOKAHEAD", 3, 0)
+MUSIC_SPOTIFY_EAGER_TRACKS = env_int("MUSIC_SPOTIFY_EAGER_TRACKS", 10, 0)
+MUSIC_EXTRACT_WORKERS = env_int("MUSIC_EXTRACT_WORKERS", 3, 1)
+MUSIC_EXTRACT_BACKEND = os.getenv("MUSIC_EXTRACT_BACKEND", "thread").strip().lower()
+if MUSIC_EXTRACT_BACKEND not in {"thread", "process"}:
+    MUSIC_EXTRACT_BACKEND = "thread"
+MUSIC_FORMAT_STRATEGY_WINDOW = env_int("MUSIC_FORMAT_STRATEGY_WINDOW", 20, 3)
+MUSIC_FORMAT_REPROBE_SECONDS = env_int("MUSIC_FORMAT_REPROBE_SECONDS", 900, 30)
+MUSIC_STREAM_DEFAULT_TTL_SECONDS = env_int("MUSIC_STREAM_DEFAULT_TTL_SECONDS", 1800, 60)
+MUSIC_STREAM_EXPIRY_MARGIN_SECONDS = env_int("MUSIC_STREAM_EXPIRY_MARGIN_SECONDS", 120, 0)
+MUSIC_METADATA_CACHE_TTL_SECONDS = env_int("MUSIC_METADATA_CACHE_TTL_SECONDS", 604800, 300)
+MUSIC_METADATA_CACHE_MAX_ENTRIES = env_int("MUSIC_METADATA_CACHE_MAX_ENTRIES", 2000, 50)
+MUSIC_STREAM_CACHE_MAX_ENTRIES = env_int("MUSIC_STREAM_CACHE_MAX_ENTRIES", 256, 10)
+MUSIC_QUEUE_PERSIST_ENABLED = env_bool("MUSIC_QUEUE_PERSIST_ENABLED", True)
+MUSIC_QUEUE_SAVE_SECONDS = env_int("MUSIC_QUEUE_SAVE_SECONDS", 10, 2)
+MUSIC_QUEUE_PAGE_SIZE = 10
+MUSIC_AUDIO_CACHE_ENABLED = env_bool("MUSIC_AUDIO_CACHE_ENABLED", False)
+MUSIC_AUDIO_CACHE_MAX_MB = env_int("MUSIC_AUDIO_CACHE_MAX_MB", 2048, 16)
+MUSIC_AUDIO_CACHE_MIN_PLAYS = env_int("MUSIC_AUDIO_CACHE_MIN_PLAYS", 2, 1)
+MUSIC_AUDIO_CACHE_DOWNLOADS = env_int("MUSIC_AUDIO_CACHE_DOWNLOADS", 2, 1)
 SPOTIFY_CLIENT_ID = os.getenv("SPOTIFY_CLIENT_ID", "").strip()
 SPOTIFY_CLIENT_SECRET = os.getenv("SPOTIFY_CLIENT_SECRET", "").strip()
 CAT_API_URL = os.getenv("CAT_API_URL", "https://api.thecatapi.com/v1/images/search").strip()
@@ -204,22 +273,413 @@ DATA_DIR = Path("data")
 WARNINGS_FILE = DATA_DIR / "warnings.json"
 MOD_CONFIG_FILE = DATA_DIR / "mod_config.json"
 BAD_WORDS_FILE = DATA_DIR / "bad_words.txt"
+STYLE_PROFILES_FILE = DATA_DIR / "style_profiles.json"
+ARCHIVE_DIR = DATA_DIR / "archive"
+MUSIC_METADATA_CACHE_FILE = DATA_DIR / "music_metadata_cache.json"
+AUDIO_CACHE_DIR = DATA_DIR / "audio_cache"
+MUSIC_QUEUES_FILE = DATA_DIR / "music_queues.json"
+REMINDERS_FILE = DATA_DIR / "reminders.json"
+PSYCH_SESSIONS_DIR = DATA_DIR / "psych_sessions"
+PSYCH_PENDING_INDEX_FILE = PSYCH_SESSIONS_DIR / "_pending.json"
 
 LINK_PATTERN = re.compile(r"(https?://|www\.|discord\.gg/)", re.IGNORECASE)
 WORD_PATTERN = re.compile(r"\b[\w']+\b")
 EMOJI_PATTERN = re.compile(r"[\U0001F300-\U0001FAFF\u2600-\u27BF]")
 POLL_EMOJIS = ["1️⃣", "2️⃣", "3️⃣", "4️⃣", "5️⃣", "6️⃣", "7️⃣", "8️⃣", "9️⃣", "🔟"]
 
+@dataclass
+class TimingWheel:
+    # Hashed timing wheel: scheduling and cancelling a key are O(1); each tick only looks at
+    # one slot. Deadlines further out than one revolution simply stay put until their round.
+    tick_seconds: float
+    slot_count: int = 256
+    slots: list[dict] = field(default_factory=list)
+    slot_of: dict = field(default_factory=dict)
+    last_tick: int = -1
+
+    def __post_init__(self) -> None:
+        self.slots = [{} for _ in range(self.slot_count)]
+        self.last_tick = int(time.monotonic() / self.tick_seconds)
+
+    def __len__(self) -> int:
+        return len(self.slot_of)
+
+    def schedule(self, key: object, deadline: float) -> None:
+        self.cancel(key)
+        # First tick boundary at or after the deadline; passed ticks are not revisited.
+        tick = max(int(deadline / self.tick_seconds) + 1, self.last_tick + 1)
+        slot = tick % self.slot_count
+        self.slots[slot][key] = deadline
+        self.slot_of[key] = slot
+
+    def cancel(self, key: object) -> None:
+        slot = self.slot_of.pop(key, None)
+        if slot is not None:
+            self.slots[slot].pop(key, None)
+
+    def advance(self, now: float) -> list:
+        tick = int(now / self.tick_seconds)
+        due = []
+        for step in range(min(tick - self.last_tick, self.slot_count)):
+            slot = self.slots[(tick - step) % self.slot_count]
+            for key, deadline in list(slot.items()):
+                if deadline <= now:
+                    del slot[key]
+                    del self.slot_of[key]
+                    due.append(key)
+        self.last_tick = tick
+        return due
+
+
+@dataclass
+class TimerScheduler:
+    # One loop task fires every keyed deadline (psych listen windows, reminder dispatch) from a
+    # min-heap, sleeping until the earliest one. Re-arming a key pushes a fresh entry and orphans
+    # the old one, which is skipped when it surfaces; a task is created only when a callback fires.
+    heap: list = field(default_factory=list)
+    entry_of: dict = field(default_factory=dict)
+    callbacks: dict = field(default_factory=dict)
+    running: dict = field(default_factory=dict)
+    wakeup: asyncio.Event = field(default_factory=asyncio.Event)
+    task: asyncio.Task | None = None
+    pushed: int = 0
+    fired: int = 0
+
+    def __len__(self) -> int:
+        return len(self.callbacks)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.callbacks
+
+    def keys(self, kind: str) -> list:
+        return [key for key in self.callbacks if key[0] == kind]
+
+    def is_running(self, key: tuple) -> bool:
+        task = self.running.get(key)
+        return task is not None and not task.done()
+
+    def schedule(self, key: tuple, delay: float, callback) -> None:
+        self.pushed += 1
+        entry = (time.monotonic() + max(0.0, delay), self.pushed, key)
+        self.callbacks[key] = callback
+        self.entry_of[key] = self.pushed
+        heapq.heappush(self.heap, entry)
+        if len(self.heap) > 64 and len(self.heap) > 2 * len(self.entry_of):
+            # Mostly orphans from re-arming; rebuild so the heap stays proportional to live keys.
+            self.heap = [item for item in self.heap if self.entry_of.get(item[2]) == item[1]]
+            heapq.heapify(self.heap)
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+        if self.heap[0] is entry:
+            self.wakeup.set()
+
+    def cancel(self, key: tuple) -> None:
+        self.entry_of.pop(key, None)
+        self.callbacks.pop(key, None)
+        task = self.running.get(key)
+        if task is not None and not task.done() and task is not asyncio.current_task():
+            task.cancel()
+
+    async def _fire(self, key: tuple, callback) -> None:
+        try:
+            await callback()
+        except asyncio.CancelledError:
+            return
+        except Exception as error:
+            print(f"[TIMER ERROR] {key[0]}: {error}")
+        finally:
+            if self.running.get(key) is asyncio.current_task():
+                self.running.pop(key, None)
+
+    async def run(self) -> None:
+        while True:
+            self.wakeup.clear()
+            heap = self.heap
+            while heap and self.entry_of.get(heap[0][2]) != heap[0][1]:
+                heapq.heappop(heap)
+            if not heap:
+                await self.wakeup.wait()
+                continue
+            delay = heap[0][0] - time.monotonic()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            _, sequence, key = heapq.heappop(heap)
+            if self.entry_of.get(key) != sequence:
+                continue
+            del self.entry_of[key]
+            callback = self.callbacks.pop(key)
+            self.fired += 1
+            self.running[key] = asyncio.create_task(self._fire(key, callback))
+
+
+def approx_size(obj: object, seen: set[int] | None = None) -> int:
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(approx_size(key, seen) + approx_size(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        size += sum(approx_size(item, seen) for item in obj)
+    elif not isinstance(obj, (str, bytes, int, float, bool)) and obj is not None:
+        for cls in type(obj).__mro__:
+            for name in getattr(cls, "__slots__", ()):
+                if hasattr(obj, name):
+                    size += approx_size(getattr(obj, name), seen)
+        if hasattr(obj, "__dict__"):
+            size += approx_size(vars(obj), seen)
+    return size
+
+
+@dataclass
+class SessionStore:
+    # Dict-like, LRU-capped map of per-user sessions. A shared sweeper drops idle entries via a
+    # timing wheel; `activity` reads the session's own clock so callers never have to reschedule.
+    name: str
+    ttl_seconds: float
+    max_sessions: int = SESSION_STORE_MAX_SESSIONS
+    default_factory: object = None
+    activity: object = None
+    on_evict: object = None
+    sessions: OrderedDict = field(default_factory=OrderedDict)
+    touched: dict = field(default_factory=dict)
+    locks: dict = field(default_factory=dict)
+    wheel: TimingWheel = field(default_factory=lambda: TimingWheel(SESSION_SWEEP_SECONDS))
+    expired: int = 0
+    evicted: int = 0
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.sessions
+
+    def __getitem__(self, key: object):
+        if key not in self.sessions:
+            if self.default_factory is None:
+                raise KeyError(key)
+            self[key] = self.default_factory()
+        self.sessions.move_to_end(key)
+        return self.sessions[key]
+
+    def __setitem__(self, key: object, session: object) -> None:
+        self.sessions[key] = session
+        self.sessions.move_to_end(key)
+        self.touch(key)
+        while len(self.sessions) > self.max_sessions:
+            oldest = next(iter(self.sessions))
+            self.evicted += 1
+            self._drop(oldest, "evicted")
+
+    def get(self, key: object, default: object = None):
+        if key not in self.sessions:
+            return default
+        self.sessions.move_to_end(key)
+        return self.sessions[key]
+
+    def pop(self, key: object, default: object = None):
+        self.wheel.cancel(key)
+        self.touched.pop(key, None)
+        self.locks.pop(key, None)
+        return self.sessions.pop(key, default)
+
+    def keys(self):
+        return self.sessions.keys()
+
+    def items(self):
+        return self.sessions.items()
+
+    def touch(self, key: object) -> None:
+        now = time.monotonic()
+        self.touched[key] = now
+        self.wheel.schedule(key, now + self.ttl_seconds)
+
+    def lock(self, key: object) -> asyncio.Lock:
+        lock = self.locks.get(key)
+        if lock is None:
+            lock = self.locks[key] = asyncio.Lock()
+        return lock
+
+    def last_activity(self, key: object) -> float:
+        session = self.sessions.get(key)
+        if self.activity is not None and session is not None:
+            return max(self.touched.get(key, 0.0), float(self.activity(session)))
+        return self.touched.get(key, 0.0)
+
+    def _drop(self, key: object, reason: str) -> None:
+        session = self.pop(key)
+        if self.on_evict is not None:
+            self.on_evict(key, session, reason)
+
+    def sweep(self, now: float) -> int:
+        dropped = 0
+        for key in self.wheel.advance(now):
+            if key not in self.sessions:
+                continue
+            deadline = self.last_activity(key) + self.ttl_seconds
+            lock = self.locks.get(key)
+            if deadline > now or (lock is not None and lock.locked()):
+                # Used since it was scheduled (or mid-turn): push the deadline out instead.
+                self.wheel.schedule(key, max(deadline, now + self.wheel.tick_seconds))
+                continue
+            self.expired += 1
+            dropped += 1
+            self._drop(key, "expired")
+        return dropped
+
+    def approx_bytes(self, sample_size: int = 200) -> int:
+        # Walking every session's history on the event loop is too slow with thousands of them,
+        # so the newest `sample_size` are measured and scaled up.
+        sample = [session for _, session in zip(range(sample_size), reversed(self.sessions.values()))]
+        if not sample:
+            return 0
+        return sum(approx_size(session) for session in sample) * len(self.sessions) // len(sample)
+
+    def stats_line(self) -> str:
+        return (
+            f"`{len(self.sessions)}/{self.max_sessions}` sessions, ~`{self.approx_bytes() / 1024:.0f} KiB`, "
+            f"`{len(self.locks)}` locks, `{self.expired}` expired, `{self.evicted}` LRU-evicted"
+        )
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English chat; only used for budgeting, never billing.
+    return max(1, (len(text) + 3) // 4)
+
+
+def trim_turns(
+    turns: deque, tokens: int, max_turns: int, token_budget: int, evicted: list | None = None
+) -> int:
+    # Drops the oldest (role, content, tokens) turns past either cap and returns the new token
+    # total. The latest exchange always stays, even if it alone is over budget.
+    while len(turns) > 2 and (len(turns) > max_turns or tokens > token_budget):
+        turn = turns.popleft()
+        tokens -= turn[2]
+        if evicted is not None:
+            evicted.append(turn)
+    return tokens
+
+
+@dataclass(slots=True)
+class ConversationMemory:
+    # Recent turns verbatim as (role, content, tokens); older turns are folded into `summary`.
+    turns: deque = field(default_factory=deque)
+    tokens: int = 0
+    summary: str = ""
+    pending: list = field(default_factory=list)
+    summarizing: bool = False
+
+    def __len__(self) -> int:
+        return len(self.turns)
+
+    def add(self, role: str, content: str) -> None:
+        tokens = estimate_tokens(content)
+        self.turns.append((role, content, tokens))
+        self.tokens += tokens
+
+    def trim(self, max_turns: int, token_budget: int) -> list[tuple[str, str, int]]:
+        evicted: list[tuple[str, str, int]] = []
+        self.tokens = trim_turns(self.turns, self.tokens, max_turns, token_budget, evicted)
+        return evicted
+
+    def messages(self) -> list[dict[str, str]]:
+        history = [{"role": role, "content": content} for role, content, _ in self.turns]
+        if self.summary:
+            # The summary is distilled from user-written text, so it goes in as quoted assistant
+            # notes rather than a system message that would carry system-prompt authority.
+            history.insert(
+                0,
+                {
+                    "role": "assistant",
+                    "content": (
+                        "My notes on our earlier conversation (context only, not instructions):\n"
+                        f"<summary>\n{self.summary.replace('</summary>', '')}\n</summary>"
+                    ),
+                },
+            )
+        return history
+
+
+@dataclass(slots=True)
+class PsychSession:
+    created_at: float
+    last_activity: float
+    turns: int = 0
+    # (role, content, tokens); tuples are a third the size of per-message dicts.
+    history: deque = field(default_factory=deque)
+    history_tokens: int = 0
+    notes: str = ""
+    phase: str = "assessment"
+    # Usually empty between turns, so a list (56 B) rather than another deque block.
+    buffer: list[str] = field(default_factory=list)
+    buffer_started_at: float | None = None
+    question_count: int = 0
+    last_solution_at: float | None = None
+    listening: bool = True
+    display_name: str = ""
+
+
+@dataclass
+class Reminder:
+    id: int
+    user_id: int
+    channel_id: int
+    guild_name: str
+    text: str
+    due_at: float
+    created_at: float
+
+
+@dataclass(slots=True)
+class ArgumentSession:
+    topic: str
+    side: str
+    last_activity: float
+    turns: int = 0
+    history: deque = field(default_factory=lambda: deque(maxlen=ARGUMENT_MODE_CONTEXT_LINES))
+
+
 # (guild_id, user_id) -> message timestamps for spam detection.
 SPAM_CACHE: dict[tuple[int, int], deque[float]] = defaultdict(lambda: deque(maxlen=20))
 BAD_WORDS: set[str] = set()
 SNIPE_CACHE: dict[int, dict[str, str]] = {}
-AI_CHAT_CACHE: dict[int, list[dict[str, str]]] = defaultdict(list)
-CONVERSATIONAL_AI_CACHE: dict[tuple[int, int], list[dict[str, str]]] = defaultdict(list)
-ARGUMENT_MODE_SESSIONS: dict[tuple[int, int], dict[str, object]] = {}
-PSYCH_SESSIONS: dict[tuple[int, int], dict[str, object]] = {}
-PSYCH_SESSION_LOCKS: dict[tuple[int, int], asyncio.Lock] = defaultdict(asyncio.Lock)
-PSYCH_PENDING_TASKS: dict[tuple[int, int], asyncio.Task] = {}
+AI_CHAT_CACHE: dict[int, ConversationMemory] = defaultdict(ConversationMemory)
+AI_MEMORY_STATS: Counter = Counter()
+AI_MEMORY_TASKS: set[asyncio.Task] = set()
+CONVERSATIONAL_AI_CACHE = SessionStore(
+    "conversation", CONVERSATION_MEMORY_TTL_MINUTES * 60, default_factory=ConversationMemory
+)
+ARGUMENT_MODE_SESSIONS = SessionStore(
+    "argument",
+    ARGUMENT_MODE_TIMEOUT_MINUTES * 60,
+    activity=lambda session: session.last_activity,
+)
+PSYCH_SESSIONS = SessionStore(
+    "psych",
+    max(60, PSYCH_SESSION_TIMEOUT_MINUTES * 60),
+    activity=lambda session: session.last_activity,
+    on_evict=lambda key, session, reason: psych_session_evicted(key, session, reason),
+)
+SESSION_STORES = (PSYCH_SESSIONS, ARGUMENT_MODE_SESSIONS, CONVERSATIONAL_AI_CACHE)
+SESSION_SWEEP_TASK: asyncio.Task | None = None
+TIMERS = TimerScheduler()
+REMINDERS: dict[int, "Reminder"] = {}
+# (due_at, reminder_id); cancelled ids stay in the heap and are skipped when they surface.
+REMINDER_HEAP: list[tuple[float, int]] = []
+REMINDER_SAVE_LOCK = asyncio.Lock()
+REMINDER_TIMER_KEY = ("reminders",)
+REMINDER_NEXT_ID = 1
+# key -> session to snapshot, or None to delete its snapshot; drained by the psych journal.
+PSYCH_SNAPSHOT_DIRTY: dict[tuple[int, int], object] = {}
+# Sessions with a snapshot on disk that have not been restored into PSYCH_SESSIONS yet.
+PSYCH_SNAPSHOT_KEYS: set[tuple[int, int]] = set()
+PSYCH_SNAPSHOT_INFLIGHT: dict[tuple[int, int], object] = {}
+PSYCH_JOURNAL_TASK: asyncio.Task | None = None
 AI_SYSTEM_PROMPT = (
     "You are a helpful Discord assistant for a community server. "
     "Answer clearly in <=120 words unless the user asks for a long response, "
@@ -245,6 +705,12 @@ MODEL_CACHE_TS = 0.0
 MODEL_CACHE_TTL_SECONDS = 600
 SPOTIFY_CLIENT = None
 FFMPEG_EXECUTABLE: str | None = None
+try:
+    PROC_CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+    PROC_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    PROC_CLOCK_TICKS = 0
+    PROC_PAGE_SIZE = 0
 INDIAN_VEG_MEALS_CACHE: list[dict[str, str]] = []
 INDIAN_VEG_MEALS_CACHE_TS = 0.0
 
@@ -252,6 +718,8 @@ SPOTIFY_TRACK_RE = re.compile(
     r"(?:https?://open\.spotify\.com/track/|spotify:track:)([A-Za-z0-9]+)",
     re.IGNORECASE,
 )
+STREAM_EXPIRE_PATH_RE = re.compile(r"/expire/(\d+)")
+YOUTUBE_VIDEO_ID_RE = re.compile(r"[A-Za-z0-9_-]{11}")
 SPOTIFY_PLAYLIST_RE = re.compile(
     r"(?:https?://open\.spotify\.com/playlist/|spotify:playlist:)([A-Za-z0-9]+)",
     re.IGNORECASE,
@@ -294,12 +762,369 @@ class MusicTrack:
     title: str
     webpage_url: str
     requested_by: int
+    # Set for lazy entries (e.g. Spotify items) that still need a YouTube search before playback.
+    search_query: str | None = None
+    # Seconds into the track to start from (ffmpeg -ss); used when resuming a restored queue.
+    start_at: float = 0.0
+
+
+@dataclass
+class ResolvedStream:
+    stream_url: str
+    title: str
+    webpage_url: str
+    expires_at: float
+    codec: str = ""
+    # 0 for livestreams and sources that report no length; those are never cached to disk.
+    duration: float = 0.0
+
+    def is_fresh(self) -> bool:
+        return time.time() + MUSIC_STREAM_EXPIRY_MARGIN_SECONDS < self.expires_at
+
+
+@dataclass
+class TTLCache:
+    # LRU map where every entry carries its own absolute expiry (unix seconds).
+    max_entries: int
+    entries: OrderedDict[str, tuple[float, object]] = field(default_factory=OrderedDict)
+    hits: int = 0
+    misses: int = 0
+    expired: int = 0
+    evictions: int = 0
+
+    def get(self, key: str) -> object | None:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[0] <= time.time():
+            del self.entries[key]
+            self.expired += 1
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: str, value: object, expires_at: float) -> None:
+        self.entries[key] = (expires_at, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def discard(self, key: str) -> None:
+        self.entries.pop(key, None)
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / max(1, self.hits + self.misses)
+
+    def stats_line(self) -> str:
+        return (
+            f"`{len(self.entries)}/{self.max_entries}` entries, hit rate `{self.hit_rate * 100:.0f}%` "
+            f"({self.hits} hits, {self.misses} misses, {self.expired} expired, {self.evictions} evicted)"
+        )
+
+
+@dataclass
+class FormatStrategyStats:
+    outcomes: deque[bool] = field(default_factory=lambda: deque(maxlen=MUSIC_FORMAT_STRATEGY_WINDOW))
+    last_attempt: float = 0.0
+
+    def record(self, success: bool) -> None:
+        self.outcomes.append(success)
+        self.last_attempt = time.time()
+
+    @property
+    def success_rate(self) -> float:
+        # Laplace-smoothed so an untried strategy sits at 50% instead of 0 or 100.
+        return (sum(self.outcomes) + 1) / (len(self.outcomes) + 2)
 
 
-MUSIC_QUEUES: dict[int, deque[MusicTrack]] = defaultdict(deque)
+@dataclass
+class AudioFileCache:
+    # Ogg Opus files named <video id>.opus, evicted least-recently-played first once over max_bytes.
+    directory: Path
+    max_bytes: int
+    entries: OrderedDict[str, int] = field(default_factory=OrderedDict)
+    total_bytes: int = 0
+    hits: int = 0
+    misses: int = 0
+    downloads: int = 0
+    failures: int = 0
+
+    def path(self, key: str) -> Path:
+        return self.directory / f"{key}.opus"
+
+    def load(self) -> int:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        files = []
+        for path in self.directory.glob("*.opus"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, path.stem, stat.st_size))
+        for partial in self.directory.glob("*.part"):
+            partial.unlink(missing_ok=True)
+        self.entries.clear()
+        self.total_bytes = 0
+        for _, key, size in sorted(files):
+            self.entries[key] = size
+            self.total_bytes += size
+        self.evict()
+        return len(self.entries)
+
+    def get(self, key: str) -> Path | None:
+        if key not in self.entries:
+            self.misses += 1
+            return None
+        path = self.path(key)
+        try:
+            # mtime doubles as the LRU clock so the order survives restarts.
+            os.utime(path)
+        except OSError:
+            self.total_bytes -= self.entries.pop(key)
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return path
+
+    def add(self, key: str, size: int) -> None:
+        self.total_bytes += size - self.entries.get(key, 0)
+        self.entries[key] = size
+        self.entries.move_to_end(key)
+        self.evict()
+
+    def evict(self) -> None:
+        # Unlinking a file ffmpeg is still reading is safe on POSIX; the open handle keeps it alive.
+        while self.total_bytes > self.max_bytes and self.entries:
+            key, size = self.entries.popitem(last=False)
+            self.total_bytes -= size
+            self.path(key).unlink(missing_ok=True)
+
+    def stats_line(self) -> str:
+        return (
+            f"`{len(self.entries)}` files, `{self.total_bytes / 1048576:.0f}/{self.max_bytes // 1048576} MB`, "
+            f"hit rate `{self.hits / max(1, self.hits + self.misses) * 100:.0f}%` "
+            f"({self.hits} hits, {self.misses} misses, {self.downloads} downloaded, {self.failures} failed)"
+        )
+
+
+@dataclass
+class PlaybackClock:
+    # Playback position of the current track, frozen while paused.
+    base: float
+    running_since: float | None = None
+
+    def position(self) -> float:
+        if self.running_since is None:
+            return self.base
+        return self.base + time.monotonic() - self.running_since
+
+    def pause(self) -> None:
+        self.base = self.position()
+        self.running_since = None
+
+    def resume(self) -> None:
+        if self.running_since is None:
+            self.running_since = time.monotonic()
+
+
+@dataclass(slots=True)
+class _QueueNode:
+    track: MusicTrack
+    priority: float
+    left: "_QueueNode | None" = None
+    right: "_QueueNode | None" = None
+    size: int = 1
+
+
+def _queue_size(node: _QueueNode | None) -> int:
+    return node.size if node is not None else 0
+
+
+def _queue_update(node: _QueueNode) -> _QueueNode:
+    node.size = 1 + _queue_size(node.left) + _queue_size(node.right)
+    return node
+
+
+def _queue_split(node: _QueueNode | None, count: int) -> tuple[_QueueNode | None, _QueueNode | None]:
+    # First `count` tracks on the left, the rest on the right.
+    if node is None:
+        return None, None
+    if _queue_size(node.left) >= count:
+        left, node.left = _queue_split(node.left, count)
+        return left, _queue_update(node)
+    node.right, right = _queue_split(node.right, count - _queue_size(node.left) - 1)
+    return _queue_update(node), right
+
+
+def _queue_merge(left: _QueueNode | None, right: _QueueNode | None) -> _QueueNode | None:
+    if left is None or right is None:
+        return left or right
+    if left.priority > right.priority:
+        left.right = _queue_merge(left.right, right)
+        return _queue_update(left)
+    right.left = _queue_merge(left, right.left)
+    return _queue_update(right)
+
+
+def _queue_walk(node: _QueueNode | None):
+    stack: list[_QueueNode] = []
+    while stack or node is not None:
+        while node is not None:
+            stack.append(node)
+            node = node.left
+        node = stack.pop()
+        yield node.track
+        node = node.right
+
+
+class MusicQueue:
+    # Implicit treap keyed by position: O(log n) index, insert, remove and move, so long
+    # playlists can be edited and paged without copying the whole queue.
+    def __init__(self, tracks: object = ()) -> None:
+        self.root: _QueueNode | None = None
+        self.replace(list(tracks))
+
+    def __len__(self) -> int:
+        return _queue_size(self.root)
+
+    def __bool__(self) -> bool:
+        return self.root is not None
+
+    def __iter__(self):
+        return _queue_walk(self.root)
+
+    def _index(self, index: int) -> int:
+        size = len(self)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("queue index out of range")
+        return index
+
+    def __getitem__(self, index: int) -> MusicTrack:
+        index = self._index(index)
+        node = self.root
+        while node is not None:
+            left_size = _queue_size(node.left)
+            if index < left_size:
+                node = node.left
+            elif index == left_size:
+                return node.track
+            else:
+                index -= left_size + 1
+                node = node.right
+        raise IndexError("queue index out of range")
+
+    def slice(self, start: int, stop: int) -> list[MusicTrack]:
+        start = max(0, start)
+        stop = min(len(self), stop)
+        if start >= stop:
+            return []
+        head, rest = _queue_split(self.root, start)
+        middle, tail = _queue_split(rest, stop - start)
+        tracks = list(_queue_walk(middle))
+        self.root = _queue_merge(_queue_merge(head, middle), tail)
+        return tracks
+
+    def insert(self, index: int, track: MusicTrack) -> None:
+        index = max(0, min(len(self), index))
+        left, right = _queue_split(self.root, index)
+        self.root = _queue_merge(_queue_merge(left, _QueueNode(track, random.random())), right)
+
+    def append(self, track: MusicTrack) -> None:
+        self.root = _queue_merge(self.root, _QueueNode(track, random.random()))
+
+    def appendleft(self, track: MusicTrack) -> None:
+        self.root = _queue_merge(_QueueNode(track, random.random()), self.root)
+
+    def extend(self, tracks: object) -> None:
+        self.root = _queue_merge(self.root, MusicQueue(tracks).root)
+
+    def pop(self, index: int = -1) -> MusicTrack:
+        index = self._index(index)
+        left, rest = _queue_split(self.root, index)
+        node, right = _queue_split(rest, 1)
+        self.root = _queue_merge(left, right)
+        return node.track
+
+    def popleft(self) -> MusicTrack:
+        return self.pop(0)
+
+    def move(self, source: int, target: int) -> MusicTrack:
+        track = self.pop(source)
+        self.insert(target, track)
+        return track
+
+    def clear(self) -> None:
+        self.root = None
+
+    def replace(self, tracks: list[MusicTrack]) -> None:
+        # O(n) rebuild (Cartesian tree over fresh priorities) for whole-queue edits.
+        stack: list[_QueueNode] = []
+        for track in tracks:
+            node = _QueueNode(track, random.random())
+            last = None
+            while stack and stack[-1].priority < node.priority:
+                last = _queue_update(stack.pop())
+            node.left = last
+            if stack:
+                stack[-1].right = node
+            stack.append(node)
+        while len(stack) > 1:
+            _queue_update(stack.pop())
+        self.root = _queue_update(stack[0]) if stack else None
+
+    def shuffle(self) -> None:
+        tracks = list(self)
+        random.shuffle(tracks)
+        self.replace(tracks)
+
+    def dedupe(self, key, seen: set | None = None) -> int:
+        seen = set() if seen is None else seen
+        kept = []
+        for track in self:
+            track_key = key(track)
+            if track_key in seen:
+                continue
+            seen.add(track_key)
+            kept.append(track)
+        removed = len(self) - len(kept)
+        if removed:
+            self.replace(kept)
+        return removed
+
+
+MUSIC_QUEUES: dict[int, MusicQueue] = defaultdict(MusicQueue)
 MUSIC_NOW_PLAYING: dict[int, MusicTrack] = {}
 MUSIC_TEXT_CHANNELS: dict[int, int] = {}
 MUSIC_LOCKS: dict[int, asyncio.Lock] = defaultdict(asyncio.Lock)
+MUSIC_PREFETCH: dict[int, tuple[MusicTrack, asyncio.Task]] = {}
+MUSIC_NEXT_TASKS: dict[int, asyncio.Task] = {}
+MUSIC_CLOCKS: dict[int, PlaybackClock] = {}
+MUSIC_SAVED_QUEUES: dict[int, dict] = {}
+MUSIC_QUEUES_DIRTY = False
+MUSIC_QUEUE_TASK: asyncio.Task | None = None
+MUSIC_HANDOFF_MS: deque[float] = deque(maxlen=200)
+MUSIC_LAZY_TASKS: dict[int, asyncio.Task] = {}
+MUSIC_SEARCH_SEMAPHORE = asyncio.Semaphore(MUSIC_SPOTIFY_SEARCH_CONCURRENCY)
+FORMAT_STRATEGIES: dict[str, dict[str, FormatStrategyStats]] = defaultdict(dict)
+FORMAT_REPROBE_AT: dict[str, float] = {}
+MUSIC_METADATA_CACHE = TTLCache(MUSIC_METADATA_CACHE_MAX_ENTRIES)
+MUSIC_STREAM_CACHE = TTLCache(MUSIC_STREAM_CACHE_MAX_ENTRIES)
+MUSIC_PLAYBACK_STATS: Counter[str] = Counter()
+MUSIC_AUDIO_CACHE = AudioFileCache(AUDIO_CACHE_DIR, MUSIC_AUDIO_CACHE_MAX_MB * 1048576)
+MUSIC_AUDIO_PLAYS: Counter[str] = Counter()
+MUSIC_AUDIO_DOWNLOADS: dict[str, asyncio.Task] = {}
+MUSIC_AUDIO_DOWNLOAD_SEMAPHORE = asyncio.Semaphore(MUSIC_AUDIO_CACHE_DOWNLOADS)
+MUSIC_METADATA_CACHE_DIRTY = False
+MUSIC_METADATA_CACHE_SAVED_AT = 0.0
+MUSIC_METADATA_CACHE_SAVE_TASK: asyncio.Task | None = None
 APP_COMMANDS_SYNCED = False
 AICRUSH_LOCKS: dict[tuple[int, int], asyncio.Lock] = defaultdict(asyncio.Lock)
 AICRUSH_RESULT_CACHE: dict[tuple[int, int], tuple[float, str]] = {}
@@ -334,6 +1159,8 @@ def ensure_data_files() -> None:
         WARNINGS_FILE.write_text("{}", encoding="utf-8")
     if not MOD_CONFIG_FILE.exists():
         MOD_CONFIG_FILE.write_text("{}", encoding="utf-8")
+    if not STYLE_PROFILES_FILE.exists():
+        STYLE_PROFILES_FILE.write_text("{}", encoding="utf-8")
     if not BAD_WORDS_FILE.exists():
         BAD_WORDS_FILE.write_text(
             "# Add one blocked word per line.\n# Lines starting with # are ignored.\n",
@@ -345,7 +1172,7 @@ def read_json(path: Path) -> dict:
     ensure_data_files()
     try:
         return json.loads(path.read_text(encoding="utf-8"))
-    except json.JSONDecodeError:
+    except (FileNotFoundError, json.JSONDecodeError):
         return {}
 
 
@@ -354,6 +1181,14 @@ def write_json(path: Path, payload: dict) -> None:
     path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
 
 
+def write_json_atomic(path: Path, payload: dict) -> None:
+    # A crash mid-write leaves the previous file intact instead of a truncated one.
+    ensure_data_files()
+    temp_path = path.with_suffix(path.suffix + ".tmp")
+    temp_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    os.replace(temp_path, path)
+
+
 def load_warnings() -> dict:
     return read_json(WARNINGS_FILE)
 
@@ -416,6 +1251,25 @@ def set_guild_automod_enabled(guild_id: int, enabled: bool) -> None:
     save_mod_config(config)
 
 
+def get_guild_archive_retention_days(guild_id: int) -> int:
+    config = load_mod_config()
+    guild_config = config.get(str(guild_id), {})
+    value = guild_config.get("archive_retention_days")
+    if isinstance(value, int) and value > 0:
+        return value
+    if isinstance(value, str) and value.isdigit() and int(value) > 0:
+        return int(value)
+    return MESSAGE_ARCHIVE_RETENTION_DAYS
+
+
+def set_guild_archive_retention_days(guild_id: int, days: int) -> None:
+    config = load_mod_config()
+    guild_key = str(guild_id)
+    config.setdefault(guild_key, {})
+    config[guild_key]["archive_retention_days"] = int(days)
+    save_mod_config(config)
+
+
 def parse_role_id_list(raw_values: object) -> set[int]:
     parsed: set[int] = set()
     if isinstance(raw_values, list):
@@ -834,66 +1688,224 @@ def lines_to_paragraph(lines: list[str], max_chars: int) -> str:
     return merged
 
 
-@dataclass
-class RoastContext:
-    message_count: int
-    replies_count: int
-    scanned_messages: int
-    user_lines: list[str]
-    reply_lines: list[str]
-    top_words: list[str]
-    top_phrases: list[str]
-    avg_len: float
-    question_ratio: float
-    exclaim_ratio: float
-    emoji_per_msg: float
-
-
-ROAST_STOP_WORDS = {
+STYLE_STOP_WORDS = {
     "the", "and", "for", "that", "with", "this", "you", "are", "was", "have", "not", "but",
     "just", "your", "from", "what", "when", "where", "will", "would", "they", "them", "their",
     "about", "there", "then", "than", "into", "also", "been", "can", "could", "should", "like",
     "im", "its", "dont", "cant", "didnt", "wont", "aint", "ive", "ill",
 }
+STYLE_POSITIVE_MARKERS = {
+    "lol", "lmao", "haha", "thanks", "thank", "nice", "great", "good", "bro", "love", "best",
+}
+STYLE_NEGATIVE_MARKERS = {
+    "stupid", "idiot", "trash", "annoying", "hate", "shut", "noob", "bad", "toxic", "loser",
+}
+STYLE_SUPPORTIVE_MARKERS = {"thanks", "love", "bro", "help", "nice", "great"}
+STYLE_ROAST_MARKERS = {"noob", "stupid", "idiot", "trash", "roast", "shut"}
+STYLE_MARKER_WORDS = (
+    STYLE_POSITIVE_MARKERS | STYLE_NEGATIVE_MARKERS | STYLE_SUPPORTIVE_MARKERS | STYLE_ROAST_MARKERS
+)
+STYLE_SERIALIZED_TERMS = 64
 
 
-def extract_roast_term_stats(messages: list[str]) -> tuple[list[str], list[str]]:
-    words: list[str] = []
-    for message in messages:
-        for token in WORD_PATTERN.findall(message.lower()):
+@dataclass
+class StyleAccumulator:
+    # Streaming chat-style metrics. Each message is tokenized once; partial results from
+    # separate scans can be merged and round-tripped through JSON.
+    message_count: int = 0
+    total_chars: int = 0
+    question_messages: int = 0
+    exclaim_messages: int = 0
+    question_marks: int = 0
+    at_marks: int = 0
+    emoji_count: int = 0
+    word_counts: Counter[str] = field(default_factory=Counter)
+    phrase_counts: Counter[str] = field(default_factory=Counter)
+    marker_counts: Counter[str] = field(default_factory=Counter)
+
+    @classmethod
+    def from_messages(cls, messages: list[str]) -> "StyleAccumulator":
+        accumulator = cls()
+        for message in messages:
+            accumulator.add(message)
+        return accumulator
+
+    def add(self, text: str) -> None:
+        self.message_count += 1
+        self.total_chars += len(text)
+        question_marks = text.count("?")
+        if question_marks:
+            self.question_messages += 1
+            self.question_marks += question_marks
+        if "!" in text:
+            self.exclaim_messages += 1
+        self.at_marks += text.count("@")
+        self.emoji_count += len(EMOJI_PATTERN.findall(text))
+
+        previous: str | None = None
+        for token in WORD_PATTERN.findall(text.lower()):
             cleaned = token.strip("'")
-            if len(cleaned) <= 2 or cleaned in ROAST_STOP_WORDS:
+            if cleaned in STYLE_MARKER_WORDS:
+                self.marker_counts[cleaned] += 1
+            if len(cleaned) <= 2 or cleaned in STYLE_STOP_WORDS:
                 continue
-            words.append(cleaned)
+            self.word_counts[cleaned] += 1
+            if previous is not None and previous != cleaned:
+                self.phrase_counts[f"{previous} {cleaned}"] += 1
+            previous = cleaned
+
+    def merge(self, other: "StyleAccumulator") -> "StyleAccumulator":
+        self.message_count += other.message_count
+        self.total_chars += other.total_chars
+        self.question_messages += other.question_messages
+        self.exclaim_messages += other.exclaim_messages
+        self.question_marks += other.question_marks
+        self.at_marks += other.at_marks
+        self.emoji_count += other.emoji_count
+        self.word_counts.update(other.word_counts)
+        self.phrase_counts.update(other.phrase_counts)
+        self.marker_counts.update(other.marker_counts)
+        return self
+
+    @property
+    def avg_len(self) -> float:
+        return self.total_chars / max(1, self.message_count)
+
+    @property
+    def question_ratio(self) -> float:
+        return self.question_messages / max(1, self.message_count)
+
+    @property
+    def exclaim_ratio(self) -> float:
+        return self.exclaim_messages / max(1, self.message_count)
+
+    @property
+    def emoji_per_msg(self) -> float:
+        return self.emoji_count / max(1, self.message_count)
+
+    def top_words(self, limit: int) -> list[str]:
+        return [word for word, _ in self.word_counts.most_common(limit)]
+
+    def top_phrases(self, limit: int) -> list[str]:
+        return [phrase for phrase, _ in self.phrase_counts.most_common(limit)]
+
+    def marker_hits(self, markers: set[str]) -> int:
+        return sum(self.marker_counts[word] for word in markers)
+
+    def reply_tone(self) -> Literal["limited", "positive", "negative", "mixed"]:
+        if self.message_count == 0:
+            return "limited"
+        positive_hits = self.marker_hits(STYLE_POSITIVE_MARKERS)
+        negative_hits = self.marker_hits(STYLE_NEGATIVE_MARKERS)
+        if positive_hits > negative_hits * 1.4:
+            return "positive"
+        if negative_hits > positive_hits * 1.4:
+            return "negative"
+        return "mixed"
+
+    def display_stats(self, top_words: int = 5) -> dict[str, str]:
+        common = self.top_words(top_words)
+        return {
+            "avg_len": f"{self.avg_len:.1f}",
+            "question_ratio": f"{self.question_ratio * 100:.0f}%",
+            "exclaim_ratio": f"{self.exclaim_ratio * 100:.0f}%",
+            "emoji_per_msg": f"{self.emoji_per_msg:.2f}",
+            "top_words": ", ".join(common) if common else "none",
+        }
+
+    def to_dict(self, max_terms: int = STYLE_SERIALIZED_TERMS) -> dict:
+        return {
+            "message_count": self.message_count,
+            "total_chars": self.total_chars,
+            "question_messages": self.question_messages,
+            "exclaim_messages": self.exclaim_messages,
+            "question_marks": self.question_marks,
+            "at_marks": self.at_marks,
+            "emoji_count": self.emoji_count,
+            "word_counts": dict(self.word_counts.most_common(max_terms)),
+            "phrase_counts": dict(self.phrase_counts.most_common(max_terms)),
+            "marker_counts": dict(self.marker_counts),
+        }
 
-    top_words = [word for word, _ in Counter(words).most_common(8)]
+    @classmethod
+    def from_dict(cls, payload: dict) -> "StyleAccumulator":
+        def _count(key: str) -> int:
+            value = payload.get(key, 0)
+            return int(value) if isinstance(value, (int, float)) else 0
+
+        def _counter(key: str) -> Counter[str]:
+            raw = payload.get(key)
+            if not isinstance(raw, dict):
+                return Counter()
+            return Counter(
+                {str(term): int(count) for term, count in raw.items() if isinstance(count, (int, float))}
+            )
 
-    bigrams: list[str] = []
-    for first, second in zip(words, words[1:]):
-        if first == second:
-            continue
-        bigrams.append(f"{first} {second}")
-    top_phrases = [phrase for phrase, _ in Counter(bigrams).most_common(6)]
-    return top_words, top_phrases
-
-
-def roast_reply_tone(reply_lines: list[str]) -> str:
-    if not reply_lines:
-        return "limited reply context"
-    reply_text = " ".join(reply_lines).lower()
-    positive_hits = sum(
-        reply_text.count(word)
-        for word in ("lol", "lmao", "haha", "thanks", "nice", "great", "bro", "love")
-    )
-    negative_hits = sum(
-        reply_text.count(word)
-        for word in ("stupid", "idiot", "trash", "annoying", "hate", "shut", "noob")
-    )
-    if positive_hits > negative_hits * 1.4:
-        return "mostly playful-positive reactions"
-    if negative_hits > positive_hits * 1.4:
-        return "frequent pushback/teasing reactions"
-    return "mixed reactions"
+        return cls(
+            message_count=_count("message_count"),
+            total_chars=_count("total_chars"),
+            question_messages=_count("question_messages"),
+            exclaim_messages=_count("exclaim_messages"),
+            question_marks=_count("question_marks"),
+            at_marks=_count("at_marks"),
+            emoji_count=_count("emoji_count"),
+            word_counts=_counter("word_counts"),
+            phrase_counts=_counter("phrase_counts"),
+            marker_counts=_counter("marker_counts"),
+        )
+
+
+ROAST_TONE_LABELS = {
+    "limited": "limited reply context",
+    "positive": "mostly playful-positive reactions",
+    "negative": "frequent pushback/teasing reactions",
+    "mixed": "mixed reactions",
+}
+
+
+@dataclass
+class RoastContext:
+    scanned_messages: int
+    user_lines: list[str]
+    reply_lines: list[str]
+    style: StyleAccumulator
+    reply_style: StyleAccumulator
+
+    @property
+    def message_count(self) -> int:
+        return self.style.message_count
+
+    @property
+    def replies_count(self) -> int:
+        return self.reply_style.message_count
+
+    @property
+    def top_words(self) -> list[str]:
+        return self.style.top_words(8)
+
+    @property
+    def top_phrases(self) -> list[str]:
+        return self.style.top_phrases(6)
+
+    @property
+    def avg_len(self) -> float:
+        return self.style.avg_len
+
+    @property
+    def question_ratio(self) -> float:
+        return self.style.question_ratio
+
+    @property
+    def exclaim_ratio(self) -> float:
+        return self.style.exclaim_ratio
+
+    @property
+    def emoji_per_msg(self) -> float:
+        return self.style.emoji_per_msg
+
+    @property
+    def reply_tone(self) -> str:
+        return ROAST_TONE_LABELS[self.reply_style.reply_tone()]
 
 
 def roast_behavior_labels(context: RoastContext) -> list[str]:
@@ -914,14 +1926,14 @@ def roast_behavior_labels(context: RoastContext) -> list[str]:
         labels.append("drops paragraph-sized takes")
     elif context.avg_len <= 28:
         labels.append("rapid one-liner style")
-    labels.append(roast_reply_tone(context.reply_lines))
+    labels.append(context.reply_tone)
     return labels[:5]
 
 
 async def collect_roast_context(guild: discord.Guild, target_user_id: int) -> RoastContext:
     me = guild.me
     if me is None:
-        return RoastContext(0, 0, 0, [], [], [], [], 0.0, 0.0, 0.0, 0.0)
+        return RoastContext(0, [], [], StyleAccumulator(), StyleAccumulator())
 
     channels = [
         channel
@@ -933,15 +1945,11 @@ async def collect_roast_context(guild: discord.Guild, target_user_id: int) -> Ro
 
     user_lines: list[str] = []
     reply_lines: list[str] = []
+    style = StyleAccumulator()
+    reply_style = StyleAccumulator()
     scanned_messages = 0
-    message_count = 0
-    replies_count = 0
     user_chars = 0
     reply_chars = 0
-    total_len = 0
-    question_messages = 0
-    exclaim_messages = 0
-    emoji_count = 0
     user_budget = int(ROAST_MAX_CONTEXT_CHARS * 0.72)
     reply_budget = ROAST_MAX_CONTEXT_CHARS - user_budget
 
@@ -978,13 +1986,7 @@ async def collect_roast_context(guild: discord.Guild, target_user_id: int) -> Ro
 
                 if msg.author.id == target_user_id:
                     target_message_ids.add(msg.id)
-                    message_count += 1
-                    total_len += len(cleaned)
-                    if "?" in cleaned:
-                        question_messages += 1
-                    if "!" in cleaned:
-                        exclaim_messages += 1
-                    emoji_count += len(EMOJI_PATTERN.findall(cleaned))
+                    style.add(cleaned)
                     user_chars = append_with_char_budget(
                         user_lines, cleaned, user_chars, user_budget
                     )
@@ -997,27 +1999,19 @@ async def collect_roast_context(guild: discord.Guild, target_user_id: int) -> Ro
                     is_reply_to_target = True
 
                 if is_reply_to_target:
-                    replies_count += 1
+                    reply_style.add(cleaned)
                     reply_chars = append_with_char_budget(
                         reply_lines, cleaned, reply_chars, reply_budget
                     )
         except (discord.Forbidden, discord.HTTPException):
             continue
 
-    top_words, top_phrases = extract_roast_term_stats(user_lines)
-    divisor = max(1, message_count)
     return RoastContext(
-        message_count=message_count,
-        replies_count=replies_count,
         scanned_messages=scanned_messages,
         user_lines=user_lines,
         reply_lines=reply_lines,
-        top_words=top_words,
-        top_phrases=top_phrases,
-        avg_len=total_len / divisor,
-        question_ratio=question_messages / divisor,
-        exclaim_ratio=exclaim_messages / divisor,
-        emoji_per_msg=emoji_count / divisor,
+        style=style,
+        reply_style=reply_style,
     )
 
 
@@ -1032,7 +2026,7 @@ def build_personal_roast_prompt(
     behavior_bits = ", ".join(roast_behavior_labels(context)) or "general chat presence"
     top_words = ", ".join(context.top_words[:6]) or "none"
     top_phrases = ", ".join(context.top_phrases[:5]) or "none"
-    reply_tone = roast_reply_tone(context.reply_lines)
+    reply_tone = context.reply_tone
 
     return (
         f"Create a {style} personal roast for a Discord member.\n"
@@ -1098,7 +2092,7 @@ def generate_personal_roast_local(
         lines.append("Your punctuation swings between diplomat and chaos goblin.")
 
     lines.append(
-        f"People react with {roast_reply_tone(context.reply_lines)}, which means you are definitely impossible to ignore."
+        f"People react with {context.reply_tone}, which means you are definitely impossible to ignore."
     )
     lines.append("Closer: all jokes, still elite presence in chat.")
     return "\n".join(lines[:9])
@@ -1322,52 +2316,211 @@ def _psych_ttl_seconds() -> int:
 
 
 def cancel_psych_flush(channel_id: int, user_id: int) -> None:
-    key = psych_session_key(channel_id, user_id)
-    task = PSYCH_PENDING_TASKS.pop(key, None)
-    current_task = asyncio.current_task()
-    if task is not None and not task.done() and task is not current_task:
-        task.cancel()
+    TIMERS.cancel(("psych", channel_id, user_id))
+
+
+def psych_snapshot_path(key: tuple[int, int]) -> Path:
+    return PSYCH_SESSIONS_DIR / f"{key[0]}-{key[1]}.json"
+
+
+def mark_psych_session_dirty(key: tuple[int, int], session: PsychSession | None) -> None:
+    if PSYCH_SESSION_PERSIST_ENABLED:
+        PSYCH_SNAPSHOT_DIRTY[key] = session
+
+
+def psych_session_to_record(session: PsychSession) -> dict:
+    # Monotonic clocks restart with the process, so snapshots store wall-clock times.
+    offset = time.time() - time.monotonic()
+    return {
+        "created_at": round(session.created_at + offset, 3),
+        "last_activity": round(session.last_activity + offset, 3),
+        "turns": session.turns,
+        "history": [[role, content] for role, content, _ in session.history],
+        "notes": session.notes,
+        "phase": session.phase,
+        "buffer": list(session.buffer),
+        "buffer_started_at": None
+        if session.buffer_started_at is None
+        else round(session.buffer_started_at + offset, 3),
+        "question_count": session.question_count,
+        "last_solution_at": None
+        if session.last_solution_at is None
+        else round(session.last_solution_at + offset, 3),
+        "listening": session.listening,
+        "name": session.display_name,
+    }
+
+
+def psych_session_from_record(record: dict) -> PsychSession | None:
+    if not isinstance(record, dict) or not isinstance(record.get("last_activity"), (int, float)):
+        return None
+    offset = time.time() - time.monotonic()
+    session = PsychSession(
+        created_at=float(record.get("created_at") or record["last_activity"]) - offset,
+        last_activity=float(record["last_activity"]) - offset,
+        turns=int(record.get("turns") or 0),
+        notes=str(record.get("notes") or ""),
+        phase=str(record.get("phase") or "assessment"),
+        question_count=int(record.get("question_count") or 0),
+        listening=bool(record.get("listening", True)),
+        display_name=str(record.get("name") or ""),
+    )
+    for item in record.get("history") or []:
+        if isinstance(item, list) and len(item) == 2:
+            add_psych_history(session, str(item[0]), str(item[1]))
+    trim_psych_history(session)
+    session.buffer.extend(str(line) for line in (record.get("buffer") or [])[-PSYCH_MAX_BUFFERED_MESSAGES:])
+    if isinstance(record.get("buffer_started_at"), (int, float)):
+        session.buffer_started_at = float(record["buffer_started_at"]) - offset
+    if isinstance(record.get("last_solution_at"), (int, float)):
+        session.last_solution_at = float(record["last_solution_at"]) - offset
+    return session
 
 
-def get_psych_session(channel_id: int, user_id: int) -> dict[str, object] | None:
+def restore_psych_session(key: tuple[int, int]) -> PsychSession | None:
+    PSYCH_SNAPSHOT_KEYS.discard(key)
+    # An LRU-evicted session may still be waiting for (or in the middle of) its write.
+    session = PSYCH_SNAPSHOT_DIRTY.get(key) or PSYCH_SNAPSHOT_INFLIGHT.get(key)
+    if session is None:
+        path = psych_snapshot_path(key)
+        try:
+            # One small read per session per process lifetime, so it stays on the loop.
+            session = psych_session_from_record(json.loads(path.read_text(encoding="utf-8")))
+        except (OSError, ValueError, TypeError) as error:
+            print(f"[PSYCH RESTORE ERROR] {path.name}: {error}")
+            return None
+    if session is None or time.monotonic() - session.last_activity > _psych_ttl_seconds():
+        mark_psych_session_dirty(key, None)
+        return None
+    PSYCH_SESSIONS[key] = session
+    if session.buffer:
+        channel = bot.get_channel(key[0])
+        if channel is not None:
+            schedule_psych_flush(key[0], key[1], channel, session.display_name or "User")
+    return session
+
+
+def psych_session_evicted(key: tuple[int, int], session: PsychSession | None, reason: str) -> None:
+    cancel_psych_flush(*key)
+    if reason == "expired" or session is None:
+        mark_psych_session_dirty(key, None)
+    elif PSYCH_SESSION_PERSIST_ENABLED:
+        # Dropped only to cap memory: keep the snapshot so the session comes back on next use.
+        mark_psych_session_dirty(key, session)
+        PSYCH_SNAPSHOT_KEYS.add(key)
+
+
+def _write_psych_snapshots(records: dict[tuple[int, int], dict | None], pending: list[str]) -> None:
+    PSYCH_SESSIONS_DIR.mkdir(parents=True, exist_ok=True)
+    writes = [(psych_snapshot_path(key), record) for key, record in records.items()]
+    writes.append((PSYCH_PENDING_INDEX_FILE, {"pending": pending}))
+    for path, record in writes:
+        if record is None:
+            path.unlink(missing_ok=True)
+            continue
+        temp_path = path.with_suffix(".tmp")
+        temp_path.write_text(json.dumps(record, ensure_ascii=False), encoding="utf-8")
+        os.replace(temp_path, path)
+
+
+def scan_psych_snapshots() -> tuple[set[tuple[int, int]], list[tuple[int, int]]]:
+    keys: set[tuple[int, int]] = set()
+    if not PSYCH_SESSIONS_DIR.is_dir():
+        return keys, []
+    cutoff = time.time() - _psych_ttl_seconds()
+    for path in PSYCH_SESSIONS_DIR.iterdir():
+        match = re.fullmatch(r"(\d+)-(\d+)\.json", path.name)
+        if match is None:
+            continue
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                continue
+        except OSError:
+            continue
+        keys.add((int(match.group(1)), int(match.group(2))))
+    try:
+        names = json.loads(PSYCH_PENDING_INDEX_FILE.read_text(encoding="utf-8")).get("pending") or []
+    except (OSError, ValueError, AttributeError):
+        names = []
+    pending = []
+    for name in names:
+        match = re.fullmatch(r"(\d+)-(\d+)", str(name))
+        if match is not None and (int(match.group(1)), int(match.group(2))) in keys:
+            pending.append((int(match.group(1)), int(match.group(2))))
+    return keys, pending
+
+
+async def save_psych_snapshots() -> None:
+    if not PSYCH_SNAPSHOT_DIRTY:
+        return
+    PSYCH_SNAPSHOT_INFLIGHT.update(PSYCH_SNAPSHOT_DIRTY)
+    PSYCH_SNAPSHOT_DIRTY.clear()
+    records = {
+        key: None if session is None else psych_session_to_record(session)
+        for key, session in PSYCH_SNAPSHOT_INFLIGHT.items()
+    }
+    pending = [f"{key[0]}-{key[1]}" for key, session in PSYCH_SESSIONS.items() if session.buffer]
+    try:
+        await asyncio.to_thread(_write_psych_snapshots, records, pending)
+    except OSError as error:
+        for key, session in PSYCH_SNAPSHOT_INFLIGHT.items():
+            PSYCH_SNAPSHOT_DIRTY.setdefault(key, session)
+        print(f"[PSYCH SNAPSHOT ERROR] {error}")
+    finally:
+        PSYCH_SNAPSHOT_INFLIGHT.clear()
+
+
+async def psych_journal_worker() -> None:
+    while True:
+        await asyncio.sleep(PSYCH_SESSION_SAVE_SECONDS)
+        await save_psych_snapshots()
+
+
+async def start_psych_session_journal() -> None:
+    global PSYCH_JOURNAL_TASK
+    if not PSYCH_SESSION_PERSIST_ENABLED or PSYCH_JOURNAL_TASK is not None:
+        return
+    PSYCH_JOURNAL_TASK = asyncio.create_task(psych_journal_worker())
+    keys, pending = await asyncio.to_thread(scan_psych_snapshots)
+    PSYCH_SNAPSHOT_KEYS.update(key for key in keys if key not in PSYCH_SESSIONS)
+    # Sessions with unanswered messages are restored now so their listen timers fire again.
+    rearmed = sum(get_psych_session(*key) is not None for key in pending)
+    if keys:
+        print(f"Psych sessions: {len(keys)} snapshot(s) on disk, {rearmed} with buffered messages re-armed.")
+
+
+def get_psych_session(channel_id: int, user_id: int) -> PsychSession | None:
     key = psych_session_key(channel_id, user_id)
     session = PSYCH_SESSIONS.get(key)
     if session is None:
-        return None
-    last_activity = float(session.get("last_activity", 0.0))
-    if time.monotonic() - last_activity > _psych_ttl_seconds():
+        if key not in PSYCH_SNAPSHOT_KEYS:
+            return None
+        return restore_psych_session(key)
+    if time.monotonic() - session.last_activity > _psych_ttl_seconds():
         cancel_psych_flush(channel_id, user_id)
         PSYCH_SESSIONS.pop(key, None)
-        PSYCH_SESSION_LOCKS.pop(key, None)
+        mark_psych_session_dirty(key, None)
         return None
     return session
 
 
-def start_psych_session(channel_id: int, user_id: int) -> dict[str, object]:
+def start_psych_session(channel_id: int, user_id: int) -> PsychSession:
     key = psych_session_key(channel_id, user_id)
     now = time.monotonic()
-    session = {
-        "created_at": now,
-        "last_activity": now,
-        "turns": 0,
-        "history": [],
-        "notes": "",
-        "phase": "assessment",
-        "buffer": [],
-        "buffer_started_at": None,
-        "question_count": 0,
-        "last_solution_at": None,
-        "listening": True,
-    }
+    session = PsychSession(created_at=now, last_activity=now)
+    PSYCH_SNAPSHOT_KEYS.discard(key)
     PSYCH_SESSIONS[key] = session
+    mark_psych_session_dirty(key, session)
     return session
 
 
 def stop_psych_session(channel_id: int, user_id: int) -> None:
-    cancel_psych_flush(channel_id, user_id)
     key = psych_session_key(channel_id, user_id)
+    cancel_psych_flush(channel_id, user_id)
+    PSYCH_SNAPSHOT_KEYS.discard(key)
     PSYCH_SESSIONS.pop(key, None)
-    PSYCH_SESSION_LOCKS.pop(key, None)
+    mark_psych_session_dirty(key, None)
 
 
 def reset_psych_session(channel_id: int, user_id: int) -> bool:
@@ -1375,16 +2528,18 @@ def reset_psych_session(channel_id: int, user_id: int) -> bool:
     if session is None:
         return False
     cancel_psych_flush(channel_id, user_id)
-    session["history"] = []
-    session["notes"] = ""
-    session["turns"] = 0
-    session["phase"] = "assessment"
-    session["buffer"] = []
-    session["buffer_started_at"] = None
-    session["question_count"] = 0
-    session["last_solution_at"] = None
-    session["listening"] = True
-    session["last_activity"] = time.monotonic()
+    session.history.clear()
+    session.history_tokens = 0
+    session.notes = ""
+    session.turns = 0
+    session.phase = "assessment"
+    session.buffer.clear()
+    session.buffer_started_at = None
+    session.question_count = 0
+    session.last_solution_at = None
+    session.listening = True
+    session.last_activity = time.monotonic()
+    mark_psych_session_dirty(psych_session_key(channel_id, user_id), session)
     return True
 
 
@@ -1398,18 +2553,15 @@ def append_psych_buffer(channel_id: int, user_id: int, message_text: str) -> boo
         return False
     normalized = normalized[:900]
 
-    buffer = session.get("buffer")
-    if not isinstance(buffer, list):
-        buffer = []
-        session["buffer"] = buffer
-
+    buffer = session.buffer
     if not buffer:
-        session["buffer_started_at"] = time.monotonic()
+        session.buffer_started_at = time.monotonic()
     buffer.append(normalized)
     if len(buffer) > PSYCH_MAX_BUFFERED_MESSAGES:
         del buffer[: len(buffer) - PSYCH_MAX_BUFFERED_MESSAGES]
 
-    session["last_activity"] = time.monotonic()
+    session.last_activity = time.monotonic()
+    mark_psych_session_dirty(psych_session_key(channel_id, user_id), session)
     return True
 
 
@@ -1430,12 +2582,11 @@ def _get_psych_status_text(channel_id: int, user_id: int, display_name: str) ->
             f"Start with `{PREFIX}psych start <how you feel>` or `bell psych start ...`."
         )
 
-    ttl_seconds = _psych_ttl_seconds() - int(time.monotonic() - float(session.get("last_activity", 0.0)))
-    turns = int(session.get("turns", 0))
-    notes = str(session.get("notes", "")).strip()
-    phase = str(session.get("phase", "assessment")).strip() or "assessment"
-    buffered = session.get("buffer")
-    buffered_count = len(buffered) if isinstance(buffered, list) else 0
+    ttl_seconds = _psych_ttl_seconds() - int(time.monotonic() - session.last_activity)
+    turns = session.turns
+    notes = session.notes.strip()
+    phase = session.phase
+    buffered_count = len(session.buffer)
     focus = notes.split(".")[0].strip() if notes else "getting to know your situation"
     focus = focus[:180]
     return (
@@ -1488,7 +2639,7 @@ def _parse_psych_ai_payload(raw_text: str, current_notes: str) -> tuple[str, str
 
 
 def _apply_psych_turn_update(
-    session: dict[str, object],
+    session: PsychSession,
     *,
     user_input: str,
     assistant_reply: str,
@@ -1496,30 +2647,36 @@ def _apply_psych_turn_update(
     asked_question: bool = False,
     solution_mode: bool = False,
 ) -> None:
-    history = session.get("history")
-    if not isinstance(history, list):
-        history = []
-        session["history"] = history
-    history_context = history[-(AI_MAX_HISTORY * 2) :]
-    session["history"] = [
-        *history_context,
-        {"role": "user", "content": user_input},
-        {"role": "assistant", "content": assistant_reply},
-    ]
-    session["notes"] = updated_notes
-    session["turns"] = int(session.get("turns", 0)) + 1
+    add_psych_history(session, "user", user_input)
+    add_psych_history(session, "assistant", assistant_reply)
+    trim_psych_history(session)
+    session.notes = updated_notes
+    session.turns += 1
     if asked_question:
-        session["question_count"] = int(session.get("question_count", 0)) + 1
+        session.question_count += 1
     if solution_mode:
-        session["last_solution_at"] = time.monotonic()
-        session["phase"] = "solution"
+        session.last_solution_at = time.monotonic()
+        session.phase = "solution"
     else:
-        session["phase"] = "assessment"
-    session["last_activity"] = time.monotonic()
+        session.phase = "assessment"
+    session.last_activity = time.monotonic()
+
+
+def add_psych_history(session: PsychSession, role: str, content: str) -> None:
+    tokens = estimate_tokens(content)
+    session.history.append((role, content, tokens))
+    session.history_tokens += tokens
 
 
-def apply_psych_crisis_reply(session: dict[str, object], user_input: str) -> str:
-    current_notes = str(session.get("notes", "")).strip()
+def trim_psych_history(session: PsychSession) -> None:
+    # Same count and token caps as ConversationMemory; `notes` is this mode's rolling summary.
+    session.history_tokens = trim_turns(
+        session.history, session.history_tokens, AI_MAX_HISTORY * 2, AI_MEMORY_TOKEN_BUDGET
+    )
+
+
+def apply_psych_crisis_reply(session: PsychSession, user_input: str) -> str:
+    current_notes = session.notes.strip()
     reply = _build_crisis_psych_reply()
     updated_notes = (
         f"{current_notes} Crisis risk language detected; advised immediate emergency and trusted-person support."
@@ -1536,18 +2693,14 @@ def apply_psych_crisis_reply(session: dict[str, object], user_input: str) -> str
 
 
 async def _build_psych_phase_reply(
-    session: dict[str, object],
+    session: PsychSession,
     *,
     user_display_name: str,
     user_input: str,
     phase: Literal["assessment", "solution"],
 ) -> str:
-    history = session.get("history")
-    if not isinstance(history, list):
-        history = []
-        session["history"] = history
-    history_context = history[-(AI_MAX_HISTORY * 2) :]
-    current_notes = str(session.get("notes", "")).strip()
+    history_context = [{"role": role, "content": content} for role, content, _ in session.history]
+    current_notes = session.notes.strip()
 
     if phase == "solution":
         phase_instructions = (
@@ -1607,7 +2760,7 @@ async def _build_psych_phase_reply(
 
 
 async def build_psych_assessment_reply(
-    session: dict[str, object],
+    session: PsychSession,
     *,
     user_display_name: str,
     user_input: str,
@@ -1621,7 +2774,7 @@ async def build_psych_assessment_reply(
 
 
 async def build_psych_solution_reply(
-    session: dict[str, object],
+    session: PsychSession,
     *,
     user_display_name: str,
     user_input: str,
@@ -1640,26 +2793,21 @@ def schedule_psych_flush(
     channel: discord.abc.Messageable,
     user_display_name: str,
 ) -> None:
-    cancel_psych_flush(channel_id, user_id)
-    key = psych_session_key(channel_id, user_id)
-
-    async def _runner() -> None:
-        try:
-            await asyncio.sleep(PSYCH_LISTEN_WINDOW_SECONDS)
-            await flush_psych_buffer(
-                channel_id=channel_id,
-                user_id=user_id,
-                channel=channel,
-                user_display_name=user_display_name,
-            )
-        except asyncio.CancelledError:
-            return
-        finally:
-            active = PSYCH_PENDING_TASKS.get(key)
-            if active is asyncio.current_task():
-                PSYCH_PENDING_TASKS.pop(key, None)
-
-    PSYCH_PENDING_TASKS[key] = asyncio.create_task(_runner())
+    session = PSYCH_SESSIONS.get(psych_session_key(channel_id, user_id))
+    if session is not None:
+        session.display_name = user_display_name
+    # Re-arming on every buffered message just moves the deadline; a flush already talking to
+    # the AI keeps running and the next one waits for its lock.
+    TIMERS.schedule(
+        ("psych", channel_id, user_id),
+        PSYCH_LISTEN_WINDOW_SECONDS,
+        lambda: flush_psych_buffer(
+            channel_id=channel_id,
+            user_id=user_id,
+            channel=channel,
+            user_display_name=user_display_name,
+        ),
+    )
 
 
 async def flush_psych_buffer(
@@ -1673,20 +2821,19 @@ async def flush_psych_buffer(
     reply_to_send: str | None = None
     auto_stop = False
 
-    lock = PSYCH_SESSION_LOCKS[key]
+    lock = PSYCH_SESSIONS.lock(key)
     async with lock:
         session = get_psych_session(channel_id, user_id)
         if session is None:
             return
 
-        buffered = session.get("buffer")
-        if not isinstance(buffered, list) or not buffered:
+        if not session.buffer:
             return
 
-        combined_user_turn = "\n".join(str(item) for item in buffered if str(item).strip()).strip()
-        session["buffer"] = []
-        session["buffer_started_at"] = None
-        session["last_activity"] = time.monotonic()
+        combined_user_turn = "\n".join(item for item in session.buffer if item.strip()).strip()
+        session.buffer.clear()
+        session.buffer_started_at = None
+        session.last_activity = time.monotonic()
         if not combined_user_turn:
             return
 
@@ -1714,7 +2861,8 @@ async def flush_psych_buffer(
                 print(f"[PSYCH MODE FLUSH ERROR] {error}")
                 reply_to_send = friendly_ai_error(error)
 
-        auto_stop = int(session.get("turns", 0)) >= PSYCH_MAX_TURNS
+        mark_psych_session_dirty(key, session)
+        auto_stop = session.turns >= PSYCH_MAX_TURNS
         if auto_stop:
             stop_psych_session(channel_id, user_id)
 
@@ -1777,7 +2925,8 @@ async def run_psych_action_for_user(
     if session is None:
         session = start_psych_session(channel_id, user_id)
     else:
-        session["last_activity"] = time.monotonic()
+        session.last_activity = time.monotonic()
+        mark_psych_session_dirty(key, session)
 
     opener = (
         "Psych support mode is active. I am your supportive assistant, not a substitute for professional care.\n"
@@ -1826,18 +2975,17 @@ async def handle_active_psych_session_turn(message: discord.Message) -> bool:
     if PSYCH_CRISIS_STRICT and detect_crisis_risk(user_text):
         key = psych_session_key(message.channel.id, message.author.id)
         cancel_psych_flush(message.channel.id, message.author.id)
-        lock = PSYCH_SESSION_LOCKS[key]
+        lock = PSYCH_SESSIONS.lock(key)
         async with lock:
             current_session = get_psych_session(message.channel.id, message.author.id)
             if current_session is None:
                 return False
-            buffered = current_session.get("buffer")
-            buffered_lines = buffered if isinstance(buffered, list) else []
-            combined = "\n".join([*buffered_lines, user_text]).strip()
-            current_session["buffer"] = []
-            current_session["buffer_started_at"] = None
+            combined = "\n".join([*current_session.buffer, user_text]).strip()
+            current_session.buffer.clear()
+            current_session.buffer_started_at = None
             reply = apply_psych_crisis_reply(current_session, combined or user_text)
-            auto_stop = int(current_session.get("turns", 0)) >= PSYCH_MAX_TURNS
+            mark_psych_session_dirty(key, current_session)
+            auto_stop = current_session.turns >= PSYCH_MAX_TURNS
             if auto_stop:
                 stop_psych_session(message.channel.id, message.author.id)
         if auto_stop:
@@ -1888,45 +3036,101 @@ def argument_stop_requested(text: str) -> bool:
     ) or lowered.strip() in {"stop", "stop it", "to stop", "please stop"}
 
 
-def get_argument_session(channel_id: int, user_id: int) -> dict[str, object] | None:
+def get_argument_session(channel_id: int, user_id: int) -> ArgumentSession | None:
     key = (channel_id, user_id)
     session = ARGUMENT_MODE_SESSIONS.get(key)
     if session is None:
         return None
 
-    last_activity = float(session.get("last_activity", 0.0))
-    if time.monotonic() - last_activity > ARGUMENT_MODE_TIMEOUT_MINUTES * 60:
+    if time.monotonic() - session.last_activity > ARGUMENT_MODE_TIMEOUT_MINUTES * 60:
         ARGUMENT_MODE_SESSIONS.pop(key, None)
         return None
     return session
 
 
 def start_argument_session(channel_id: int, user_id: int, topic: str, side: str) -> None:
-    ARGUMENT_MODE_SESSIONS[(channel_id, user_id)] = {
-        "topic": topic[:260],
-        "side": side,
-        "turns": 0,
-        "history": [],
-        "last_activity": time.monotonic(),
-    }
+    ARGUMENT_MODE_SESSIONS[(channel_id, user_id)] = ArgumentSession(
+        topic=topic[:260], side=side, last_activity=time.monotonic()
+    )
 
 
 def stop_argument_session(channel_id: int, user_id: int) -> None:
     ARGUMENT_MODE_SESSIONS.pop((channel_id, user_id), None)
 
 
+async def session_sweeper_worker() -> None:
+    while True:
+        await asyncio.sleep(SESSION_SWEEP_SECONDS)
+        now = time.monotonic()
+        for store in SESSION_STORES:
+            try:
+                dropped = store.sweep(now)
+            except Exception as error:
+                print(f"[SESSION SWEEP ERROR] {store.name}: {error}")
+                continue
+            if dropped:
+                print(f"[SESSION SWEEP] {store.name}: dropped {dropped} idle session(s), {len(store)} left.")
+
+
+def start_session_sweeper() -> None:
+    global SESSION_SWEEP_TASK
+    if SESSION_SWEEP_TASK is None:
+        SESSION_SWEEP_TASK = asyncio.create_task(session_sweeper_worker())
+
+
+async def summarize_conversation_memory(memory: ConversationMemory) -> None:
+    try:
+        while memory.pending:
+            turns, memory.pending = memory.pending, []
+            transcript = "\n".join(f"{role}: {content[:1200]}" for role, content, _ in turns)
+            prompt = (
+                f"Earlier summary: {memory.summary or '(none)'}\n\n"
+                f"Older messages to fold in:\n{transcript}\n\n"
+                "Rewrite the summary to include these messages. Keep names, facts, decisions, open "
+                f"questions and the user's preferences. Plain text, at most {AI_MEMORY_SUMMARY_TOKENS * 3 // 4} words."
+            )
+            try:
+                summary = await request_ai_completion(
+                    [
+                        {"role": "system", "content": "You compress chat history into a short factual summary."},
+                        {"role": "user", "content": prompt},
+                    ],
+                    max_tokens=AI_MEMORY_SUMMARY_TOKENS,
+                    temperature=0.2,
+                )
+            except Exception as error:
+                AI_MEMORY_STATS["failed"] += 1
+                # Requeued for the next eviction to retry; the cap keeps a dead endpoint from growing it forever.
+                memory.pending = (turns + memory.pending)[-AI_MAX_HISTORY * 4 :]
+                print(f"[AI MEMORY SUMMARY ERROR] {error}; {len(memory.pending)} turn(s) kept for retry")
+                return
+            memory.summary = " ".join(summary.split())[: AI_MEMORY_SUMMARY_TOKENS * 4]
+            AI_MEMORY_STATS["summaries"] += 1
+            AI_MEMORY_STATS["turns_summarized"] += len(turns)
+    finally:
+        memory.summarizing = False
+
+
 def append_conversation_history(
-    cache: dict[tuple[int, int], list[dict[str, str]]],
-    key: tuple[int, int],
+    cache: dict | SessionStore,
+    key: object,
     user_prompt: str,
     assistant_reply: str,
 ) -> None:
-    history = cache[key]
-    history.append({"role": "user", "content": user_prompt})
-    history.append({"role": "assistant", "content": assistant_reply})
-    max_entries = max(2, AI_MAX_HISTORY * 2)
-    if len(history) > max_entries:
-        cache[key] = history[-max_entries:]
+    memory = cache[key]
+    memory.add("user", user_prompt)
+    memory.add("assistant", assistant_reply)
+    evicted = memory.trim(max(2, AI_MAX_HISTORY * 2), AI_MEMORY_TOKEN_BUDGET)
+    if evicted and AI_MEMORY_SUMMARY_ENABLED:
+        # Summarized off the reply path; later evictions queue up behind a running summary.
+        memory.pending.extend(evicted)
+        if not memory.summarizing:
+            memory.summarizing = True
+            task = asyncio.create_task(summarize_conversation_memory(memory))
+            AI_MEMORY_TASKS.add(task)
+            task.add_done_callback(AI_MEMORY_TASKS.discard)
+    # Always reassigned so a SessionStore sees the activity and keeps the entry alive.
+    cache[key] = memory
 
 
 async def is_reply_to_bot_message(message: discord.Message) -> bool:
@@ -2103,14 +3307,9 @@ async def handle_active_argument_mode_turn(message: discord.Message) -> bool:
     if not user_point:
         return False
 
-    topic = str(session.get("topic", "the topic"))
-    side = str(session.get("side", "PRO"))
-    history = session.get("history")
-    if not isinstance(history, list):
-        history = []
-        session["history"] = history
-
-    history_text = "\n".join(str(line)[:260] for line in history[-8:])
+    topic = session.topic
+    side = session.side
+    history_text = "\n".join(line[:260] for line in session.history)
     prompt = (
         "You are in an ongoing Discord argument mode.\n"
         "Counter the user's latest point directly.\n"
@@ -2134,12 +3333,12 @@ async def handle_active_argument_mode_turn(message: discord.Message) -> bool:
             await message.channel.send(friendly_ai_error(error))
             return True
 
-    history.append(f"User: {user_point[:220]}")
-    history.append(f"Bell: {reply[:220]}")
-    session["turns"] = int(session.get("turns", 0)) + 1
-    session["last_activity"] = time.monotonic()
+    session.history.append(f"User: {user_point[:220]}")
+    session.history.append(f"Bell: {reply[:220]}")
+    session.turns += 1
+    session.last_activity = time.monotonic()
 
-    if int(session["turns"]) >= ARGUMENT_MODE_MAX_TURNS:
+    if session.turns >= ARGUMENT_MODE_MAX_TURNS:
         stop_argument_session(message.channel.id, message.author.id)
         await send_chunked(
             message.channel,
@@ -2432,7 +3631,8 @@ async def handle_conversational_request(message: discord.Message) -> bool:
         return True
 
     chat_key = (message.channel.id, message.author.id)
-    history = CONVERSATIONAL_AI_CACHE.get(chat_key, [])[-(AI_MAX_HISTORY * 2) :]
+    memory = CONVERSATIONAL_AI_CACHE.get(chat_key)
+    history = memory.messages() if memory is not None else []
     ai_messages = [{"role": "system", "content": AI_SYSTEM_PROMPT}, *history]
     ai_messages.append({"role": "user", "content": text})
     async with message.channel.typing():
@@ -2476,63 +3676,286 @@ def is_url(value: str) -> bool:
     return value.startswith("http://") or value.startswith("https://")
 
 
-async def ytdlp_extract(query: str) -> dict:
-    if yt_dlp is None:
-        raise RuntimeError("`yt-dlp` is not installed. Install requirements first.")
-
-    options = dict(YTDL_BASE_OPTIONS)
-
-    def _extract() -> dict:
-        with yt_dlp.YoutubeDL(options) as ydl:
-            return ydl.extract_info(query, download=False)
-
-    return await asyncio.to_thread(_extract)
-
-
-async def ytdlp_extract_stream(query: str) -> dict:
-    if yt_dlp is None:
-        raise RuntimeError("`yt-dlp` is not installed. Install requirements first.")
-
-    option_sets = [
+YTDL_STREAM_OPTION_SETS = (
+    (
+        "stream-web",
         {
             **YTDL_BASE_OPTIONS,
             "format": "bestaudio/best",
             "noplaylist": True,
             "extractor_args": {"youtube": {"player_client": ["web"]}},
         },
+    ),
+    (
+        "stream-ios",
         {
             **YTDL_BASE_OPTIONS,
             "format": "bestaudio/best",
             "noplaylist": True,
             "extractor_args": {"youtube": {"player_client": ["ios"]}},
         },
+    ),
+    (
+        "stream-best",
         {
             **YTDL_BASE_OPTIONS,
             "format": "best",
             "noplaylist": True,
         },
-    ]
+    ),
+)
+YTDL_EXECUTOR: ThreadPoolExecutor | None = None
+YTDL_PROCESS_POOL: ProcessPoolExecutor | None = None
+YTDL_PROCESS_START_METHOD = "spawn"
+YTDL_THREAD_STATE = threading.local()
+YTDL_STATS = {"pending": 0, "completed": 0, "failed": 0, "restarts": 0, "total_seconds": 0.0}
+YTDL_SLIM_KEYS = (
+    "id",
+    "title",
+    "webpage_url",
+    "url",
+    "extractor_key",
+    "duration",
+    "is_live",
+    "ext",
+    "acodec",
+    "vcodec",
+    "abr",
+    "tbr",
+    "asr",
+)
 
-    last_error: Exception | None = None
-    for options in option_sets:
-        try:
-            def _extract() -> dict:
-                with yt_dlp.YoutubeDL(options) as ydl:
-                    return ydl.extract_info(query, download=False)
 
-            return await asyncio.to_thread(_extract)
-        except Exception as error:
-            last_error = error
-            continue
+def get_ytdl_executor() -> ThreadPoolExecutor:
+    # Extraction gets its own pool so long yt-dlp calls cannot starve asyncio.to_thread users
+    # (Spotify, archive and JSON writes) sharing the default executor.
+    global YTDL_EXECUTOR
+    if YTDL_EXECUTOR is None:
+        YTDL_EXECUTOR = ThreadPoolExecutor(max_workers=MUSIC_EXTRACT_WORKERS, thread_name_prefix="ytdlp")
+    return YTDL_EXECUTOR
 
-    raise RuntimeError(last_error or "yt-dlp could not extract stream data.")
 
+def _thread_ytdl(name: str, options: dict):
+    # YoutubeDL is not thread-safe, so each worker thread keeps its own instance per option set
+    # and reuses it across calls instead of re-initializing extractors every time.
+    instances = getattr(YTDL_THREAD_STATE, "instances", None)
+    if instances is None:
+        instances = YTDL_THREAD_STATE.instances = {}
+    ydl = instances.get(name)
+    if ydl is None:
+        ydl = instances[name] = yt_dlp.YoutubeDL(options)
+    return ydl
 
-def track_from_ytdlp_entry(entry: dict, requester_id: int) -> MusicTrack | None:
-    if not entry:
-        return None
-    title = entry.get("title") or "Unknown title"
-    webpage_url = entry.get("webpage_url") or entry.get("url") or ""
+
+def _run_ytdlp(name: str, options: dict, query: str) -> dict:
+    try:
+        return _thread_ytdl(name, options).extract_info(query, download=False)
+    except Exception:
+        # Drop the instance in case the failure left it in a bad state.
+        getattr(YTDL_THREAD_STATE, "instances", {}).pop(name, None)
+        raise
+
+
+def slim_ytdlp_info(info: object) -> dict:
+    # Only the fields the music code reads, so process-pool results stay cheap to pickle.
+    if not isinstance(info, dict):
+        return {}
+    slim = {key: info[key] for key in YTDL_SLIM_KEYS if key in info}
+    for key in ("requested_formats", "formats"):
+        items = info.get(key)
+        if isinstance(items, list):
+            slim[key] = [
+                {field_name: item[field_name] for field_name in YTDL_SLIM_KEYS if field_name in item}
+                for item in items
+                if isinstance(item, dict)
+            ]
+    entries = info.get("entries")
+    if entries is not None:
+        slim["entries"] = [slim_ytdlp_info(entry) for entry in list(entries) if isinstance(entry, dict)]
+    return slim
+
+
+def _init_ytdl_process() -> None:
+    # Runs once in each worker process: pay the yt-dlp import and extractor setup up front.
+    if yt_dlp is None:
+        return
+    _thread_ytdl("search", YTDL_BASE_OPTIONS)
+    for name, options in YTDL_STREAM_OPTION_SETS:
+        _thread_ytdl(name, options)
+
+
+def _ping_ytdl_process() -> int:
+    return os.getpid()
+
+
+def _process_run_ytdlp(name: str, options: dict, query: str) -> dict:
+    try:
+        return slim_ytdlp_info(_run_ytdlp(name, options, query))
+    except Exception as error:
+        # yt-dlp exceptions do not always survive pickling; send back a plain error.
+        raise RuntimeError(str(error)) from None
+
+
+def get_ytdl_process_pool() -> ProcessPoolExecutor:
+    global YTDL_PROCESS_POOL
+    if YTDL_PROCESS_POOL is None:
+        YTDL_PROCESS_POOL = ProcessPoolExecutor(
+            max_workers=MUSIC_EXTRACT_WORKERS,
+            mp_context=multiprocessing.get_context(YTDL_PROCESS_START_METHOD),
+            initializer=_init_ytdl_process,
+        )
+    return YTDL_PROCESS_POOL
+
+
+def restart_ytdl_process_pool(broken: ProcessPoolExecutor) -> None:
+    global YTDL_PROCESS_POOL
+    if YTDL_PROCESS_POOL is not broken:
+        return
+    YTDL_PROCESS_POOL = None
+    YTDL_STATS["restarts"] += 1
+    broken.shutdown(wait=False, cancel_futures=True)
+    print("[YTDLP] Worker process died; restarting extraction pool.")
+
+
+async def warm_ytdl_process_pool() -> None:
+    if MUSIC_EXTRACT_BACKEND != "process" or yt_dlp is None:
+        return
+    loop = asyncio.get_running_loop()
+    pool = get_ytdl_process_pool()
+    try:
+        await asyncio.gather(
+            *(loop.run_in_executor(pool, _ping_ytdl_process) for _ in range(MUSIC_EXTRACT_WORKERS))
+        )
+        print(f"yt-dlp process pool ready ({MUSIC_EXTRACT_WORKERS} workers).")
+    except BrokenProcessPool:
+        restart_ytdl_process_pool(pool)
+
+
+async def _run_ytdlp_in_process(name: str, options: dict, query: str) -> dict:
+    loop = asyncio.get_running_loop()
+    for attempt in range(2):
+        pool = get_ytdl_process_pool()
+        try:
+            return await loop.run_in_executor(pool, _process_run_ytdlp, name, options, query)
+        except BrokenProcessPool:
+            restart_ytdl_process_pool(pool)
+            if attempt:
+                raise RuntimeError("yt-dlp worker process crashed.") from None
+    raise RuntimeError("yt-dlp worker process crashed.")
+
+
+async def run_ytdlp(name: str, options: dict, query: str) -> dict:
+    if yt_dlp is None:
+        raise RuntimeError("`yt-dlp` is not installed. Install requirements first.")
+    YTDL_STATS["pending"] += 1
+    started = time.perf_counter()
+    failed = True
+    try:
+        if MUSIC_EXTRACT_BACKEND == "process":
+            result = await _run_ytdlp_in_process(name, options, query)
+        else:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(get_ytdl_executor(), _run_ytdlp, name, options, query)
+        failed = False
+        return result
+    finally:
+        YTDL_STATS["pending"] -= 1
+        YTDL_STATS["failed" if failed else "completed"] += 1
+        YTDL_STATS["total_seconds"] += time.perf_counter() - started
+
+
+async def ytdlp_extract(query: str) -> dict:
+    return await run_ytdlp("search", YTDL_BASE_OPTIONS, query)
+
+
+def format_strategy_domain(query: str) -> str:
+    host = (urlparse(query).hostname or "").lower() if is_url(query) else ""
+    if not host:
+        return "search"
+    if host == "youtu.be":
+        return "youtube.com"
+    return ".".join(host.split(".")[-2:])
+
+
+def ordered_stream_option_sets(domain: str) -> list[tuple[str, dict]]:
+    stats = FORMAT_STRATEGIES[domain]
+    # Stable sort: ties keep the default web -> ios -> best order.
+    ordered = sorted(
+        YTDL_STREAM_OPTION_SETS,
+        key=lambda item: -stats[item[0]].success_rate if item[0] in stats else -0.5,
+    )
+    now = time.time()
+    if now - FORMAT_REPROBE_AT.setdefault(domain, now) < MUSIC_FORMAT_REPROBE_SECONDS:
+        return ordered
+    stale = [
+        item
+        for item in ordered[1:]
+        if now - (stats[item[0]].last_attempt if item[0] in stats else 0.0) >= MUSIC_FORMAT_REPROBE_SECONDS
+    ]
+    if not stale or ordered[0][0] not in stats:
+        return ordered
+    # Occasionally lead with a strategy that has not run for a while so a recovered client can win back first place.
+    probe = min(stale, key=lambda item: stats[item[0]].last_attempt if item[0] in stats else 0.0)
+    FORMAT_REPROBE_AT[domain] = now
+    ordered.remove(probe)
+    return [probe, *ordered]
+
+
+async def ytdlp_extract_stream(query: str) -> dict:
+    if yt_dlp is None:
+        raise RuntimeError("`yt-dlp` is not installed. Install requirements first.")
+
+    domain = format_strategy_domain(query)
+    stats = FORMAT_STRATEGIES[domain]
+    failed: list[str] = []
+    last_error: Exception | None = None
+    for name, options in ordered_stream_option_sets(domain):
+        try:
+            info = await run_ytdlp(name, options, query)
+        except Exception as error:
+            failed.append(name)
+            last_error = error
+            continue
+        # Only learn when some strategy worked; if all fail the video itself is the problem.
+        for failed_name in failed:
+            stats.setdefault(failed_name, FormatStrategyStats()).record(False)
+        stats.setdefault(name, FormatStrategyStats()).record(True)
+        return info
+
+    raise RuntimeError(last_error or "yt-dlp could not extract stream data.")
+
+
+def format_strategy_stats_lines() -> list[str]:
+    lines = []
+    for domain, stats in sorted(FORMAT_STRATEGIES.items()):
+        if not stats:
+            continue
+        ranked = sorted(stats.items(), key=lambda item: -item[1].success_rate)
+        parts = [f"{name} `{entry.success_rate * 100:.0f}%` ({len(entry.outcomes)})" for name, entry in ranked]
+        lines.append(f"{domain}: " + " > ".join(parts))
+    return lines
+
+
+def ytdl_stats_line() -> str:
+    finished = YTDL_STATS["completed"] + YTDL_STATS["failed"]
+    average = YTDL_STATS["total_seconds"] / max(1, finished)
+    active = min(YTDL_STATS["pending"], MUSIC_EXTRACT_WORKERS)
+    queued = YTDL_STATS["pending"] - active
+    line = (
+        f"{MUSIC_EXTRACT_BACKEND} backend, `{MUSIC_EXTRACT_WORKERS}` workers, `{active}` active, "
+        f"`{queued}` queued, `{YTDL_STATS['completed']}` ok / `{YTDL_STATS['failed']}` failed, "
+        f"avg `{average:.2f}s`"
+    )
+    if MUSIC_EXTRACT_BACKEND == "process":
+        line += f", `{YTDL_STATS['restarts']}` pool restart(s)"
+    return line
+
+
+def track_from_ytdlp_entry(entry: dict, requester_id: int) -> MusicTrack | None:
+    if not entry:
+        return None
+    title = entry.get("title") or "Unknown title"
+    webpage_url = entry.get("webpage_url") or entry.get("url") or ""
 
     if webpage_url and not str(webpage_url).startswith("http"):
         video_id = entry.get("id")
@@ -2548,7 +3971,81 @@ def track_from_ytdlp_entry(entry: dict, requester_id: int) -> MusicTrack | None:
     )
 
 
+def music_metadata_cache_key(query: str) -> str:
+    if is_url(query):
+        return query.strip()
+    return " ".join(query.lower().split())
+
+
+def load_music_metadata_cache() -> int:
+    MUSIC_METADATA_CACHE.entries.clear()
+    payload = read_json(MUSIC_METADATA_CACHE_FILE)
+    now = time.time()
+    entries = payload.get("entries") if isinstance(payload, dict) else None
+    if not isinstance(entries, list):
+        return 0
+    for item in entries[-MUSIC_METADATA_CACHE_MAX_ENTRIES:]:
+        if not isinstance(item, dict):
+            continue
+        key = item.get("key")
+        expires_at = item.get("expires_at")
+        tracks = item.get("tracks")
+        if not isinstance(key, str) or not isinstance(expires_at, (int, float)) or not isinstance(tracks, list):
+            continue
+        if expires_at <= now or not tracks:
+            continue
+        if not all(
+            isinstance(track, dict) and isinstance(track.get("title"), str) and isinstance(track.get("webpage_url"), str)
+            for track in tracks
+        ):
+            continue
+        MUSIC_METADATA_CACHE.entries[key] = (float(expires_at), tracks)
+    return len(MUSIC_METADATA_CACHE.entries)
+
+
+async def save_music_metadata_cache() -> None:
+    global MUSIC_METADATA_CACHE_DIRTY, MUSIC_METADATA_CACHE_SAVED_AT
+    if not MUSIC_METADATA_CACHE_DIRTY:
+        return
+    MUSIC_METADATA_CACHE_DIRTY = False
+    MUSIC_METADATA_CACHE_SAVED_AT = time.monotonic()
+    payload = {
+        "entries": [
+            {"key": key, "expires_at": expires_at, "tracks": tracks}
+            for key, (expires_at, tracks) in MUSIC_METADATA_CACHE.entries.items()
+        ]
+    }
+    try:
+        await asyncio.to_thread(write_json_atomic, MUSIC_METADATA_CACHE_FILE, payload)
+    except OSError as error:
+        MUSIC_METADATA_CACHE_DIRTY = True
+        print(f"[MUSIC CACHE SAVE ERROR] {error}")
+
+
+async def music_metadata_cache_saver() -> None:
+    # At most one write every 30 s; anything cached meanwhile (or a failed write) is picked up by
+    # the trailing save instead of waiting for the next lookup.
+    while MUSIC_METADATA_CACHE_DIRTY:
+        await asyncio.sleep(max(0.0, MUSIC_METADATA_CACHE_SAVED_AT + 30 - time.monotonic()))
+        await save_music_metadata_cache()
+
+
+def mark_music_metadata_dirty() -> None:
+    global MUSIC_METADATA_CACHE_DIRTY, MUSIC_METADATA_CACHE_SAVE_TASK
+    MUSIC_METADATA_CACHE_DIRTY = True
+    if MUSIC_METADATA_CACHE_SAVE_TASK is None or MUSIC_METADATA_CACHE_SAVE_TASK.done():
+        MUSIC_METADATA_CACHE_SAVE_TASK = asyncio.create_task(music_metadata_cache_saver())
+
+
 async def youtube_query_to_tracks(query: str, requester_id: int) -> list[MusicTrack]:
+    cache_key = music_metadata_cache_key(query)
+    cached = MUSIC_METADATA_CACHE.get(cache_key)
+    if isinstance(cached, list) and cached:
+        return [
+            MusicTrack(title=item["title"], webpage_url=item["webpage_url"], requested_by=requester_id)
+            for item in cached
+        ]
+
     info = await ytdlp_extract(query)
     entries = info.get("entries")
     tracks: list[MusicTrack] = []
@@ -2568,10 +4065,26 @@ async def youtube_query_to_tracks(query: str, requester_id: int) -> list[MusicTr
 
     if not tracks:
         raise RuntimeError("No playable results found for that query.")
+
+    MUSIC_METADATA_CACHE.put(
+        cache_key,
+        [{"title": track.title, "webpage_url": track.webpage_url} for track in tracks],
+        time.time() + MUSIC_METADATA_CACHE_TTL_SECONDS,
+    )
+    mark_music_metadata_dirty()
     return tracks
 
 
-async def spotify_url_to_search_queries(url: str) -> tuple[list[str], str]:
+def spotify_track_entry(track_obj: dict) -> tuple[str, str] | None:
+    name = (track_obj or {}).get("name")
+    if not name:
+        return None
+    artists = ", ".join(a.get("name", "") for a in (track_obj or {}).get("artists", []) if a)
+    title = f"{name} - {artists}" if artists else name
+    return title[:200], f"{name} {artists} audio".strip()
+
+
+async def spotify_url_to_search_queries(url: str) -> tuple[list[tuple[str, str]], str]:
     client = get_spotify_client()
     if client is None:
         raise RuntimeError(
@@ -2586,17 +4099,17 @@ async def spotify_url_to_search_queries(url: str) -> tuple[list[str], str]:
             return client.track(track_id)
 
         track_obj = await asyncio.to_thread(_fetch_track)
-        name = (track_obj or {}).get("name", "Unknown track")
-        artists = ", ".join(a.get("name", "") for a in (track_obj or {}).get("artists", []) if a)
-        query = f"{name} {artists} audio".strip()
-        return [query], f"Spotify track: {name}"
+        entry = spotify_track_entry(track_obj)
+        if entry is None:
+            raise RuntimeError("Spotify track has no playable metadata.")
+        return [entry], f"Spotify track: {track_obj.get('name')}"
 
     playlist_match = SPOTIFY_PLAYLIST_RE.search(url)
     if playlist_match:
         playlist_id = playlist_match.group(1)
 
         def _fetch_playlist_queries():
-            queries: list[str] = []
+            queries: list[tuple[str, str]] = []
             offset = 0
             playlist_name = f"Spotify playlist {playlist_id}"
             while True:
@@ -2621,16 +4134,10 @@ async def spotify_url_to_search_queries(url: str) -> tuple[list[str], str]:
                         playlist_name = playlist_meta["name"]
                 items = payload.get("items", [])
                 for item in items:
-                    track_obj = (item or {}).get("track")
-                    if not track_obj:
+                    entry = spotify_track_entry((item or {}).get("track"))
+                    if entry is None:
                         continue
-                    name = track_obj.get("name")
-                    if not name:
-                        continue
-                    artists = ", ".join(
-                        a.get("name", "") for a in track_obj.get("artists", []) if a
-                    )
-                    queries.append(f"{name} {artists} audio".strip())
+                    queries.append(entry)
                     if len(queries) >= MUSIC_MAX_PLAYLIST_ITEMS:
                         return queries, playlist_name
                 if not payload.get("next"):
@@ -2646,27 +4153,105 @@ async def spotify_url_to_search_queries(url: str) -> tuple[list[str], str]:
     raise RuntimeError("Only Spotify track/playlist links are supported.")
 
 
-async def source_to_tracks(source: str, requester_id: int) -> tuple[list[MusicTrack], str | None]:
-    if SPOTIFY_TRACK_RE.search(source) or SPOTIFY_PLAYLIST_RE.search(source):
-        queries, label = await spotify_url_to_search_queries(source)
-        tracks: list[MusicTrack] = []
-        for q in queries:
-            result = await youtube_query_to_tracks(f"ytsearch1:{q}", requester_id)
-            if result:
-                tracks.append(result[0])
-        if not tracks:
-            raise RuntimeError("Could not map Spotify tracks to YouTube sources.")
-        return tracks, label
+def is_spotify_source(source: str) -> bool:
+    return bool(SPOTIFY_TRACK_RE.search(source) or SPOTIFY_PLAYLIST_RE.search(source))
+
 
+async def source_to_tracks(source: str, requester_id: int) -> list[MusicTrack]:
     query = source if is_url(source) else f"ytsearch1:{source}"
-    tracks = await youtube_query_to_tracks(query, requester_id)
-    return tracks, None
+    return await youtube_query_to_tracks(query, requester_id)
+
+
+async def _search_lazy_track(track: MusicTrack) -> None:
+    async with MUSIC_SEARCH_SEMAPHORE:
+        result = await youtube_query_to_tracks(f"ytsearch1:{track.search_query}", track.requested_by)
+    track.title = result[0].title
+    track.webpage_url = result[0].webpage_url
+    track.search_query = None
+
+
+async def resolve_lazy_track(track: MusicTrack) -> None:
+    if track.search_query is None:
+        return
+    key = id(track)
+    task = MUSIC_LAZY_TASKS.get(key)
+    if task is None:
+        task = asyncio.create_task(_search_lazy_track(track))
+        MUSIC_LAZY_TASKS[key] = task
+        task.add_done_callback(lambda _task: MUSIC_LAZY_TASKS.pop(key, None))
+    await asyncio.shield(task)
+
+
+async def queue_spotify_source(ctx: commands.Context, source: str) -> None:
+    try:
+        entries, label = await spotify_url_to_search_queries(source)
+    except Exception as error:
+        await ctx.send(f"Could not queue track(s): `{error}`")
+        return
+
+    # Every item is queued unresolved, in playlist order. The first MUSIC_SPOTIFY_EAGER_TRACKS are
+    # searched right away (bounded by MUSIC_SEARCH_SEMAPHORE) so playback can start and the
+    # status message can report misses; the tail is searched by the prefetcher just before it
+    # plays, so skipped or never-reached tracks cost nothing.
+    guild = ctx.guild
+    tracks = [
+        MusicTrack(title=title, webpage_url="", requested_by=ctx.author.id, search_query=query)
+        for title, query in entries
+    ]
+    MUSIC_QUEUES[guild.id].extend(tracks)
+    mark_music_queues_dirty()
+    eager = tracks[:MUSIC_SPOTIFY_EAGER_TRACKS] if len(tracks) > 1 else []
+    if eager:
+        searches = [asyncio.create_task(resolve_lazy_track(track)) for track in eager]
+        status = await ctx.send(
+            f"Queued `{len(tracks)}` tracks from **{label}**; finding the first `{len(eager)}` on YouTube..."
+        )
+    elif len(tracks) == 1:
+        await ctx.send(f"Queued: **{tracks[0].title}**")
+    else:
+        await ctx.send(f"Queued `{len(tracks)}` tracks from **{label}**.")
+
+    vc = guild.voice_client
+    if vc is not None and not vc.is_playing() and not vc.is_paused():
+        asyncio.create_task(play_next_track(guild))
+    else:
+        schedule_music_prefetch(guild.id)
+    if not eager:
+        return
+
+    found = 0
+    failed = 0
+    last_edit = time.monotonic()
+    for track, search in zip(eager, searches):
+        try:
+            await search
+            found += 1
+        except Exception as error:
+            failed += 1
+            print(f"[SPOTIFY MAP] {track.search_query!r}: {error}")
+        if time.monotonic() - last_edit >= 2.0:
+            last_edit = time.monotonic()
+            try:
+                await status.edit(content=f"Finding **{label}** on YouTube: `{found + failed}/{len(eager)}`...")
+            except discord.HTTPException:
+                pass
+
+    summary = f"Queued `{len(tracks)}` tracks from **{label}**."
+    if failed:
+        summary += f" `{failed}` of the first `{len(eager)}` could not be found on YouTube and will be skipped."
+    if len(tracks) > len(eager):
+        summary += f" The other `{len(tracks) - len(eager)}` are searched just before they play."
+    try:
+        await status.edit(content=summary)
+    except discord.HTTPException:
+        pass
 
 
-def extract_stream_url(info: dict) -> str | None:
+def extract_stream_format(info: dict) -> tuple[str | None, str]:
+    # Returns the audio URL plus its codec as reported by yt-dlp ("" when unknown).
     direct_url = info.get("url")
     if isinstance(direct_url, str) and direct_url.startswith(("http://", "https://")):
-        return direct_url
+        return direct_url, str(info.get("acodec") or "")
 
     requested_formats = info.get("requested_formats") or []
     for fmt in requested_formats:
@@ -2674,10 +4259,11 @@ def extract_stream_url(info: dict) -> str | None:
         if not fmt_url:
             continue
         if (fmt or {}).get("acodec") not in (None, "none"):
-            return str(fmt_url)
+            return str(fmt_url), str(fmt["acodec"])
 
     formats = info.get("formats") or []
     best_url = None
+    best_codec = ""
     best_score = None
     for fmt in formats:
         if not isinstance(fmt, dict):
@@ -2698,10 +4284,137 @@ def extract_stream_url(info: dict) -> str | None:
         if best_score is None or score > best_score:
             best_score = score
             best_url = str(fmt_url)
-    return best_url
+            best_codec = str(acodec)
+    return best_url, best_codec
 
 
-async def resolve_stream(track: MusicTrack) -> tuple[str, str, str]:
+def stream_url_expiry(stream_url: str) -> float:
+    # Signed googlevideo URLs carry their expiry as a unix timestamp, either as a query
+    # parameter or as an `/expire/<ts>/` path segment (manifest URLs).
+    parsed = urlparse(stream_url)
+    raw = (parse_qs(parsed.query).get("expire") or [""])[0]
+    if not raw:
+        match = STREAM_EXPIRE_PATH_RE.search(parsed.path)
+        raw = match.group(1) if match else ""
+    if raw.isdigit():
+        return float(raw)
+    return time.time() + MUSIC_STREAM_DEFAULT_TTL_SECONDS
+
+
+def audio_cache_key(webpage_url: str) -> str | None:
+    parsed = urlparse(webpage_url)
+    host = (parsed.hostname or "").lower()
+    if host == "youtu.be":
+        video_id = parsed.path.strip("/")
+    elif host.endswith("youtube.com"):
+        video_id = (parse_qs(parsed.query).get("v") or [""])[0]
+    else:
+        return None
+    return video_id if YOUTUBE_VIDEO_ID_RE.fullmatch(video_id) else None
+
+
+def cached_audio_stream(track: MusicTrack) -> ResolvedStream | None:
+    if not MUSIC_AUDIO_CACHE_ENABLED:
+        return None
+    key = audio_cache_key(track.webpage_url)
+    if key is None:
+        return None
+    path = MUSIC_AUDIO_CACHE.get(key)
+    if path is None:
+        return None
+    return ResolvedStream(
+        stream_url=str(path),
+        title=track.title,
+        webpage_url=track.webpage_url,
+        expires_at=float("inf"),
+        codec="opus",
+    )
+
+
+async def download_audio_to_cache(key: str, resolved: ResolvedStream) -> None:
+    target = MUSIC_AUDIO_CACHE.path(key)
+    partial = target.with_suffix(".part")
+    # Opus sources are copied packet-for-packet; anything else is encoded once here.
+    codec_args = ["-c:a", "copy"] if resolved.codec == "opus" else ["-c:a", "libopus", "-b:a", "128k"]
+    # ffmpeg stops at these limits itself, so a mislabelled livestream can't grow the .part file forever.
+    max_bytes = MUSIC_AUDIO_CACHE.max_bytes // 4
+    async with MUSIC_AUDIO_DOWNLOAD_SEMAPHORE:
+        try:
+            process = await asyncio.create_subprocess_exec(
+                FFMPEG_EXECUTABLE,
+                *(FFMPEG_OPTIONS["before_options"].split() if is_url(resolved.stream_url) else ()),
+                "-i",
+                resolved.stream_url,
+                "-vn",
+                "-map_metadata",
+                "-1",
+                *codec_args,
+                "-t",
+                str(int(resolved.duration) + 5),
+                "-fs",
+                str(max_bytes),
+                "-f",
+                "ogg",
+                "-loglevel",
+                "error",
+                "-y",
+                str(partial),
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            _, stderr = await process.communicate()
+            size = partial.stat().st_size if partial.exists() else 0
+            # Hitting -fs means the file was cut short, so it is not cached.
+            if process.returncode != 0 or size == 0 or size >= max_bytes:
+                raise RuntimeError(stderr.decode(errors="replace").strip()[-200:] or f"{size} bytes")
+            os.replace(partial, target)
+        except asyncio.CancelledError:
+            partial.unlink(missing_ok=True)
+            raise
+        except Exception as error:
+            partial.unlink(missing_ok=True)
+            MUSIC_AUDIO_CACHE.failures += 1
+            print(f"[AUDIO CACHE] Download failed for {key}: {error}")
+            return
+    MUSIC_AUDIO_CACHE.add(key, size)
+    MUSIC_AUDIO_CACHE.downloads += 1
+
+
+def note_audio_play(track: MusicTrack, resolved: ResolvedStream) -> None:
+    if not MUSIC_AUDIO_CACHE_ENABLED or not FFMPEG_EXECUTABLE or not is_url(resolved.stream_url):
+        return
+    if resolved.duration <= 0:
+        return
+    key = audio_cache_key(track.webpage_url)
+    if key is None:
+        return
+    MUSIC_AUDIO_PLAYS[key] += 1
+    if len(MUSIC_AUDIO_PLAYS) > 20000:
+        popular = MUSIC_AUDIO_PLAYS.most_common(10000)
+        MUSIC_AUDIO_PLAYS.clear()
+        MUSIC_AUDIO_PLAYS.update(dict(popular))
+    if (
+        MUSIC_AUDIO_PLAYS[key] < MUSIC_AUDIO_CACHE_MIN_PLAYS
+        or key in MUSIC_AUDIO_CACHE.entries
+        or key in MUSIC_AUDIO_DOWNLOADS
+    ):
+        return
+    # Runs alongside playback; the stream URL was just resolved, so it is fresh.
+    task = asyncio.create_task(download_audio_to_cache(key, resolved))
+    MUSIC_AUDIO_DOWNLOADS[key] = task
+    task.add_done_callback(lambda _: MUSIC_AUDIO_DOWNLOADS.pop(key, None))
+
+
+async def resolve_stream(track: MusicTrack) -> ResolvedStream:
+    await resolve_lazy_track(track)
+    local = cached_audio_stream(track)
+    if local is not None:
+        return local
+    cached = MUSIC_STREAM_CACHE.get(track.webpage_url)
+    if isinstance(cached, ResolvedStream):
+        return cached
+
     current_url = track.webpage_url
     info: dict | None = None
 
@@ -2711,11 +4424,24 @@ async def resolve_stream(track: MusicTrack) -> tuple[str, str, str]:
         if isinstance(entries, list) and entries:
             info = entries[0]
 
-        stream_url = extract_stream_url(info)
+        stream_url, codec = extract_stream_format(info)
         title = info.get("title") or track.title
         webpage_url = info.get("webpage_url") or current_url
         if stream_url:
-            return str(stream_url), str(title), str(webpage_url)
+            resolved = ResolvedStream(
+                stream_url=str(stream_url),
+                title=str(title),
+                webpage_url=str(webpage_url),
+                expires_at=stream_url_expiry(str(stream_url)),
+                codec=codec.lower(),
+                duration=0.0 if info.get("is_live") else float(info.get("duration") or 0),
+            )
+            # Stored with the safety margin applied so a hit is always still playable.
+            cache_until = resolved.expires_at - MUSIC_STREAM_EXPIRY_MARGIN_SECONDS
+            MUSIC_STREAM_CACHE.put(track.webpage_url, resolved, cache_until)
+            if webpage_url != track.webpage_url:
+                MUSIC_STREAM_CACHE.put(str(webpage_url), resolved, cache_until)
+            return resolved
 
         fallback_url = info.get("webpage_url") or info.get("url")
         if (
@@ -2733,69 +4459,249 @@ async def resolve_stream(track: MusicTrack) -> tuple[str, str, str]:
     )
 
 
-async def ensure_voice_connection(ctx: commands.Context) -> discord.VoiceClient | None:
-    if not isinstance(ctx.author, discord.Member) or not ctx.author.voice or not ctx.author.voice.channel:
-        await ctx.send("Join a voice channel first.")
-        return None
+VOICE_STATE_TRANSITIONS = {
+    "idle": {"connecting", "connected"},
+    "connecting": {"connected", "backoff"},
+    "connected": {"connecting", "idle"},
+    "backoff": {"connecting", "connected", "idle"},
+}
 
-    target_channel = ctx.author.voice.channel
-    last_error: Exception | None = None
 
-    for attempt in range(1, VOICE_CONNECT_RETRIES + 1):
-        vc = ctx.guild.voice_client
-        try:
-            if vc is not None and not vc.is_connected():
-                try:
-                    await vc.disconnect(force=True)
-                except Exception:
-                    pass
-                vc = None
-                await asyncio.sleep(0.35)
-
-            if vc is None:
-                vc = await asyncio.wait_for(
-                    target_channel.connect(
-                        timeout=VOICE_CONNECT_TIMEOUT,
-                        reconnect=VOICE_INTERNAL_RECONNECT,
-                    ),
-                    timeout=VOICE_CONNECT_TIMEOUT + 5,
-                )
-            elif vc.channel != target_channel:
-                await asyncio.wait_for(
-                    vc.move_to(target_channel),
+@dataclass
+class LatencyHistogram:
+    bounds: tuple[float, ...] = (0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0)
+    counts: list[int] = field(default_factory=lambda: [0] * 8)
+    total: int = 0
+
+    def add(self, seconds: float) -> None:
+        index = next((i for i, bound in enumerate(self.bounds) if seconds <= bound), len(self.bounds))
+        self.counts[index] += 1
+        self.total += 1
+
+    def percentile(self, fraction: float) -> str:
+        # Bucket upper bound, so the answer is "at most" this many seconds.
+        target = max(1, int(self.total * fraction + 0.999))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return f"≤{self.bounds[index]:g}s" if index < len(self.bounds) else f">{self.bounds[-1]:g}s"
+        return "n/a"
+
+    def render(self) -> str:
+        labels = [f"≤{bound:g}s" for bound in self.bounds] + [f">{self.bounds[-1]:g}s"]
+        return " · ".join(f"{label} `{count}`" for label, count in zip(labels, self.counts))
+
+
+@dataclass
+class VoiceSession:
+    guild_id: int
+    state: str = "idle"
+    channel_id: int | None = None
+    failures: int = 0
+    retry_at: float = 0.0
+    last_error: str = ""
+    attempts: int = 0
+    successes: int = 0
+    history: deque[tuple[float, bool, float, str]] = field(default_factory=lambda: deque(maxlen=20))
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    def transition(self, state: str) -> None:
+        if state != self.state and state not in VOICE_STATE_TRANSITIONS[self.state]:
+            print(f"[VOICE SESSION] guild {self.guild_id}: unexpected {self.state} -> {state}")
+        self.state = state
+
+    def backoff_seconds(self) -> float:
+        # Exponential in consecutive failures (kept across commands), with equal jitter.
+        ceiling = min(VOICE_BACKOFF_MAX_SECONDS, VOICE_BACKOFF_BASE_SECONDS * 2 ** max(0, self.failures - 1))
+        return random.uniform(ceiling / 2, ceiling)
+
+    def record(self, ok: bool, latency: float, region: str, error: Exception | None = None) -> None:
+        self.attempts += 1
+        self.history.append((time.time(), ok, latency, region))
+        if ok:
+            self.successes += 1
+            self.failures = 0
+            VOICE_CONNECT_HISTOGRAM.add(latency)
+        else:
+            self.failures += 1
+            self.last_error = repr(error)[:200]
+            VOICE_CONNECT_FAILURES[region] += 1
+
+
+VOICE_SESSIONS: dict[int, VoiceSession] = {}
+VOICE_CONNECT_HISTOGRAM = LatencyHistogram()
+VOICE_CONNECT_FAILURES: Counter[str] = Counter()
+VOICE_KEEPALIVE_TASK: asyncio.Task | None = None
+
+
+def get_voice_session(guild_id: int) -> VoiceSession:
+    session = VOICE_SESSIONS.get(guild_id)
+    if session is None:
+        session = VOICE_SESSIONS[guild_id] = VoiceSession(guild_id)
+    return session
+
+
+async def _voice_connect_once(
+    guild: discord.Guild, channel: discord.VoiceChannel | discord.StageChannel
+) -> discord.VoiceClient:
+    vc = guild.voice_client
+    try:
+        if vc is not None and not vc.is_connected():
+            try:
+                await vc.disconnect(force=True)
+            except Exception:
+                pass
+            vc = None
+            await asyncio.sleep(0.35)
+
+        if vc is None:
+            vc = await asyncio.wait_for(
+                channel.connect(
                     timeout=VOICE_CONNECT_TIMEOUT,
+                    reconnect=VOICE_INTERNAL_RECONNECT,
+                ),
+                timeout=VOICE_CONNECT_TIMEOUT + 5,
+            )
+        elif vc.channel != channel:
+            await asyncio.wait_for(
+                vc.move_to(channel),
+                timeout=VOICE_CONNECT_TIMEOUT,
+            )
+
+        if vc is not None and vc.is_connected():
+            return vc
+        raise RuntimeError("Voice client did not stay connected after handshake.")
+    except Exception:
+        # Only a half-open client is torn down; a failed move keeps the working connection.
+        stale = guild.voice_client
+        if stale is not None and not stale.is_connected():
+            try:
+                await stale.disconnect(force=True)
+            except Exception:
+                pass
+        raise
+
+
+async def connect_voice_session(
+    session: VoiceSession, guild: discord.Guild, channel: discord.VoiceChannel | discord.StageChannel
+) -> discord.VoiceClient:
+    async with session.lock:
+        vc = guild.voice_client
+        if vc is not None and vc.is_connected() and vc.channel == channel:
+            session.transition("connected")
+            return vc
+        session.channel_id = channel.id
+        session.transition("connecting")
+        region = str(channel.rtc_region or "auto")
+        last_error: Exception | None = None
+        for attempt in range(1, VOICE_CONNECT_RETRIES + 1):
+            started = time.monotonic()
+            try:
+                vc = await _voice_connect_once(guild, channel)
+            except Exception as error:
+                last_error = error
+                session.record(False, time.monotonic() - started, region, error)
+                print(
+                    f"[VOICE CONNECT] attempt {attempt}/{VOICE_CONNECT_RETRIES} failed in guild "
+                    f"{guild.id} ({region}): {error!r}"
                 )
+                if attempt < VOICE_CONNECT_RETRIES:
+                    await asyncio.sleep(session.backoff_seconds())
+                continue
+            session.record(True, time.monotonic() - started, region)
+            session.transition("connected")
+            return vc
+        session.transition("backoff")
+        session.retry_at = time.monotonic() + session.backoff_seconds()
+        raise last_error or RuntimeError("Voice connect failed.")
 
-            if vc is not None and vc.is_connected():
-                return vc
-            raise RuntimeError("Voice client did not stay connected after handshake.")
-        except Exception as error:
-            last_error = error
-            print(
-                f"[VOICE CONNECT] attempt {attempt}/{VOICE_CONNECT_RETRIES} failed in guild "
-                f"{ctx.guild.id}: {error!r}"
-            )
-            stale = ctx.guild.voice_client
-            if stale is not None:
-                try:
-                    await stale.disconnect(force=True)
-                except Exception:
-                    pass
-            if attempt < VOICE_CONNECT_RETRIES:
-                await asyncio.sleep(min(2.5, 0.75 * attempt))
 
-    error_text = str(last_error).lower() if last_error else ""
-    if "4006" in error_text or "voice handshake" in error_text:
-        await ctx.send(
-            "Voice connect failed (`4006`). This is usually a hosting/network issue (Discord voice UDP). "
-            "Try again once; if it keeps failing, switch node/provider."
-        )
-    else:
+async def ensure_voice_connection(ctx: commands.Context) -> discord.VoiceClient | None:
+    if not isinstance(ctx.author, discord.Member) or not ctx.author.voice or not ctx.author.voice.channel:
+        await ctx.send("Join a voice channel first.")
+        return None
+
+    session = get_voice_session(ctx.guild.id)
+    wait = session.retry_at - time.monotonic()
+    if session.state == "backoff" and wait > 0:
         await ctx.send(
-            f"Could not join/move voice channel after `{VOICE_CONNECT_RETRIES}` tries: "
-            f"`{last_error or 'unknown error'}`"
+            f"Voice connect has been failing here (`{session.failures}` in a row). "
+            f"Next attempt allowed in `{wait:.0f}s`."
         )
-    return None
+        return None
+
+    try:
+        vc = await connect_voice_session(session, ctx.guild, ctx.author.voice.channel)
+    except Exception as last_error:
+        error_text = str(last_error).lower()
+        if "4006" in error_text or "voice handshake" in error_text:
+            await ctx.send(
+                "Voice connect failed (`4006`). This is usually a hosting/network issue (Discord voice UDP). "
+                "Try again once; if it keeps failing, switch node/provider."
+            )
+        else:
+            await ctx.send(
+                f"Could not join/move voice channel after `{VOICE_CONNECT_RETRIES}` tries: "
+                f"`{last_error or 'unknown error'}`"
+            )
+        return None
+
+    restored = restore_music_queue(ctx.guild)
+    if restored:
+        await ctx.send(f"Restored `{restored}` track(s) from the saved queue.")
+    return vc
+
+
+def end_voice_session(guild_id: int) -> None:
+    session = VOICE_SESSIONS.get(guild_id)
+    if session is not None:
+        session.transition("idle")
+        session.channel_id = None
+
+
+async def keep_voice_session_alive(session: VoiceSession) -> None:
+    guild = bot.get_guild(session.guild_id)
+    saved = MUSIC_SAVED_QUEUES.get(session.guild_id) if VOICE_WARMUP_SAVED_QUEUES else None
+    if guild is None or session.lock.locked() or time.monotonic() < session.retry_at:
+        return
+    pending = bool(MUSIC_QUEUES.get(guild.id)) or guild.id in MUSIC_NOW_PLAYING or saved is not None
+    vc = guild.voice_client
+    if not pending or session.channel_id is None or (vc is not None and vc.is_connected()):
+        return
+    channel = guild.get_channel(session.channel_id)
+    if not isinstance(channel, (discord.VoiceChannel, discord.StageChannel)):
+        return
+    if session.state == "connected":
+        session.transition("idle")
+    try:
+        await connect_voice_session(session, guild, channel)
+    except Exception:
+        return
+    restore_music_queue(guild)
+    print(f"[VOICE SESSION] Reconnected guild {guild.id} with music pending.")
+    await play_next_track(guild)
+
+
+async def voice_keepalive_worker() -> None:
+    while True:
+        await asyncio.sleep(VOICE_KEEPALIVE_SECONDS)
+        if VOICE_WARMUP_SAVED_QUEUES:
+            for guild_id, state in MUSIC_SAVED_QUEUES.items():
+                channel_id = state.get("voice_channel_id")
+                if isinstance(channel_id, int) and guild_id not in VOICE_SESSIONS:
+                    get_voice_session(guild_id).channel_id = channel_id
+        for session in list(VOICE_SESSIONS.values()):
+            try:
+                await keep_voice_session_alive(session)
+            except Exception as error:
+                print(f"[VOICE SESSION ERROR] {error}")
+
+
+def start_voice_keepalive() -> None:
+    global VOICE_KEEPALIVE_TASK
+    if VOICE_KEEPALIVE_TASK is None:
+        VOICE_KEEPALIVE_TASK = asyncio.create_task(voice_keepalive_worker())
 
 
 def in_same_voice_channel(ctx: commands.Context) -> bool:
@@ -2816,23 +4722,322 @@ def get_music_text_channel(guild: discord.Guild) -> discord.TextChannel | None:
     return None
 
 
+def _finish_music_prefetch(task: asyncio.Task) -> None:
+    if task.cancelled():
+        return
+    error = task.exception()
+    if error is not None:
+        print(f"[MUSIC PREFETCH] {error}")
+
+
+def cancel_music_prefetch(guild_id: int) -> None:
+    entry = MUSIC_PREFETCH.pop(guild_id, None)
+    if entry is not None and not entry[1].done():
+        entry[1].cancel()
+
+
+def schedule_music_prefetch(guild_id: int) -> None:
+    queue = MUSIC_QUEUES.get(guild_id)
+    if not MUSIC_PREFETCH_ENABLED or not queue:
+        cancel_music_prefetch(guild_id)
+        return
+    head = queue[0]
+    current = MUSIC_PREFETCH.get(guild_id)
+    if current is None or current[0] is not head:
+        cancel_music_prefetch(guild_id)
+        task = asyncio.create_task(resolve_stream(head))
+        task.add_done_callback(_finish_music_prefetch)
+        MUSIC_PREFETCH[guild_id] = (head, task)
+
+    # Search a few lazy entries past the head so `queue` shows real titles before they play.
+    for track in queue.slice(1, 1 + MUSIC_LAZY_LOOKAHEAD):
+        if track.search_query is not None and id(track) not in MUSIC_LAZY_TASKS:
+            asyncio.create_task(resolve_lazy_track(track)).add_done_callback(_finish_music_prefetch)
+
+
+async def take_prefetched_stream(guild_id: int, track: MusicTrack) -> ResolvedStream | None:
+    entry = MUSIC_PREFETCH.pop(guild_id, None)
+    if entry is None:
+        return None
+    prefetched_track, task = entry
+    if prefetched_track is not track or task.cancelled():
+        task.cancel()
+        return None
+    try:
+        resolved = await asyncio.shield(task)
+    except Exception:
+        return None
+    if task.cancelled() or not resolved.is_fresh():
+        return None
+    return resolved
+
+
 def music_after_playback(guild: discord.Guild, error: Exception | None) -> None:
+    # Runs on discord.py's audio player thread: hand off to the event loop and return at once.
     if error is not None:
         print(f"[MUSIC PLAYBACK ERROR] {error}")
-    future = asyncio.run_coroutine_threadsafe(play_next_track(guild), bot.loop)
     try:
-        future.result()
-    except Exception as follow_err:
-        print(f"[MUSIC FOLLOWUP ERROR] {follow_err}")
+        bot.loop.call_soon_threadsafe(start_next_track, guild, time.perf_counter())
+    except RuntimeError:
+        pass  # Loop already closed during shutdown.
 
 
-async def play_next_track(guild: discord.Guild) -> None:
+def start_next_track(guild: discord.Guild, ended_at: float) -> None:
+    task = asyncio.create_task(play_next_track(guild, ended_at))
+    MUSIC_NEXT_TASKS[guild.id] = task
+    task.add_done_callback(lambda done: _finish_next_track(guild, done))
+
+
+def _finish_next_track(guild: discord.Guild, task: asyncio.Task) -> None:
+    if MUSIC_NEXT_TASKS.get(guild.id) is task:
+        MUSIC_NEXT_TASKS.pop(guild.id, None)
+    if task.cancelled() or task.exception() is None:
+        return
+    error = task.exception()
+    print(f"[MUSIC FOLLOWUP ERROR] {error}")
+    channel = get_music_text_channel(guild)
+    if channel is not None:
+        asyncio.create_task(channel.send(f"Could not start the next track: {error}"))
+
+
+def music_handoff_stats_line() -> str:
+    if not MUSIC_HANDOFF_MS:
+        return "no track switches yet"
+    ordered = sorted(MUSIC_HANDOFF_MS)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return (
+        f"p50 `{ordered[len(ordered) // 2]:.0f} ms`, p95 `{p95:.0f} ms`, max `{ordered[-1]:.0f} ms` "
+        f"over {len(ordered)} switches"
+    )
+
+
+def mark_music_queues_dirty() -> None:
+    global MUSIC_QUEUES_DIRTY
+    MUSIC_QUEUES_DIRTY = True
+
+
+def track_to_record(track: MusicTrack, start_at: float = 0.0) -> dict:
+    record = {"title": track.title, "url": track.webpage_url, "by": track.requested_by}
+    if track.search_query:
+        record["query"] = track.search_query
+    if start_at >= 1:
+        record["at"] = round(start_at, 1)
+    return record
+
+
+def track_from_record(record: object) -> MusicTrack | None:
+    if not isinstance(record, dict) or not isinstance(record.get("url"), str):
+        return None
+    try:
+        return MusicTrack(
+            title=str(record.get("title") or "Unknown title"),
+            webpage_url=record["url"],
+            requested_by=int(record.get("by") or 0),
+            search_query=record.get("query") or None,
+            start_at=float(record.get("at") or 0.0),
+        )
+    except (TypeError, ValueError):
+        return None
+
+
+def music_queue_snapshot() -> dict:
+    guilds = {str(guild_id): state for guild_id, state in MUSIC_SAVED_QUEUES.items()}
+    for guild_id in set(MUSIC_QUEUES) | set(MUSIC_NOW_PLAYING):
+        queue = MUSIC_QUEUES.get(guild_id) or MusicQueue()
+        current = MUSIC_NOW_PLAYING.get(guild_id)
+        if current is None and not queue:
+            continue
+        guild = bot.get_guild(guild_id)
+        vc = guild.voice_client if guild is not None else None
+        clock = MUSIC_CLOCKS.get(guild_id)
+        guilds[str(guild_id)] = {
+            "text_channel_id": MUSIC_TEXT_CHANNELS.get(guild_id),
+            "voice_channel_id": getattr(getattr(vc, "channel", None), "id", None),
+            "now_playing": track_to_record(current, clock.position() if clock else 0.0) if current else None,
+            "queue": [track_to_record(track, track.start_at) for track in queue],
+            "saved_at": int(time.time()),
+        }
+    return {"guilds": guilds}
+
+
+async def save_music_queues() -> None:
+    global MUSIC_QUEUES_DIRTY
+    MUSIC_QUEUES_DIRTY = False
+    try:
+        await asyncio.to_thread(write_json_atomic, MUSIC_QUEUES_FILE, music_queue_snapshot())
+    except OSError as error:
+        MUSIC_QUEUES_DIRTY = True
+        print(f"[MUSIC QUEUE SAVE ERROR] {error}")
+
+
+def load_music_queues() -> int:
+    payload = read_json(MUSIC_QUEUES_FILE)
+    guilds = payload.get("guilds") if isinstance(payload, dict) else None
+    if not isinstance(guilds, dict):
+        return 0
+    for guild_key, state in guilds.items():
+        if str(guild_key).isdigit() and isinstance(state, dict):
+            MUSIC_SAVED_QUEUES[int(guild_key)] = state
+    return len(MUSIC_SAVED_QUEUES)
+
+
+def restore_music_queue(guild: discord.Guild) -> int:
+    # Saved queues are only rebuilt when the bot is next connected to voice in that guild.
+    state = MUSIC_SAVED_QUEUES.pop(guild.id, None)
+    if state is None:
+        return 0
+    queue = MUSIC_QUEUES[guild.id]
+    if queue or guild.id in MUSIC_NOW_PLAYING:
+        return 0
+    records = [state.get("now_playing"), *(state.get("queue") or [])]
+    queue.extend(track for track in map(track_from_record, records) if track is not None)
+    channel_id = state.get("text_channel_id")
+    if isinstance(channel_id, int) and guild.id not in MUSIC_TEXT_CHANNELS:
+        MUSIC_TEXT_CHANNELS[guild.id] = channel_id
+    mark_music_queues_dirty()
+    return len(queue)
+
+
+def forget_music_queue(guild_id: int) -> None:
+    MUSIC_QUEUES[guild_id].clear()
+    MUSIC_NOW_PLAYING.pop(guild_id, None)
+    MUSIC_CLOCKS.pop(guild_id, None)
+    MUSIC_SAVED_QUEUES.pop(guild_id, None)
+    mark_music_queues_dirty()
+
+
+async def music_queue_journal_worker() -> None:
+    while True:
+        await asyncio.sleep(MUSIC_QUEUE_SAVE_SECONDS)
+        # Anything playing moves its resume offset, so it is saved even without queue changes.
+        if MUSIC_QUEUES_DIRTY or MUSIC_NOW_PLAYING:
+            await save_music_queues()
+
+
+def start_music_queue_journal() -> None:
+    global MUSIC_QUEUE_TASK
+    if not MUSIC_QUEUE_PERSIST_ENABLED or MUSIC_QUEUE_TASK is not None:
+        return
+    saved = load_music_queues()
+    MUSIC_QUEUE_TASK = asyncio.create_task(music_queue_journal_worker())
+    if saved:
+        print(f"Music queues saved for {saved} guild(s); restored on next voice connect.")
+
+
+def music_audio_source(resolved: ResolvedStream, start_at: float = 0.0) -> discord.AudioSource:
+    # Cached files are local paths; the HTTP reconnect flags only apply to remote streams.
+    ffmpeg_options = FFMPEG_OPTIONS if is_url(resolved.stream_url) else {"options": FFMPEG_OPTIONS["options"]}
+    if start_at >= 1:
+        before = f"{ffmpeg_options.get('before_options', '')} -ss {start_at:.1f}".strip()
+        ffmpeg_options = {**ffmpeg_options, "before_options": before}
+    if MUSIC_OPUS_PASSTHROUGH and resolved.codec == "opus":
+        # Opus packets are remuxed into Ogg and sent as-is, skipping PCM decode and libopus re-encode.
+        MUSIC_PLAYBACK_STATS["opus passthrough"] += 1
+        return discord.FFmpegOpusAudio(
+            resolved.stream_url,
+            codec="copy",
+            executable=FFMPEG_EXECUTABLE,
+            **ffmpeg_options,
+        )
+    MUSIC_PLAYBACK_STATS["transcoded"] += 1
+    return discord.FFmpegPCMAudio(
+        resolved.stream_url,
+        executable=FFMPEG_EXECUTABLE,
+        **ffmpeg_options,
+    )
+
+
+def proc_stat_usage(stat_path: str) -> tuple[float, float, int] | None:
+    # (cpu seconds, age seconds, rss bytes) from a Linux /proc/.../stat file; None elsewhere.
+    if PROC_CLOCK_TICKS <= 0:
+        return None
+    try:
+        with open(stat_path, encoding="ascii") as handle:
+            fields = handle.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime", encoding="ascii") as handle:
+            uptime = float(handle.read().split()[0])
+    except (OSError, IndexError, ValueError):
+        return None
+    cpu_seconds = (int(fields[11]) + int(fields[12])) / PROC_CLOCK_TICKS
+    age = max(0.001, uptime - int(fields[19]) / PROC_CLOCK_TICKS)
+    return cpu_seconds, age, int(fields[21]) * PROC_PAGE_SIZE
+
+
+def voice_stream_usage(vc: discord.VoiceClient) -> dict | None:
+    # Reaches into discord.py internals: the ffmpeg Popen on the source and the audio player thread.
+    source = vc.source
+    while isinstance(source, discord.PCMVolumeTransformer):
+        source = source.original
+    process = getattr(source, "_process", None)
+    pid = getattr(process, "pid", None)
+    if pid is None:
+        return None
+    ffmpeg = proc_stat_usage(f"/proc/{pid}/stat")
+    if ffmpeg is None:
+        return None
+    usage = {
+        "mode": "opus passthrough" if source.is_opus() else "pcm + opus encode",
+        "ffmpeg_cpu": ffmpeg[0] / ffmpeg[1] * 100,
+        "ffmpeg_rss": ffmpeg[2],
+        "player_cpu": 0.0,
+    }
+    player_id = getattr(getattr(vc, "_player", None), "native_id", None)
+    player = proc_stat_usage(f"/proc/self/task/{player_id}/stat") if player_id else None
+    if player is not None:
+        usage["player_cpu"] = player[0] / player[1] * 100
+    return usage
+
+
+def guild_stream_usage_line(guild: discord.Guild) -> str:
+    vc = guild.voice_client
+    usage = voice_stream_usage(vc) if isinstance(vc, discord.VoiceClient) and vc.is_playing() else None
+    if usage is None:
+        return "This server's stream: not playing (or /proc unavailable)"
+    return (
+        f"This server's stream: ffmpeg `{usage['ffmpeg_cpu']:.1f}%` / `{usage['ffmpeg_rss'] / 1048576:.1f} MB`, "
+        f"player `{usage['player_cpu']:.1f}%` ({usage['mode']})"
+    )
+
+
+def voice_stream_usage_lines(limit: int = 10) -> list[str]:
+    # Names every guild and the host's totals, so only the bot owner sees this (`musichost`).
+    rows = []
+    for vc in bot.voice_clients:
+        if isinstance(vc, discord.VoiceClient) and vc.is_playing():
+            usage = voice_stream_usage(vc)
+            if usage is not None:
+                rows.append((vc.guild, usage))
+    if not rows:
+        return ["Voice streams: none playing (or /proc unavailable)"]
+    rows.sort(key=lambda row: row[1]["ffmpeg_cpu"] + row[1]["player_cpu"], reverse=True)
+    lines = [
+        f"Voice streams: `{len(rows)}` playing, ffmpeg `{sum(u['ffmpeg_cpu'] for _, u in rows):.1f}%` CPU / "
+        f"`{sum(u['ffmpeg_rss'] for _, u in rows) / 1048576:.0f} MB` RSS, "
+        f"player threads `{sum(u['player_cpu'] for _, u in rows):.1f}%` CPU"
+    ]
+    for guild, usage in rows[:limit]:
+        lines.append(
+            f"- {guild.name}: ffmpeg `{usage['ffmpeg_cpu']:.1f}%` / `{usage['ffmpeg_rss'] / 1048576:.1f} MB`, "
+            f"player `{usage['player_cpu']:.1f}%` ({usage['mode']})"
+        )
+    if len(rows) > limit:
+        lines.append(f"...and {len(rows) - limit} more.")
+    return lines
+
+
+async def play_next_track(guild: discord.Guild, handoff_started: float | None = None) -> None:
     global FFMPEG_EXECUTABLE
     lock = MUSIC_LOCKS[guild.id]
     async with lock:
         vc = guild.voice_client
         if vc is None or not vc.is_connected():
-            MUSIC_NOW_PLAYING.pop(guild.id, None)
+            interrupted = MUSIC_NOW_PLAYING.pop(guild.id, None)
+            clock = MUSIC_CLOCKS.pop(guild.id, None)
+            if interrupted is not None and clock is not None:
+                # Voice dropped mid-song: keep it at the head so a reconnect resumes where it stopped.
+                interrupted.start_at = clock.position()
+                MUSIC_QUEUES[guild.id].appendleft(interrupted)
+                mark_music_queues_dirty()
             return
         if vc.is_playing() or vc.is_paused():
             return
@@ -2852,33 +5057,42 @@ async def play_next_track(guild: discord.Guild) -> None:
         while queue:
             track = queue.popleft()
             try:
-                stream_url, title, webpage_url = await resolve_stream(track)
+                resolved = await take_prefetched_stream(guild.id, track)
+                if resolved is None:
+                    resolved = await resolve_stream(track)
             except Exception as error:
                 channel = get_music_text_channel(guild)
                 if channel is not None:
                     await channel.send(f"Skipping `{track.title}`: {error}")
                 continue
 
-            track.title = title[:200]
-            track.webpage_url = webpage_url
+            track.title = resolved.title[:200]
+            track.webpage_url = resolved.webpage_url
             channel = get_music_text_channel(guild)
             try:
-                source = discord.FFmpegPCMAudio(
-                    stream_url,
-                    executable=FFMPEG_EXECUTABLE,
-                    **FFMPEG_OPTIONS,
-                )
+                source = music_audio_source(resolved, track.start_at)
                 vc.play(source, after=lambda e: music_after_playback(guild, e))
+                MUSIC_CLOCKS[guild.id] = PlaybackClock(track.start_at, time.monotonic())
+                track.start_at = 0.0
+                if handoff_started is not None:
+                    MUSIC_HANDOFF_MS.append((time.perf_counter() - handoff_started) * 1000)
+                note_audio_play(track, resolved)
                 MUSIC_NOW_PLAYING[guild.id] = track
+                mark_music_queues_dirty()
+                schedule_music_prefetch(guild.id)
                 if channel is not None:
                     await channel.send(f"Now playing: **{track.title}**")
                 return
             except Exception as error:
+                MUSIC_STREAM_CACHE.discard(track.webpage_url)
                 if channel is not None:
                     await channel.send(f"Playback failed for `{track.title}`: {error}")
                 continue
 
         MUSIC_NOW_PLAYING.pop(guild.id, None)
+        MUSIC_CLOCKS.pop(guild.id, None)
+        mark_music_queues_dirty()
+        cancel_music_prefetch(guild.id)
 
 
 def split_message(content: str, max_len: int = 1900) -> list[str]:
@@ -3217,12 +5431,231 @@ async def request_ai_completion(
 
 
 def append_ai_history(channel_id: int, user_prompt: str, assistant_reply: str) -> None:
-    history = AI_CHAT_CACHE[channel_id]
-    history.append({"role": "user", "content": user_prompt})
-    history.append({"role": "assistant", "content": assistant_reply})
-    max_entries = max(2, AI_MAX_HISTORY * 2)
-    if len(history) > max_entries:
-        AI_CHAT_CACHE[channel_id] = history[-max_entries:]
+    append_conversation_history(AI_CHAT_CACHE, channel_id, user_prompt, assistant_reply)
+
+
+MESSAGE_FLAG_BOT = 1
+MESSAGE_FLAG_WEBHOOK = 2
+MESSAGE_FLAG_ATTACHMENTS = 4
+DISCORD_EPOCH_MS = 1420070400000
+MENTION_TOKEN_PATTERN = re.compile(r"<(@[!&]?|#)([0-9]{15,20})>")
+
+
+class MessageRecord:
+    # Slim, slotted copy of a discord.Message built once per fetched message and shared by every
+    # analyzer. Mention cleanup is deferred until `content` is first read, so messages that get
+    # dropped (bots, other users) never pay for it.
+    __slots__ = (
+        "id",
+        "channel_id",
+        "author_id",
+        "author_name",
+        "flags",
+        "reference_id",
+        "reference_author_id",
+        "mention_ids",
+        "_raw",
+        "_guild",
+        "_mention_names",
+        "_clean",
+    )
+
+    def __init__(
+        self,
+        *,
+        id: int,
+        channel_id: int,
+        author_id: int,
+        author_name: str,
+        flags: int,
+        reference_id: int | None,
+        reference_author_id: int | None,
+        mention_ids: tuple[int, ...],
+        raw_content: str,
+        guild: discord.Guild | None = None,
+        mention_names: dict[int, str] | None = None,
+    ) -> None:
+        self.id = id
+        self.channel_id = channel_id
+        self.author_id = author_id
+        self.author_name = author_name
+        self.flags = flags
+        self.reference_id = reference_id
+        self.reference_author_id = reference_author_id
+        self.mention_ids = mention_ids
+        if "<" not in raw_content and "@" not in raw_content:
+            # Nothing to resolve or escape; the raw text is already clean.
+            self._raw = None
+            self._guild = None
+            self._mention_names = None
+            self._clean = raw_content.strip()
+        else:
+            self._raw = raw_content
+            self._guild = guild
+            self._mention_names = mention_names
+            self._clean = None
+
+    @classmethod
+    def from_message(cls, msg: discord.Message) -> "MessageRecord":
+        author = msg.author
+        flags = 0
+        if author.bot:
+            flags |= MESSAGE_FLAG_BOT
+        if msg.webhook_id is not None:
+            flags |= MESSAGE_FLAG_WEBHOOK
+        if msg.attachments:
+            flags |= MESSAGE_FLAG_ATTACHMENTS
+
+        reference_id = None
+        reference_author_id = None
+        if msg.reference is not None:
+            reference_id = msg.reference.message_id
+            resolved = msg.reference.resolved
+            if isinstance(resolved, discord.Message):
+                reference_author_id = resolved.author.id
+
+        mentions = msg.mentions
+        return cls(
+            id=msg.id,
+            channel_id=msg.channel.id,
+            author_id=author.id,
+            author_name=getattr(author, "display_name", author.name),
+            flags=flags,
+            reference_id=reference_id,
+            reference_author_id=reference_author_id,
+            mention_ids=tuple(m.id for m in mentions),
+            raw_content=msg.content or "",
+            guild=msg.guild,
+            mention_names={m.id: m.display_name for m in mentions} if mentions else None,
+        )
+
+    @property
+    def is_bot(self) -> bool:
+        return bool(self.flags & MESSAGE_FLAG_BOT)
+
+    @property
+    def timestamp(self) -> float:
+        return ((self.id >> 22) + DISCORD_EPOCH_MS) / 1000
+
+    @property
+    def content(self) -> str:
+        if self._clean is None:
+            self._clean = self._resolve_content()
+            self._raw = None
+            self._guild = None
+            self._mention_names = None
+        return self._clean
+
+    def _resolve_content(self) -> str:
+        guild = self._guild
+        mention_names = self._mention_names or {}
+
+        def _replace(match: re.Match) -> str:
+            kind = match[1]
+            target_id = int(match[2])
+            if kind == "#":
+                channel = guild.get_channel_or_thread(target_id) if guild else None
+                return f"#{channel.name}" if channel else "#deleted-channel"
+            if kind == "@&":
+                role = guild.get_role(target_id) if guild else None
+                return f"@{role.name}" if role else "@deleted-role"
+            member = guild.get_member(target_id) if guild else None
+            name = member.display_name if member else mention_names.get(target_id)
+            return f"@{name}" if name else "@deleted-user"
+
+        resolved = MENTION_TOKEN_PATTERN.sub(_replace, self._raw or "")
+        return discord.utils.escape_mentions(resolved).strip()
+
+
+@dataclass
+class ChannelMessageWindow:
+    # Oldest message on the left, newest on the right.
+    messages: deque[MessageRecord]
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    exhausted: bool = False
+
+
+# channel_id -> rolling message window, least recently used channel first.
+CHANNEL_MESSAGE_WINDOWS: OrderedDict[int, ChannelMessageWindow] = OrderedDict()
+
+
+def get_channel_message_window(channel_id: int) -> ChannelMessageWindow:
+    window = CHANNEL_MESSAGE_WINDOWS.get(channel_id)
+    if window is not None:
+        CHANNEL_MESSAGE_WINDOWS.move_to_end(channel_id)
+        return window
+
+    window = ChannelMessageWindow(messages=deque(maxlen=MESSAGE_CACHE_MAX_PER_CHANNEL))
+    CHANNEL_MESSAGE_WINDOWS[channel_id] = window
+    while len(CHANNEL_MESSAGE_WINDOWS) > MESSAGE_CACHE_MAX_CHANNELS:
+        CHANNEL_MESSAGE_WINDOWS.popitem(last=False)
+    return window
+
+
+def record_channel_message(message: discord.Message) -> None:
+    # Only channels that a command already backfilled are kept warm.
+    window = CHANNEL_MESSAGE_WINDOWS.get(message.channel.id)
+    if window is None:
+        return
+    window.messages.append(MessageRecord.from_message(message))
+
+
+def update_channel_message(message: discord.Message) -> None:
+    window = CHANNEL_MESSAGE_WINDOWS.get(message.channel.id)
+    if window is None:
+        return
+    for index in range(len(window.messages) - 1, -1, -1):
+        if window.messages[index].id == message.id:
+            window.messages[index] = MessageRecord.from_message(message)
+            return
+
+
+def forget_channel_message(channel_id: int, message_id: int) -> None:
+    window = CHANNEL_MESSAGE_WINDOWS.get(channel_id)
+    if window is None:
+        return
+    for record in reversed(window.messages):
+        if record.id == message_id:
+            window.messages.remove(record)
+            return
+
+
+def forget_channel_messages(channel_id: int, message_ids: set[int]) -> None:
+    window = CHANNEL_MESSAGE_WINDOWS.get(channel_id)
+    if window is None:
+        return
+    # Filtered in place: a fetch holding this window across an await keeps the same deque.
+    kept = [record for record in window.messages if record.id not in message_ids]
+    if len(kept) != len(window.messages):
+        window.messages.clear()
+        window.messages.extend(kept)
+
+
+async def fetch_channel_window(
+    channel: discord.abc.Messageable, depth: int
+) -> list[MessageRecord]:
+    # Returns up to `depth` newest messages, oldest first; history is only fetched for the gap.
+    depth = max(1, min(depth, MESSAGE_CACHE_MAX_PER_CHANNEL))
+    window = get_channel_message_window(channel.id)
+
+    if len(window.messages) < depth and not window.exhausted:
+        async with window.lock:
+            missing = depth - len(window.messages)
+            if missing > 0 and not window.exhausted:
+                before = discord.Object(id=window.messages[0].id) if window.messages else None
+                older: list[MessageRecord] = []
+                async for msg in channel.history(limit=missing, before=before):
+                    older.append(MessageRecord.from_message(msg))
+                if len(older) < missing:
+                    window.exhausted = True
+                # Live messages may have landed while history was streaming in.
+                if window.messages:
+                    boundary = window.messages[0].id
+                    older = [record for record in older if record.id < boundary]
+                window.messages.extendleft(older)
+
+    records = list(window.messages)
+    return records[-depth:]
 
 
 async def collect_vibe_context(
@@ -3237,23 +5670,23 @@ async def collect_vibe_context(
     replies_received: list[str] = []
     target_message_ids: set[int] = set()
 
-    async for msg in channel.history(limit=scan_limit, oldest_first=True):
-        if msg.author.bot:
+    for record in await fetch_channel_window(channel, scan_limit):
+        if record.is_bot:
             continue
-        content = msg.clean_content.strip()
+        content = record.content
         if not content:
             continue
         content = content[:420]
 
-        if msg.author.id == user_id:
+        if record.author_id == user_id:
             user_messages.append(content)
-            target_message_ids.add(msg.id)
+            target_message_ids.add(record.id)
             continue
 
         is_reply_to_target = False
-        if msg.reference and msg.reference.message_id in target_message_ids:
+        if record.reference_id in target_message_ids:
             is_reply_to_target = True
-        elif any(getattr(m, "id", None) == user_id for m in msg.mentions):
+        elif user_id in record.mention_ids:
             is_reply_to_target = True
 
         if is_reply_to_target:
@@ -3297,26 +5730,15 @@ def build_vibe_prompt_lines(
 def generate_vibe_report_local(
     member: discord.Member, user_messages: list[str], replies_received: list[str]
 ) -> str:
-    msg_count = len(user_messages)
-    joined = " ".join(user_messages).lower()
-    words = [w for w in WORD_PATTERN.findall(joined) if len(w) > 2]
-    stop = {
-        "the", "and", "for", "that", "with", "this", "you", "are", "was", "have", "not", "but",
-        "just", "your", "from", "what", "when", "where", "will", "would", "they", "them", "their",
-        "about", "there", "then", "than", "into", "also", "been", "can", "could", "should",
-    }
-    filtered = [w for w in words if w not in stop]
-    common = [w for w, _ in Counter(filtered).most_common(6)]
-    topic_text = ", ".join(common[:5]) if common else "general chat"
-
-    question_ratio = sum(1 for m in user_messages if "?" in m) / max(msg_count, 1)
-    exclaim_ratio = sum(1 for m in user_messages if "!" in m) / max(msg_count, 1)
+    style = StyleAccumulator.from_messages(user_messages)
+    reply_style = StyleAccumulator.from_messages(replies_received)
+    common = style.top_words(5)
+    topic_text = ", ".join(common) if common else "general chat"
 
-    reply_text = " ".join(replies_received).lower()
-    pos_markers = ["thanks", "thank", "love", "nice", "great", "good", "haha", "lol", "bro", "best"]
-    neg_markers = ["stupid", "idiot", "hate", "shut", "noob", "trash", "bad", "annoying", "toxic", "loser"]
-    pos_hits = sum(reply_text.count(w) for w in pos_markers)
-    neg_hits = sum(reply_text.count(w) for w in neg_markers)
+    question_ratio = style.question_ratio
+    exclaim_ratio = style.exclaim_ratio
+    pos_hits = reply_style.marker_hits(STYLE_POSITIVE_MARKERS)
+    neg_hits = reply_style.marker_hits(STYLE_NEGATIVE_MARKERS)
 
     style_bits = []
     if exclaim_ratio > 0.18:
@@ -3348,12 +5770,12 @@ def generate_vibe_report_local(
 
 
 def generate_vibecheck_local(user_messages: list[str], replies_received: list[str]) -> str:
-    message_count = max(1, len(user_messages))
-    text = " ".join(user_messages).lower()
-    replies_text = " ".join(replies_received).lower()
+    style = StyleAccumulator.from_messages(user_messages)
+    message_count = max(1, style.message_count)
+    reply_mentions = sum(reply.count("@") for reply in replies_received)
 
-    exclaim_ratio = sum(1 for m in user_messages if "!" in m) / message_count
-    question_ratio = sum(1 for m in user_messages if "?" in m) / message_count
+    exclaim_ratio = style.exclaim_ratio
+    question_ratio = style.question_ratio
 
     chaos_percent = int(min(95, max(15, 30 + exclaim_ratio * 280 + question_ratio * 120)))
     if chaos_percent >= 75:
@@ -3365,10 +5787,10 @@ def generate_vibecheck_local(user_messages: list[str], replies_received: list[st
     else:
         mood_label = "calm"
 
-    supportive_hits = sum(text.count(w) for w in ["thanks", "love", "bro", "help", "nice", "great"])
-    roast_hits = sum(text.count(w) for w in ["noob", "stupid", "idiot", "trash", "roast", "shut"])
-    question_hits = sum(m.count("?") for m in user_messages)
-    mention_hits = sum(m.count("@") for m in user_messages) + replies_text.count("@")
+    supportive_hits = style.marker_hits(STYLE_SUPPORTIVE_MARKERS)
+    roast_hits = style.marker_hits(STYLE_ROAST_MARKERS)
+    question_hits = style.question_marks
+    mention_hits = style.at_marks + reply_mentions
 
     if supportive_hits > roast_hits and supportive_hits > question_hits:
         dominant_trait = "supportive hype friend"
@@ -3447,86 +5869,837 @@ async def generate_vibecheck_report(
         "Replies from others sample:\n"
         f"{reply_transcript}"
     )
-    ai_messages = [
-        {"role": "system", "content": VIBE_SYSTEM_PROMPT},
-        {"role": "user", "content": prompt},
-    ]
-    output = await request_ai_completion(
-        ai_messages,
-        max_tokens=180,
-        temperature=0.45,
+    ai_messages = [
+        {"role": "system", "content": VIBE_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt},
+    ]
+    output = await request_ai_completion(
+        ai_messages,
+        max_tokens=180,
+        temperature=0.45,
+    )
+    return normalize_vibecheck_output(output)
+
+
+async def collect_recent_channel_transcript(
+    channel: discord.TextChannel,
+    limit: int,
+    *,
+    exclude_message_ids: set[int] | None = None,
+    max_chars: int = 260,
+) -> list[str]:
+    lines: list[str] = []
+    for record in await fetch_channel_window(channel, limit):
+        if exclude_message_ids and record.id in exclude_message_ids:
+            continue
+        if record.is_bot:
+            continue
+        content = record.content
+        if not content:
+            continue
+        lines.append(f"{record.author_name}: {content[:max_chars]}")
+    return lines
+
+
+async def collect_recent_user_messages(
+    channel: discord.TextChannel, user_id: int, limit: int
+) -> list[str]:
+    messages: list[str] = []
+    records = await fetch_channel_window(channel, min(5000, max(limit * 8, limit + 120)))
+    for record in reversed(records):
+        if record.is_bot or record.author_id != user_id:
+            continue
+        content = record.content
+        if not content:
+            continue
+        messages.append(content[:260])
+        if len(messages) >= limit:
+            break
+    messages.reverse()
+    return messages
+
+
+def user_style_stats(user_messages: list[str]) -> dict[str, str]:
+    return StyleAccumulator.from_messages(user_messages).display_stats()
+
+
+@dataclass
+class StyleProfile:
+    # Rolling per-(guild, user) style window. Messages land in fixed-size buckets so the oldest
+    # bucket can be dropped whole instead of re-scanning history to expire old messages.
+    buckets: deque[StyleAccumulator] = field(default_factory=deque)
+    reply_buckets: deque[StyleAccumulator] = field(default_factory=deque)
+    # Raw samples are (message_id, author_id, text) so deletes and purges can find and drop them.
+    samples: deque[tuple[int, int, str]] = field(default_factory=lambda: deque(maxlen=STYLE_PROFILE_SAMPLE_SIZE))
+    reply_samples: deque[tuple[int, int, str]] = field(
+        default_factory=lambda: deque(maxlen=STYLE_PROFILE_SAMPLE_SIZE)
+    )
+    updated_at: float = 0.0
+
+    @staticmethod
+    def _push(buckets: deque[StyleAccumulator], text: str) -> None:
+        if not buckets or buckets[-1].message_count >= STYLE_PROFILE_BUCKET_MESSAGES:
+            buckets.append(StyleAccumulator())
+            while len(buckets) > STYLE_PROFILE_MAX_BUCKETS:
+                buckets.popleft()
+        buckets[-1].add(text)
+
+    def add_message(self, message_id: int, author_id: int, text: str) -> None:
+        self._push(self.buckets, text)
+        self.samples.append((message_id, author_id, text))
+        self.updated_at = time.time()
+
+    def add_reply(self, message_id: int, author_id: int, text: str) -> None:
+        self._push(self.reply_buckets, text)
+        self.reply_samples.append((message_id, author_id, text))
+        self.updated_at = time.time()
+
+    def sample_texts(self) -> list[str]:
+        return [text for _, _, text in self.samples]
+
+    def reply_texts(self) -> list[str]:
+        return [text for _, _, text in self.reply_samples]
+
+    def forget(self, *, message_ids: set[int] | None = None, author_id: int | None = None) -> int:
+        # Only the raw text is removed; the aggregate counters hold no message content.
+        removed = 0
+        for samples in (self.samples, self.reply_samples):
+            kept = [
+                sample
+                for sample in samples
+                if not (message_ids is not None and sample[0] in message_ids)
+                and not (author_id is not None and sample[1] == author_id)
+            ]
+            if len(kept) != len(samples):
+                removed += len(samples) - len(kept)
+                samples.clear()
+                samples.extend(kept)
+        return removed
+
+    @property
+    def message_count(self) -> int:
+        return sum(bucket.message_count for bucket in self.buckets)
+
+    def style(self) -> StyleAccumulator:
+        merged = StyleAccumulator()
+        for bucket in self.buckets:
+            merged.merge(bucket)
+        return merged
+
+    def reply_style(self) -> StyleAccumulator:
+        merged = StyleAccumulator()
+        for bucket in self.reply_buckets:
+            merged.merge(bucket)
+        return merged
+
+    def to_dict(self) -> dict:
+        return {
+            "buckets": [bucket.to_dict() for bucket in self.buckets],
+            "reply_buckets": [bucket.to_dict() for bucket in self.reply_buckets],
+            "samples": [list(sample) for sample in self.samples],
+            "reply_samples": [list(sample) for sample in self.reply_samples],
+            "updated_at": self.updated_at,
+        }
+
+    @classmethod
+    def from_dict(cls, payload: dict) -> "StyleProfile":
+        profile = cls()
+        for key, target in (("buckets", profile.buckets), ("reply_buckets", profile.reply_buckets)):
+            raw_buckets = payload.get(key)
+            if isinstance(raw_buckets, list):
+                for raw in raw_buckets[-STYLE_PROFILE_MAX_BUCKETS:]:
+                    if isinstance(raw, dict):
+                        target.append(StyleAccumulator.from_dict(raw))
+        for key, target in (("samples", profile.samples), ("reply_samples", profile.reply_samples)):
+            raw_samples = payload.get(key)
+            if isinstance(raw_samples, list):
+                # Bare strings from older files have no message id to delete by, so they are dropped.
+                target.extend(
+                    (int(raw[0]), int(raw[1]), str(raw[2]))
+                    for raw in raw_samples
+                    if isinstance(raw, list) and len(raw) == 3
+                )
+        updated_at = payload.get("updated_at")
+        profile.updated_at = float(updated_at) if isinstance(updated_at, (int, float)) else 0.0
+        return profile
+
+
+STYLE_PROFILES: OrderedDict[tuple[int, int], StyleProfile] = OrderedDict()
+STYLE_PROFILE_QUEUE: asyncio.Queue[tuple[int, MessageRecord]] | None = None
+STYLE_PROFILE_TASK: asyncio.Task | None = None
+STYLE_PROFILES_DIRTY = False
+
+
+def get_style_profile(guild_id: int, user_id: int, *, create: bool = False) -> StyleProfile | None:
+    key = (guild_id, user_id)
+    profile = STYLE_PROFILES.get(key)
+    if profile is not None:
+        STYLE_PROFILES.move_to_end(key)
+        return profile
+    if not create:
+        return None
+    profile = StyleProfile()
+    STYLE_PROFILES[key] = profile
+    while len(STYLE_PROFILES) > STYLE_PROFILE_MAX_USERS:
+        STYLE_PROFILES.popitem(last=False)
+    return profile
+
+
+def ready_style_profile(guild_id: int, user_id: int) -> StyleProfile | None:
+    profile = get_style_profile(guild_id, user_id)
+    if profile is None or profile.message_count < STYLE_PROFILE_MIN_MESSAGES:
+        return None
+    return profile
+
+
+def enqueue_style_profile_message(message: discord.Message) -> None:
+    if STYLE_PROFILE_QUEUE is None or message.guild is None or message.author.bot:
+        return
+    try:
+        STYLE_PROFILE_QUEUE.put_nowait((message.guild.id, MessageRecord.from_message(message)))
+    except asyncio.QueueFull:
+        pass
+
+
+def apply_style_profile_record(guild_id: int, record: MessageRecord) -> None:
+    global STYLE_PROFILES_DIRTY
+    content = record.content
+    if not content:
+        return
+    cleaned = " ".join(content.split())[:320]
+    if not cleaned:
+        return
+    get_style_profile(guild_id, record.author_id, create=True).add_message(record.id, record.author_id, cleaned)
+
+    reply_targets = set(record.mention_ids)
+    if record.reference_author_id is not None:
+        reply_targets.add(record.reference_author_id)
+    reply_targets.discard(record.author_id)
+    for target_id in reply_targets:
+        target = get_style_profile(guild_id, target_id)
+        if target is not None:
+            target.add_reply(record.id, record.author_id, cleaned)
+    STYLE_PROFILES_DIRTY = True
+
+
+def forget_style_samples(guild_id: int, *, message_ids: set[int] | None = None, author_id: int | None = None) -> int:
+    global STYLE_PROFILES_DIRTY
+    removed = 0
+    for (profile_guild_id, _), profile in STYLE_PROFILES.items():
+        if profile_guild_id == guild_id:
+            removed += profile.forget(message_ids=message_ids, author_id=author_id)
+    if removed:
+        STYLE_PROFILES_DIRTY = True
+    return removed
+
+
+def purge_style_profiles(guild_id: int, user_id: int | None = None) -> int:
+    # The user's own profile goes entirely; their messages kept as replies in others' profiles too.
+    global STYLE_PROFILES_DIRTY
+    doomed = [key for key in STYLE_PROFILES if key[0] == guild_id and (user_id is None or key[1] == user_id)]
+    for key in doomed:
+        del STYLE_PROFILES[key]
+    removed = len(doomed)
+    if user_id is not None:
+        forget_style_samples(guild_id, author_id=user_id)
+    if doomed:
+        STYLE_PROFILES_DIRTY = True
+    return removed
+
+
+def load_style_profiles() -> int:
+    STYLE_PROFILES.clear()
+    payload = read_json(STYLE_PROFILES_FILE)
+    entries = sorted(
+        (item for item in payload.items() if isinstance(item[1], dict)),
+        key=lambda item: item[1].get("updated_at", 0) if isinstance(item[1].get("updated_at"), (int, float)) else 0,
+    )
+    for raw_key, raw_profile in entries[-STYLE_PROFILE_MAX_USERS:]:
+        guild_raw, _, user_raw = raw_key.partition(":")
+        if not guild_raw.isdigit() or not user_raw.isdigit():
+            continue
+        STYLE_PROFILES[(int(guild_raw), int(user_raw))] = StyleProfile.from_dict(raw_profile)
+    return len(STYLE_PROFILES)
+
+
+async def save_style_profiles() -> None:
+    global STYLE_PROFILES_DIRTY
+    if not STYLE_PROFILES_DIRTY:
+        return
+    STYLE_PROFILES_DIRTY = False
+    payload = {
+        f"{guild_id}:{user_id}": profile.to_dict()
+        for (guild_id, user_id), profile in STYLE_PROFILES.items()
+    }
+    try:
+        await asyncio.to_thread(write_json_atomic, STYLE_PROFILES_FILE, payload)
+    except OSError as error:
+        STYLE_PROFILES_DIRTY = True
+        print(f"[STYLE PROFILE SAVE ERROR] {error}")
+
+
+async def style_profile_worker() -> None:
+    assert STYLE_PROFILE_QUEUE is not None
+    last_save = time.monotonic()
+    while True:
+        try:
+            guild_id, record = await asyncio.wait_for(
+                STYLE_PROFILE_QUEUE.get(), timeout=STYLE_PROFILE_SAVE_SECONDS
+            )
+        except asyncio.TimeoutError:
+            pass
+        else:
+            try:
+                apply_style_profile_record(guild_id, record)
+            except Exception as error:
+                print(f"[STYLE PROFILE ERROR] {error}")
+        if time.monotonic() - last_save >= STYLE_PROFILE_SAVE_SECONDS:
+            last_save = time.monotonic()
+            await save_style_profiles()
+
+
+def start_style_profiler() -> None:
+    global STYLE_PROFILE_QUEUE, STYLE_PROFILE_TASK
+    if not STYLE_PROFILE_ENABLED or STYLE_PROFILE_TASK is not None:
+        return
+    loaded = load_style_profiles()
+    STYLE_PROFILE_QUEUE = asyncio.Queue(maxsize=10000)
+    STYLE_PROFILE_TASK = asyncio.create_task(style_profile_worker())
+    print(f"Style profiler started with {loaded} saved profiles.")
+
+
+def roast_context_from_profile(profile: StyleProfile) -> RoastContext:
+    user_budget = int(ROAST_MAX_CONTEXT_CHARS * 0.72)
+    reply_budget = ROAST_MAX_CONTEXT_CHARS - user_budget
+    user_lines: list[str] = []
+    reply_lines: list[str] = []
+    user_chars = 0
+    reply_chars = 0
+    for line in profile.sample_texts():
+        user_chars = append_with_char_budget(user_lines, line, user_chars, user_budget)
+    for line in profile.reply_texts():
+        reply_chars = append_with_char_budget(reply_lines, line, reply_chars, reply_budget)
+    style = profile.style()
+    return RoastContext(
+        scanned_messages=style.message_count,
+        user_lines=user_lines,
+        reply_lines=reply_lines,
+        style=style,
+        reply_style=profile.reply_style(),
+    )
+
+
+ARCHIVE_COLUMNS = (
+    "message_id",
+    "author_id",
+    "channel_id",
+    "timestamp_ms",
+    "reply_to_id",
+    "reply_author_id",
+    "mention_id",
+    "text_offset",
+    "text_length",
+)
+ARCHIVE_COLUMN_INDEX = {name: index for index, name in enumerate(ARCHIVE_COLUMNS)}
+ARCHIVE_MAGIC = b"PBA1"
+ARCHIVE_HEADER = struct.Struct("<4sIQQ")
+ARCHIVE_HEADER_SIZE = 64
+ARCHIVE_LOCK = threading.Lock()
+ARCHIVE_PENDING: dict[int, list[tuple[int, int, int, int, int, int, int, str]]] = defaultdict(list)
+ARCHIVE_PENDING_DELETES: dict[int, set[int]] = defaultdict(set)
+ARCHIVE_TASK: asyncio.Task | None = None
+
+
+class ArchiveSegment:
+    # Fixed-capacity segment: a sparse file holding one int64 column after another, plus an
+    # append-only UTF-8 text blob. The header row count is bumped only after a batch is fully
+    # written, so readers never see half-written rows.
+    __slots__ = ("path", "capacity", "rows", "_file", "_map", "_text_file", "_text_map")
+
+    def __init__(self, path: Path, *, writable: bool = False) -> None:
+        mode = "r+b" if writable else "rb"
+        access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+        self.path = path
+        self._file = open(path, mode)
+        self._map = mmap.mmap(self._file.fileno(), 0, access=access)
+        self._text_file = None
+        self._text_map = None
+        magic, column_count, capacity, rows = ARCHIVE_HEADER.unpack_from(self._map, 0)
+        if magic != ARCHIVE_MAGIC or column_count != len(ARCHIVE_COLUMNS):
+            self.close()
+            raise ValueError(f"Not an archive segment: {path}")
+        self.capacity = capacity
+        self.rows = rows
+        text_path = path.with_suffix(".text")
+        if text_path.exists() and text_path.stat().st_size > 0:
+            self._text_file = open(text_path, mode)
+            self._text_map = mmap.mmap(self._text_file.fileno(), 0, access=access)
+
+    def __enter__(self) -> "ArchiveSegment":
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for handle in (self._map, self._text_map):
+            if handle is None:
+                continue
+            try:
+                handle.close()
+            except BufferError:
+                # A numpy view is still alive; the map is released when it is collected.
+                pass
+        for handle in (self._file, self._text_file):
+            if handle is not None:
+                handle.close()
+
+    def _column_offset(self, name: str) -> int:
+        return ARCHIVE_HEADER_SIZE + ARCHIVE_COLUMN_INDEX[name] * self.capacity * 8
+
+    def column(self, name: str):
+        offset = self._column_offset(name)
+        if np is not None:
+            return np.frombuffer(self._map, dtype=np.int64, count=self.rows, offset=offset)
+        return memoryview(self._map)[offset : offset + self.rows * 8].cast("q")
+
+    def text(self, index: int) -> str:
+        if self._text_map is None:
+            return ""
+        offset = struct.unpack_from("q", self._map, self._column_offset("text_offset") + index * 8)[0]
+        length = struct.unpack_from("q", self._map, self._column_offset("text_length") + index * 8)[0]
+        if length <= 0:
+            return ""
+        return self._text_map[offset : offset + length].decode("utf-8", "replace")
+
+    def erase(self, index: int) -> None:
+        length_offset = self._column_offset("text_length") + index * 8
+        length = struct.unpack_from("q", self._map, length_offset)[0]
+        if length > 0 and self._text_map is not None:
+            offset = struct.unpack_from("q", self._map, self._column_offset("text_offset") + index * 8)[0]
+            self._text_map[offset : offset + length] = bytes(length)
+        for name in ("message_id", "author_id", "text_length"):
+            struct.pack_into("q", self._map, self._column_offset(name) + index * 8, 0)
+
+    def select(
+        self,
+        since_ms: int,
+        *,
+        author_id: int | None = None,
+        target_id: int | None = None,
+        message_ids: set[int] | None = None,
+    ) -> list[int]:
+        ids = self.column("message_id")
+        stamps = self.column("timestamp_ms")
+        authors = self.column("author_id")
+        replies = self.column("reply_author_id")
+        mentions = self.column("mention_id")
+        if np is not None:
+            mask = (ids != 0) & (stamps >= since_ms)
+            if author_id is not None:
+                mask &= authors == author_id
+            if target_id is not None:
+                mask &= (authors != target_id) & ((replies == target_id) | (mentions == target_id))
+            if message_ids is not None:
+                mask &= np.isin(ids, np.fromiter(message_ids, dtype=np.int64, count=len(message_ids)))
+            return np.flatnonzero(mask).tolist()
+
+        selected: list[int] = []
+        for index in range(self.rows):
+            if ids[index] == 0 or stamps[index] < since_ms:
+                continue
+            if author_id is not None and authors[index] != author_id:
+                continue
+            if target_id is not None and (
+                authors[index] == target_id
+                or (replies[index] != target_id and mentions[index] != target_id)
+            ):
+                continue
+            if message_ids is not None and ids[index] not in message_ids:
+                continue
+            selected.append(index)
+        return selected
+
+
+def archive_guild_dir(guild_id: int) -> Path:
+    return ARCHIVE_DIR / str(guild_id)
+
+
+def archive_segment_paths(guild_id: int) -> list[Path]:
+    directory = archive_guild_dir(guild_id)
+    if not directory.is_dir():
+        return []
+    return sorted(directory.glob("*.cols"))
+
+
+def create_archive_segment(guild_id: int, index: int) -> Path:
+    directory = archive_guild_dir(guild_id)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{index:06d}.cols"
+    header = ARCHIVE_HEADER.pack(ARCHIVE_MAGIC, len(ARCHIVE_COLUMNS), MESSAGE_ARCHIVE_SEGMENT_ROWS, 0)
+    with open(path, "wb") as handle:
+        handle.write(header.ljust(ARCHIVE_HEADER_SIZE, b"\0"))
+        handle.truncate(ARCHIVE_HEADER_SIZE + len(ARCHIVE_COLUMNS) * MESSAGE_ARCHIVE_SEGMENT_ROWS * 8)
+    return path
+
+
+def write_archive_chunk(path: Path, rows: list[tuple[int, int, int, int, int, int, int, str]]) -> int:
+    with open(path, "r+b") as handle:
+        magic, column_count, capacity, used = ARCHIVE_HEADER.unpack(handle.read(ARCHIVE_HEADER.size))
+        take = min(len(rows), capacity - used)
+        if take <= 0:
+            return 0
+        chunk = rows[:take]
+        blobs = [row[7].encode("utf-8") for row in chunk]
+        with open(path.with_suffix(".text"), "ab") as text_handle:
+            text_offset = text_handle.tell()
+            text_handle.write(b"".join(blobs))
+        offsets: list[int] = []
+        lengths: list[int] = []
+        for blob in blobs:
+            offsets.append(text_offset)
+            lengths.append(len(blob))
+            text_offset += len(blob)
+
+        columns = [list(values) for values in zip(*(row[:7] for row in chunk))] + [offsets, lengths]
+        for column_index, values in enumerate(columns):
+            handle.seek(ARCHIVE_HEADER_SIZE + (column_index * capacity + used) * 8)
+            handle.write(array("q", values).tobytes())
+        handle.flush()
+        handle.seek(0)
+        handle.write(ARCHIVE_HEADER.pack(magic, column_count, capacity, used + take))
+    return take
+
+
+def append_archive_rows(guild_id: int, rows: list[tuple[int, int, int, int, int, int, int, str]]) -> None:
+    paths = archive_segment_paths(guild_id)
+    path = paths[-1] if paths else create_archive_segment(guild_id, 0)
+    while rows:
+        written = write_archive_chunk(path, rows)
+        rows = rows[written:]
+        if rows:
+            path = create_archive_segment(guild_id, int(path.stem) + 1)
+
+
+def erase_archive_rows(
+    guild_id: int, *, message_ids: set[int] | None = None, author_id: int | None = None
+) -> int:
+    erased = 0
+    for path in archive_segment_paths(guild_id):
+        with ArchiveSegment(path, writable=True) as segment:
+            for index in segment.select(0, author_id=author_id, message_ids=message_ids):
+                segment.erase(index)
+                erased += 1
+    return erased
+
+
+def expire_archive_rows(guild_id: int, cutoff_ms: int) -> int:
+    expired = 0
+    for path in archive_segment_paths(guild_id):
+        with ArchiveSegment(path, writable=True) as segment:
+            stamps = segment.column("timestamp_ms")
+            newest = int(stamps[segment.rows - 1]) if segment.rows else 0
+            if newest >= cutoff_ms:
+                # Rows arrive in time order, so only this segment's head can still be expired; erase it
+                # row by row the same way deletes are, so a guild that never fills a segment still ages out.
+                ids = segment.column("message_id")
+                index = 0
+                while index < segment.rows and stamps[index] < cutoff_ms:
+                    if ids[index]:
+                        segment.erase(index)
+                        expired += 1
+                    index += 1
+                del ids, stamps
+                break
+            del stamps
+        expired += segment.rows
+        path.unlink(missing_ok=True)
+        path.with_suffix(".text").unlink(missing_ok=True)
+    return expired
+
+
+def flush_archive_batches(
+    pending: dict[int, list[tuple[int, int, int, int, int, int, int, str]]],
+    deletes: dict[int, set[int]],
+    cutoffs: dict[int, int],
+) -> None:
+    with ARCHIVE_LOCK:
+        for guild_id, rows in pending.items():
+            append_archive_rows(guild_id, rows)
+        for guild_id, message_ids in deletes.items():
+            erase_archive_rows(guild_id, message_ids=message_ids)
+        for guild_id, cutoff_ms in cutoffs.items():
+            expire_archive_rows(guild_id, cutoff_ms)
+
+
+def query_archive_user_messages(guild_id: int, user_id: int, since_ms: int, limit: int) -> list[str]:
+    collected: list[str] = []
+    with ARCHIVE_LOCK:
+        for path in reversed(archive_segment_paths(guild_id)):
+            with ArchiveSegment(path) as segment:
+                for index in reversed(segment.select(since_ms, author_id=user_id)):
+                    collected.append(segment.text(index))
+                    if len(collected) >= limit:
+                        break
+            if len(collected) >= limit:
+                break
+    collected.reverse()
+    return collected
+
+
+def query_archive_replies_to(
+    guild_id: int, user_id: int, since_ms: int, limit: int
+) -> list[tuple[int, str]]:
+    collected: list[tuple[int, str]] = []
+    with ARCHIVE_LOCK:
+        for path in reversed(archive_segment_paths(guild_id)):
+            with ArchiveSegment(path) as segment:
+                authors = segment.column("author_id")
+                for index in reversed(segment.select(since_ms, target_id=user_id)):
+                    collected.append((int(authors[index]), segment.text(index)))
+                    if len(collected) >= limit:
+                        break
+                del authors
+            if len(collected) >= limit:
+                break
+    collected.reverse()
+    return collected
+
+
+def query_archive_user_targets(guild_id: int, user_id: int, since_ms: int) -> Counter[int]:
+    points: Counter[int] = Counter()
+    with ARCHIVE_LOCK:
+        for path in archive_segment_paths(guild_id):
+            with ArchiveSegment(path) as segment:
+                replies = segment.column("reply_author_id")
+                mentions = segment.column("mention_id")
+                for index in segment.select(since_ms, author_id=user_id):
+                    mentioned = int(mentions[index])
+                    replied = int(replies[index])
+                    if mentioned and mentioned != user_id:
+                        points[mentioned] += 2
+                    if replied and replied != user_id and replied != mentioned:
+                        points[replied] += 3
+                del replies, mentions
+    return points
+
+
+def query_archive_reply_pairs(guild_id: int, since_ms: int) -> Counter[tuple[int, int]]:
+    pairs: Counter[tuple[int, int]] = Counter()
+    author_parts = []
+    reply_parts = []
+    with ARCHIVE_LOCK:
+        for path in archive_segment_paths(guild_id):
+            with ArchiveSegment(path) as segment:
+                ids = segment.column("message_id")
+                stamps = segment.column("timestamp_ms")
+                authors = segment.column("author_id")
+                replies = segment.column("reply_author_id")
+                if np is not None:
+                    mask = (ids != 0) & (stamps >= since_ms) & (replies != 0) & (replies != authors)
+                    author_parts.append(authors[mask])
+                    reply_parts.append(replies[mask])
+                else:
+                    for index in range(segment.rows):
+                        replied = replies[index]
+                        if ids[index] and stamps[index] >= since_ms and replied and replied != authors[index]:
+                            pairs[(authors[index], replied)] += 1
+                del ids, stamps, authors, replies
+
+    if author_parts:
+        # Factorize both id columns to small codes so each pair becomes one int64 key.
+        author_ids, author_codes = np.unique(np.concatenate(author_parts), return_inverse=True)
+        reply_ids, reply_codes = np.unique(np.concatenate(reply_parts), return_inverse=True)
+        keys, counts = np.unique(author_codes * len(reply_ids) + reply_codes, return_counts=True)
+        author_list = author_ids.tolist()
+        reply_list = reply_ids.tolist()
+        width = len(reply_ids)
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            pairs[(author_list[key // width], reply_list[key % width])] = count
+    return pairs
+
+
+def archive_guild_stats(guild_id: int) -> dict[str, int]:
+    stats = {"segments": 0, "rows": 0, "live_rows": 0, "bytes": 0, "oldest_ms": 0, "newest_ms": 0}
+    with ARCHIVE_LOCK:
+        for path in archive_segment_paths(guild_id):
+            with ArchiveSegment(path) as segment:
+                stats["segments"] += 1
+                stats["rows"] += segment.rows
+                ids = segment.column("message_id")
+                stats["live_rows"] += int(np.count_nonzero(ids)) if np is not None else sum(1 for value in ids if value)
+                del ids
+                stats["bytes"] += ARCHIVE_HEADER_SIZE + len(ARCHIVE_COLUMNS) * 8 * segment.rows
+                if segment.rows:
+                    # Rows are appended in arrival order, so the ends of a segment bound its time range.
+                    stamps = segment.column("timestamp_ms")
+                    if not stats["oldest_ms"]:
+                        stats["oldest_ms"] = int(stamps[0])
+                    stats["newest_ms"] = int(stamps[segment.rows - 1])
+                    del stamps
+            text_path = path.with_suffix(".text")
+            if text_path.exists():
+                stats["bytes"] += text_path.stat().st_size
+    return stats
+
+
+def purge_guild_archive(guild_id: int) -> None:
+    with ARCHIVE_LOCK:
+        shutil.rmtree(archive_guild_dir(guild_id), ignore_errors=True)
+
+
+def archive_cutoff_ms(guild_id: int) -> int:
+    return int((time.time() - get_guild_archive_retention_days(guild_id) * 86400) * 1000)
+
+
+def archive_message(message: discord.Message) -> None:
+    if ARCHIVE_TASK is None or message.guild is None or message.author.bot:
+        return
+    record = MessageRecord.from_message(message)
+    text = ""
+    if MESSAGE_ARCHIVE_TEXT_CHARS > 0:
+        text = " ".join(record.content.split())[:MESSAGE_ARCHIVE_TEXT_CHARS]
+    reply_author_id = 0
+    resolved = message.reference.resolved if message.reference else None
+    if isinstance(resolved, discord.Message) and not resolved.author.bot:
+        reply_author_id = resolved.author.id
+    mention_id = next(
+        (m.id for m in message.mentions if not m.bot and m.id != record.author_id), 0
+    )
+    ARCHIVE_PENDING[message.guild.id].append(
+        (
+            record.id,
+            record.author_id,
+            record.channel_id,
+            int(record.timestamp * 1000),
+            record.reference_id or 0,
+            reply_author_id,
+            mention_id,
+            text,
+        )
     )
-    return normalize_vibecheck_output(output)
 
 
-async def collect_recent_channel_transcript(
-    channel: discord.TextChannel,
-    limit: int,
-    *,
-    exclude_message_ids: set[int] | None = None,
-) -> list[str]:
-    lines: list[str] = []
-    async for msg in channel.history(limit=limit):
-        if exclude_message_ids and msg.id in exclude_message_ids:
-            continue
-        if msg.author.bot:
-            continue
-        content = msg.clean_content.strip()
-        if not content:
-            continue
-        lines.append(f"{msg.author.display_name}: {content[:260]}")
-    lines.reverse()
-    return lines
+def forget_archived_message(guild_id: int, message_id: int) -> None:
+    if ARCHIVE_TASK is None:
+        return
+    pending = ARCHIVE_PENDING.get(guild_id)
+    if pending:
+        ARCHIVE_PENDING[guild_id] = [row for row in pending if row[0] != message_id]
+    ARCHIVE_PENDING_DELETES[guild_id].add(message_id)
 
 
-async def collect_recent_user_messages(
-    channel: discord.TextChannel, user_id: int, limit: int
-) -> list[str]:
-    messages: list[str] = []
-    async for msg in channel.history(limit=min(5000, max(limit * 8, limit + 120))):
-        if msg.author.bot or msg.author.id != user_id:
+async def flush_message_archive(*, apply_retention: bool = False) -> None:
+    if not ARCHIVE_PENDING and not ARCHIVE_PENDING_DELETES and not apply_retention:
+        return
+    pending = dict(ARCHIVE_PENDING)
+    deletes = dict(ARCHIVE_PENDING_DELETES)
+    ARCHIVE_PENDING.clear()
+    ARCHIVE_PENDING_DELETES.clear()
+    cutoffs: dict[int, int] = {}
+    if apply_retention and ARCHIVE_DIR.is_dir():
+        for entry in ARCHIVE_DIR.iterdir():
+            if entry.is_dir() and entry.name.isdigit():
+                cutoffs[int(entry.name)] = archive_cutoff_ms(int(entry.name))
+    try:
+        await asyncio.to_thread(flush_archive_batches, pending, deletes, cutoffs)
+    except (OSError, ValueError) as error:
+        # Requeue ahead of anything archived meanwhile so the next flush retries rows and erasures.
+        for guild_id, rows in pending.items():
+            ARCHIVE_PENDING[guild_id][:0] = rows
+        for guild_id, message_ids in deletes.items():
+            ARCHIVE_PENDING_DELETES[guild_id].update(message_ids)
+        print(f"[ARCHIVE FLUSH ERROR] {error}; will retry next flush")
+
+
+async def message_archive_worker() -> None:
+    last_retention = 0.0
+    while True:
+        await asyncio.sleep(MESSAGE_ARCHIVE_FLUSH_SECONDS)
+        apply_retention = time.monotonic() - last_retention >= 3600
+        if apply_retention:
+            last_retention = time.monotonic()
+        await flush_message_archive(apply_retention=apply_retention)
+
+
+def start_message_archive() -> None:
+    global ARCHIVE_TASK
+    if not MESSAGE_ARCHIVE_ENABLED or ARCHIVE_TASK is not None:
+        return
+    ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+    ARCHIVE_TASK = asyncio.create_task(message_archive_worker())
+    backend = "numpy" if np is not None else "memoryview"
+    print(f"Message archive enabled ({backend} scans).")
+
+
+async def roast_context_from_archive(guild_id: int, user_id: int) -> RoastContext | None:
+    if ARCHIVE_TASK is None:
+        return None
+    since_ms = archive_cutoff_ms(guild_id)
+    user_texts = await asyncio.to_thread(
+        query_archive_user_messages, guild_id, user_id, since_ms, ROAST_MAX_HISTORY_MESSAGES
+    )
+    if len(user_texts) < MESSAGE_ARCHIVE_MIN_USER_MESSAGES:
+        return None
+    replies = await asyncio.to_thread(
+        query_archive_replies_to, guild_id, user_id, since_ms, ROAST_MAX_HISTORY_MESSAGES
+    )
+    user_budget = int(ROAST_MAX_CONTEXT_CHARS * 0.72)
+    reply_budget = ROAST_MAX_CONTEXT_CHARS - user_budget
+    user_lines: list[str] = []
+    reply_lines: list[str] = []
+    user_chars = 0
+    reply_chars = 0
+    style = StyleAccumulator()
+    reply_style = StyleAccumulator()
+    for text in user_texts:
+        if not text:
             continue
-        content = msg.clean_content.strip()
-        if not content:
+        style.add(text)
+        user_chars = append_with_char_budget(user_lines, text, user_chars, user_budget)
+    for _author_id, text in replies:
+        if not text:
             continue
-        messages.append(content[:260])
-        if len(messages) >= limit:
-            break
-    messages.reverse()
-    return messages
-
+        reply_style.add(text)
+        reply_chars = append_with_char_budget(reply_lines, text, reply_chars, reply_budget)
+    return RoastContext(
+        scanned_messages=len(user_texts) + len(replies),
+        user_lines=user_lines,
+        reply_lines=reply_lines,
+        style=style,
+        reply_style=reply_style,
+    )
 
-def user_style_stats(user_messages: list[str]) -> dict[str, str]:
-    if not user_messages:
-        return {
-            "avg_len": "0",
-            "question_ratio": "0%",
-            "exclaim_ratio": "0%",
-            "emoji_per_msg": "0.00",
-            "top_words": "none",
-        }
 
-    joined = " ".join(user_messages).lower()
-    words = [w for w in WORD_PATTERN.findall(joined) if len(w) > 2]
-    stop = {
-        "the", "and", "for", "that", "with", "this", "you", "are", "was", "have", "not", "but",
-        "just", "your", "from", "what", "when", "where", "will", "would", "they", "them", "their",
-        "about", "there", "then", "than", "into", "also", "been", "can", "could", "should",
-    }
-    filtered = [w for w in words if w not in stop]
-    common = [w for w, _ in Counter(filtered).most_common(5)]
-    avg_len = sum(len(m) for m in user_messages) / max(1, len(user_messages))
-    question_ratio = sum(1 for m in user_messages if "?" in m) / max(1, len(user_messages))
-    exclaim_ratio = sum(1 for m in user_messages if "!" in m) / max(1, len(user_messages))
-    emoji_count = sum(len(EMOJI_PATTERN.findall(m)) for m in user_messages)
-    emoji_per_msg = emoji_count / max(1, len(user_messages))
-    return {
-        "avg_len": f"{avg_len:.1f}",
-        "question_ratio": f"{question_ratio * 100:.0f}%",
-        "exclaim_ratio": f"{exclaim_ratio * 100:.0f}%",
-        "emoji_per_msg": f"{emoji_per_msg:.2f}",
-        "top_words": ", ".join(common) if common else "none",
-    }
+async def aicrush_interactions_from_archive(
+    guild_id: int, user_id: int
+) -> tuple[int, Counter[int], list[str], dict[int, list[str]]] | None:
+    if ARCHIVE_TASK is None:
+        return None
+    since_ms = archive_cutoff_ms(guild_id)
+    user_texts = await asyncio.to_thread(
+        query_archive_user_messages, guild_id, user_id, since_ms, AICRUSH_MAX_HISTORY_MESSAGES
+    )
+    if len(user_texts) < MESSAGE_ARCHIVE_MIN_USER_MESSAGES:
+        return None
+    interaction_points = await asyncio.to_thread(query_archive_user_targets, guild_id, user_id, since_ms)
+    replies = await asyncio.to_thread(
+        query_archive_replies_to, guild_id, user_id, since_ms, AICRUSH_MAX_HISTORY_MESSAGES
+    )
+    max_target_chars = int(AICRUSH_MAX_CONTEXT_CHARS * 0.66)
+    max_candidate_chars = int(AICRUSH_MAX_CONTEXT_CHARS * 0.34)
+    target_lines: list[str] = []
+    target_chars = 0
+    for text in user_texts:
+        target_chars = append_with_char_budget(target_lines, text, target_chars, max_target_chars)
+    candidate_lines: dict[int, list[str]] = defaultdict(list)
+    candidate_chars: dict[int, int] = defaultdict(int)
+    for author_id, text in replies:
+        interaction_points[author_id] += 2
+        candidate_chars[author_id] = append_with_char_budget(
+            candidate_lines[author_id], text, candidate_chars[author_id], max_candidate_chars
+        )
+    return len(user_texts), interaction_points, target_lines, dict(candidate_lines)
 
 
 async def request_fun_ai(
@@ -3666,7 +6839,22 @@ async def apply_automod_action(
 async def on_ready() -> None:
     global FFMPEG_EXECUTABLE, APP_COMMANDS_SYNCED
     count = reload_bad_words()
+    # A fresh gateway session may have missed messages, so cached windows could have gaps.
+    CHANNEL_MESSAGE_WINDOWS.clear()
     FFMPEG_EXECUTABLE = resolve_ffmpeg_executable()
+    start_style_profiler()
+    start_message_archive()
+    start_music_queue_journal()
+    start_voice_keepalive()
+    start_session_sweeper()
+    await start_psych_session_journal()
+    schedule_reminder_dispatch()
+    if not MUSIC_METADATA_CACHE.entries:
+        load_music_metadata_cache()
+    await warm_ytdl_process_pool()
+    if MUSIC_AUDIO_CACHE_ENABLED and not MUSIC_AUDIO_CACHE.entries:
+        cached_files = await asyncio.to_thread(MUSIC_AUDIO_CACHE.load)
+        print(f"Audio cache: {cached_files} file(s) in {AUDIO_CACHE_DIR}.")
     if BOT_ACTIVITY_TEXT:
         try:
             await bot.change_presence(
@@ -3694,6 +6882,10 @@ async def on_ready() -> None:
 
 @bot.event
 async def on_message(message: discord.Message) -> None:
+    record_channel_message(message)
+    enqueue_style_profile_message(message)
+    archive_message(message)
+
     if message.author.bot:
         return
 
@@ -3831,6 +7023,30 @@ async def on_message_delete(message: discord.Message) -> None:
     }
 
 
+# The raw events also fire for uncached messages and for purges/bulk deletes.
+@bot.event
+async def on_raw_message_delete(payload: discord.RawMessageDeleteEvent) -> None:
+    forget_channel_message(payload.channel_id, payload.message_id)
+    if payload.guild_id is not None:
+        forget_archived_message(payload.guild_id, payload.message_id)
+        forget_style_samples(payload.guild_id, message_ids={payload.message_id})
+
+
+@bot.event
+async def on_raw_bulk_message_delete(payload: discord.RawBulkMessageDeleteEvent) -> None:
+    forget_channel_messages(payload.channel_id, payload.message_ids)
+    if payload.guild_id is None:
+        return
+    for message_id in payload.message_ids:
+        forget_archived_message(payload.guild_id, message_id)
+    forget_style_samples(payload.guild_id, message_ids=payload.message_ids)
+
+
+@bot.event
+async def on_message_edit(before: discord.Message, after: discord.Message) -> None:
+    update_channel_message(after)
+
+
 @bot.command(name="help")
 async def help_command(ctx: commands.Context) -> None:
     text = (
@@ -3856,6 +7072,9 @@ async def help_command(ctx: commands.Context) -> None:
         f"`{PREFIX}genderroles` / `{PREFIX}cleargenderroles`\n"
         f"`{PREFIX}automod <on|off|toggle|status>` - Enable or disable AutoMod in this server.\n"
         f"`{PREFIX}reloadbadwords` - Reload `data/bad_words.txt`.\n"
+        f"`{PREFIX}archivestats` - Message archive size, range and top reply pairs.\n"
+        f"`{PREFIX}archiveretention [days]` - Show or set how long archived messages are kept.\n"
+        f"`{PREFIX}archivepurge <all|@member|user id>` - Erase this server's archive and style profiles, or one user's (ids work for users who left).\n"
         f"`{PREFIX}say <message>` - Moderator echo command (deletes your command message).\n"
         "\n"
         "**Utility/Fun Commands**\n"
@@ -3866,6 +7085,7 @@ async def help_command(ctx: commands.Context) -> None:
         f"`{PREFIX}poll <question | option1 | option2 ...>` (2-10 options)\n"
         f"`{PREFIX}snipe` - Show last deleted non-bot message in this channel.\n"
         f"`{PREFIX}remind <minutes> <text>` - Sends you a DM reminder.\n"
+        f"`{PREFIX}reminders`, `{PREFIX}cancelreminder <id>` - List or cancel your pending reminders.\n"
         f"`{PREFIX}cat` / `{PREFIX}food` - Send random cat or Indian veg food image.\n"
         "\n"
         "**AI Commands**\n"
@@ -3881,6 +7101,7 @@ async def help_command(ctx: commands.Context) -> None:
         f"`{PREFIX}rizzcoach [smooth|funny|mysterious] <message>`\n"
         f"`{PREFIX}argument <topic>` - starts persistent argument mode (`bell stop argument` to end).\n"
         f"`{PREFIX}debate <@user> <topic>`\n"
+        f"`{PREFIX}sessionstats` - (bot owner) Live psych/argument/AI-memory sessions, evictions and memory.\n"
         "\n"
         "**Vibe Commands**\n"
         f"`{PREFIX}myvibe [count]` - Analyze your own recent messages in this channel.\n"
@@ -3891,7 +7112,11 @@ async def help_command(ctx: commands.Context) -> None:
         f"`{PREFIX}join` / `{PREFIX}leave`\n"
         f"`{PREFIX}play <youtube/spotify link or search>`\n"
         f"`{PREFIX}skip`, `{PREFIX}pause`, `{PREFIX}resume`, `{PREFIX}stop`\n"
-        f"`{PREFIX}queue`, `{PREFIX}nowplaying`\n"
+        f"`{PREFIX}queue [page]`, `{PREFIX}nowplaying`\n"
+        f"`{PREFIX}remove <pos>`, `{PREFIX}move <from> <to>`, `{PREFIX}shuffle`, `{PREFIX}dedupe`\n"
+        f"`{PREFIX}musicstats` - Music cache, extractor, playback and this server's ffmpeg CPU/RSS stats.\n"
+        f"`{PREFIX}musichost` - (bot owner) ffmpeg/player CPU and RSS for every playing server.\n"
+        f"`{PREFIX}voicestats` - Voice connect latency, failures and reconnect backoff.\n"
     )
     await send_chunked(ctx, text)
 
@@ -4010,6 +7235,115 @@ async def automod_command(ctx: commands.Context, mode: str | None = None) -> Non
     )
 
 
+@bot.command(name="archivestats")
+@commands.guild_only()
+@commands.has_permissions(manage_guild=True)
+async def archive_stats_command(ctx: commands.Context) -> None:
+    if ARCHIVE_TASK is None:
+        await ctx.send("Message archive is disabled. Set `MESSAGE_ARCHIVE_ENABLED=true` to enable it.")
+        return
+
+    await flush_message_archive()
+    stats = await asyncio.to_thread(archive_guild_stats, ctx.guild.id)
+    retention_days = get_guild_archive_retention_days(ctx.guild.id)
+    started = time.perf_counter()
+    pairs = await asyncio.to_thread(query_archive_reply_pairs, ctx.guild.id, archive_cutoff_ms(ctx.guild.id))
+    query_ms = (time.perf_counter() - started) * 1000
+
+    def _date(ms: int) -> str:
+        return time.strftime("%Y-%m-%d", time.gmtime(ms / 1000)) if ms else "-"
+
+    pair_lines = []
+    for (author_id, replied_id), count in pairs.most_common(3):
+        author = ctx.guild.get_member(author_id)
+        replied = ctx.guild.get_member(replied_id)
+        author_name = author.display_name if author else str(author_id)
+        replied_name = replied.display_name if replied else str(replied_id)
+        pair_lines.append(f"{author_name} → {replied_name}: `{count}`")
+
+    await ctx.send(
+        "**Message archive**\n"
+        f"Rows: `{stats['live_rows']}` live / `{stats['rows']}` stored in `{stats['segments']}` segment(s)\n"
+        f"Size: `{stats['bytes'] / (1024 * 1024):.1f} MiB`\n"
+        f"Range: `{_date(stats['oldest_ms'])}` to `{_date(stats['newest_ms'])}`\n"
+        f"Retention: `{retention_days}` day(s)\n"
+        f"Reply-pair scan: `{query_ms:.1f} ms` ({'numpy' if np is not None else 'memoryview'})\n"
+        "Top reply pairs:\n" + ("\n".join(pair_lines) if pair_lines else "(none yet)")
+    )
+
+
+@bot.command(name="archiveretention")
+@commands.guild_only()
+@commands.has_permissions(manage_guild=True)
+async def archive_retention_command(ctx: commands.Context, days: int | None = None) -> None:
+    if days is None:
+        current = get_guild_archive_retention_days(ctx.guild.id)
+        await ctx.send(f"Archived messages are kept for `{current}` day(s) in this server.")
+        return
+    if days < 1 or days > 3650:
+        await ctx.send("Retention must be between 1 and 3650 days.")
+        return
+
+    set_guild_archive_retention_days(ctx.guild.id, days)
+    await flush_message_archive(apply_retention=True)
+    await ctx.send(f"Archived messages will now be kept for `{days}` day(s).")
+    await send_mod_log(
+        ctx.guild,
+        "Config: Archive Retention Updated",
+        moderator=ctx.author,
+        channel=ctx.channel,
+        details=f"Retention: `{days}` day(s)",
+    )
+
+
+@bot.command(name="archivepurge")
+@commands.guild_only()
+@commands.has_permissions(manage_guild=True)
+async def archive_purge_command(ctx: commands.Context, target: str | None = None) -> None:
+    normalized = (target or "").strip()
+    if not normalized:
+        await ctx.send(f"Usage: `{PREFIX}archivepurge <all|@member|user id>`")
+        return
+
+    if normalized.lower() == "all":
+        ARCHIVE_PENDING.pop(ctx.guild.id, None)
+        ARCHIVE_PENDING_DELETES.pop(ctx.guild.id, None)
+        await asyncio.to_thread(purge_guild_archive, ctx.guild.id)
+        purge_style_profiles(ctx.guild.id)
+        await save_style_profiles()
+        details = "Scope: entire server"
+        await ctx.send("Erased the message archive and style profiles for this server.")
+    else:
+        # Users who already left the server still have archived rows, so ids are accepted too.
+        try:
+            user_id = (await commands.UserConverter().convert(ctx, normalized)).id
+        except commands.BadArgument:
+            digits = normalized.strip("<@!>")
+            if not digits.isdigit():
+                await ctx.send(f"Usage: `{PREFIX}archivepurge <all|@member|user id>`")
+                return
+            user_id = int(digits)
+        await flush_message_archive()
+
+        def _erase() -> int:
+            with ARCHIVE_LOCK:
+                return erase_archive_rows(ctx.guild.id, author_id=user_id)
+
+        erased = await asyncio.to_thread(_erase)
+        purge_style_profiles(ctx.guild.id, user_id)
+        await save_style_profiles()
+        details = f"Scope: <@{user_id}> (`{user_id}`, `{erased}` rows)"
+        await ctx.send(f"Erased `{erased}` archived message(s) and the style profile of <@{user_id}>.")
+
+    await send_mod_log(
+        ctx.guild,
+        "Archive Purged",
+        moderator=ctx.author,
+        channel=ctx.channel,
+        details=details,
+    )
+
+
 @bot.command(name="say")
 @commands.guild_only()
 async def say_command(ctx: commands.Context, *, text: str | None = None) -> None:
@@ -4151,28 +7485,186 @@ async def snipe_command(ctx: commands.Context) -> None:
     await ctx.send(embed=embed)
 
 
+def reminder_to_record(reminder: Reminder) -> dict:
+    return {
+        "id": reminder.id,
+        "user_id": reminder.user_id,
+        "channel_id": reminder.channel_id,
+        "guild": reminder.guild_name,
+        "text": reminder.text,
+        "due_at": reminder.due_at,
+        "created_at": reminder.created_at,
+    }
+
+
+def load_reminders() -> int:
+    global REMINDER_NEXT_ID
+    try:
+        payload = json.loads(REMINDERS_FILE.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        payload = {}
+    except (OSError, ValueError) as error:
+        # Kept aside for manual recovery; the next save would otherwise overwrite it.
+        backup = REMINDERS_FILE.with_name(f"{REMINDERS_FILE.name}.corrupt-{int(time.time())}")
+        print(f"[REMINDER LOAD ERROR] {REMINDERS_FILE} is unreadable ({error}); moved to {backup.name}.")
+        try:
+            os.replace(REMINDERS_FILE, backup)
+        except OSError:
+            pass
+        payload = {}
+    records = payload.get("reminders") if isinstance(payload, dict) else None
+    for record in records if isinstance(records, list) else []:
+        try:
+            reminder = Reminder(
+                id=int(record["id"]),
+                user_id=int(record["user_id"]),
+                channel_id=int(record["channel_id"]),
+                guild_name=str(record.get("guild") or ""),
+                text=str(record["text"]),
+                due_at=float(record["due_at"]),
+                created_at=float(record.get("created_at") or record["due_at"]),
+            )
+        except (KeyError, TypeError, ValueError):
+            continue
+        REMINDERS[reminder.id] = reminder
+    REMINDER_HEAP[:] = [(reminder.due_at, reminder.id) for reminder in REMINDERS.values()]
+    heapq.heapify(REMINDER_HEAP)
+    REMINDER_NEXT_ID = max(REMINDERS, default=0) + 1
+    return len(REMINDERS)
+
+
+async def save_reminders() -> None:
+    # Serialized so an older snapshot can never land on disk after a newer one.
+    async with REMINDER_SAVE_LOCK:
+        payload = {"reminders": [reminder_to_record(reminder) for reminder in REMINDERS.values()]}
+        try:
+            await asyncio.to_thread(write_json_atomic, REMINDERS_FILE, payload)
+        except OSError as error:
+            print(f"[REMINDER SAVE ERROR] {error}")
+
+
+def add_reminder(user_id: int, channel_id: int, guild_name: str, text: str, delay_seconds: float) -> Reminder:
+    global REMINDER_NEXT_ID
+    now = time.time()
+    reminder = Reminder(REMINDER_NEXT_ID, user_id, channel_id, guild_name, text, now + delay_seconds, now)
+    REMINDER_NEXT_ID += 1
+    REMINDERS[reminder.id] = reminder
+    heapq.heappush(REMINDER_HEAP, (reminder.due_at, reminder.id))
+    schedule_reminder_dispatch()
+    return reminder
+
+
+def user_reminders(user_id: int) -> list[Reminder]:
+    return sorted(
+        (reminder for reminder in REMINDERS.values() if reminder.user_id == user_id),
+        key=lambda reminder: reminder.due_at,
+    )
+
+
+async def deliver_reminder(reminder: Reminder) -> bool:
+    late_minutes = int((time.time() - reminder.due_at) // 60)
+    suffix = f"\n_(delivered {late_minutes} minute(s) late after a restart)_" if late_minutes >= 2 else ""
+    source = f" from **{reminder.guild_name}**" if reminder.guild_name else ""
+    try:
+        user = bot.get_user(reminder.user_id) or await bot.fetch_user(reminder.user_id)
+        await user.send(f"Reminder{source}: {reminder.text}{suffix}")
+        return True
+    except discord.HTTPException as error:
+        if error.status == 429:
+            return False
+    channel = bot.get_channel(reminder.channel_id)
+    if channel is not None:
+        try:
+            await channel.send(f"<@{reminder.user_id}> reminder: {reminder.text}{suffix}", delete_after=20)
+        except discord.HTTPException as error:
+            return error.status != 429
+    return True
+
+
+def arm_reminder_timer() -> None:
+    while REMINDER_HEAP and REMINDER_HEAP[0][1] not in REMINDERS:
+        heapq.heappop(REMINDER_HEAP)
+    if not REMINDER_HEAP:
+        TIMERS.cancel(REMINDER_TIMER_KEY)
+        return
+    # Due times are wall-clock; the hour cap re-checks after wall-clock jumps.
+    TIMERS.schedule(REMINDER_TIMER_KEY, min(REMINDER_HEAP[0][0] - time.time(), 3600), dispatch_due_reminders)
+
+
+def schedule_reminder_dispatch() -> None:
+    # A dispatch in progress re-arms the timer itself once its batches are sent.
+    if not TIMERS.is_running(REMINDER_TIMER_KEY):
+        arm_reminder_timer()
+
+
+async def dispatch_due_reminders() -> None:
+    try:
+        while True:
+            now = time.time()
+            batch: list[Reminder] = []
+            while REMINDER_HEAP and REMINDER_HEAP[0][0] <= now and len(batch) < REMINDER_SEND_BATCH:
+                _, reminder_id = heapq.heappop(REMINDER_HEAP)
+                reminder = REMINDERS.pop(reminder_id, None)
+                if reminder is not None:
+                    batch.append(reminder)
+            if not batch:
+                return
+            results = await asyncio.gather(*(deliver_reminder(reminder) for reminder in batch), return_exceptions=True)
+            retry_at = time.time() + REMINDER_SEND_INTERVAL_SECONDS * 5
+            for reminder, result in zip(batch, results):
+                if isinstance(result, Exception):
+                    print(f"[REMINDER ERROR] #{reminder.id}: {result}")
+                elif result is False:
+                    # Rate limited: keep the reminder and try it again shortly.
+                    REMINDERS[reminder.id] = reminder
+                    heapq.heappush(REMINDER_HEAP, (retry_at, reminder.id))
+            await save_reminders()
+            if REMINDER_HEAP and REMINDER_HEAP[0][0] <= time.time():
+                await asyncio.sleep(REMINDER_SEND_INTERVAL_SECONDS)
+    finally:
+        arm_reminder_timer()
+
+
 @bot.command(name="remind")
 async def remind_command(ctx: commands.Context, minutes: int, *, reminder_text: str) -> None:
     if minutes < 1 or minutes > 10080:
         await ctx.send("Minutes must be between `1` and `10080`.")
         return
+    if len(user_reminders(ctx.author.id)) >= REMINDER_MAX_PER_USER:
+        await ctx.send(
+            f"You already have `{REMINDER_MAX_PER_USER}` pending reminders. "
+            f"Cancel one with `{PREFIX}cancelreminder <id>`."
+        )
+        return
 
-    await ctx.send(f"Reminder set. I will DM you in `{minutes}` minute(s).")
+    reminder = add_reminder(ctx.author.id, ctx.channel.id, ctx.guild.name, reminder_text[:1500], minutes * 60)
+    await save_reminders()
+    await ctx.send(f"Reminder `#{reminder.id}` set. I will DM you in `{minutes}` minute(s).")
 
-    async def fire_reminder() -> None:
-        await asyncio.sleep(minutes * 60)
-        try:
-            await ctx.author.send(f"Reminder from **{ctx.guild.name}**: {reminder_text}")
-        except discord.HTTPException:
-            try:
-                await ctx.send(
-                    f"{ctx.author.mention} reminder: {reminder_text}",
-                    delete_after=20,
-                )
-            except discord.HTTPException:
-                pass
 
-    asyncio.create_task(fire_reminder())
+@bot.command(name="reminders")
+async def reminders_command(ctx: commands.Context) -> None:
+    pending = user_reminders(ctx.author.id)
+    if not pending:
+        await ctx.send("You have no pending reminders.")
+        return
+    lines = [f"**Your reminders** ({len(pending)}/{REMINDER_MAX_PER_USER})"]
+    for reminder in pending:
+        text = reminder.text if len(reminder.text) <= 80 else reminder.text[:77] + "..."
+        lines.append(f"`#{reminder.id}` <t:{int(reminder.due_at)}:R> - {text}")
+    await send_chunked(ctx, "\n".join(lines))
+
+
+@bot.command(name="cancelreminder", aliases=["unremind"])
+async def cancel_reminder_command(ctx: commands.Context, reminder_id: int) -> None:
+    reminder = REMINDERS.get(reminder_id)
+    if reminder is None or reminder.user_id != ctx.author.id:
+        await ctx.send(f"No pending reminder `#{reminder_id}` of yours. See `{PREFIX}reminders`.")
+        return
+    # The heap entry is left behind and skipped by the dispatcher.
+    REMINDERS.pop(reminder_id, None)
+    await save_reminders()
+    await ctx.send(f"Reminder `#{reminder_id}` cancelled.")
 
 
 @bot.command(name="join")
@@ -4182,6 +7674,8 @@ async def join_voice(ctx: commands.Context) -> None:
         return
     MUSIC_TEXT_CHANNELS[ctx.guild.id] = ctx.channel.id
     await ctx.send(f"Joined voice channel: {vc.channel.mention}")
+    if MUSIC_QUEUES[ctx.guild.id] and not vc.is_playing() and not vc.is_paused():
+        await play_next_track(ctx.guild)
 
 
 @bot.command(name="leave", aliases=["dc", "disconnect"])
@@ -4194,9 +7688,10 @@ async def leave_voice(ctx: commands.Context) -> None:
         await ctx.send("You must be in my voice channel to use this command.")
         return
 
-    MUSIC_QUEUES[ctx.guild.id].clear()
-    MUSIC_NOW_PLAYING.pop(ctx.guild.id, None)
+    forget_music_queue(ctx.guild.id)
     MUSIC_TEXT_CHANNELS.pop(ctx.guild.id, None)
+    cancel_music_prefetch(ctx.guild.id)
+    end_voice_session(ctx.guild.id)
     await vc.disconnect(force=True)
     await ctx.send("Disconnected and cleared music queue.")
 
@@ -4225,24 +7720,30 @@ async def play_music(ctx: commands.Context, *, source: str) -> None:
 
     MUSIC_TEXT_CHANNELS[ctx.guild.id] = ctx.channel.id
 
+    if is_spotify_source(source):
+        await queue_spotify_source(ctx, source)
+        return
+
     async with ctx.typing():
         try:
-            tracks, label = await source_to_tracks(source, ctx.author.id)
+            tracks = await source_to_tracks(source, ctx.author.id)
         except Exception as error:
             await ctx.send(f"Could not queue track(s): `{error}`")
             return
 
     queue = MUSIC_QUEUES[ctx.guild.id]
     queue.extend(tracks)
+    mark_music_queues_dirty()
 
     if len(tracks) == 1:
         await ctx.send(f"Queued: **{tracks[0].title}**")
     else:
-        extra = f" from **{label}**" if label else ""
-        await ctx.send(f"Queued `{len(tracks)}` tracks{extra}.")
+        await ctx.send(f"Queued `{len(tracks)}` tracks.")
 
     if not vc.is_playing() and not vc.is_paused():
         await play_next_track(ctx.guild)
+    else:
+        schedule_music_prefetch(ctx.guild.id)
 
 
 @bot.command(name="skip")
@@ -4271,6 +7772,8 @@ async def pause_music(ctx: commands.Context) -> None:
         await ctx.send("You must be in my voice channel to use this command.")
         return
     vc.pause()
+    if ctx.guild.id in MUSIC_CLOCKS:
+        MUSIC_CLOCKS[ctx.guild.id].pause()
     await ctx.send("Paused playback.")
 
 
@@ -4284,6 +7787,8 @@ async def resume_music(ctx: commands.Context) -> None:
         await ctx.send("You must be in my voice channel to use this command.")
         return
     vc.resume()
+    if ctx.guild.id in MUSIC_CLOCKS:
+        MUSIC_CLOCKS[ctx.guild.id].resume()
     await ctx.send("Resumed playback.")
 
 
@@ -4296,17 +7801,17 @@ async def stop_music(ctx: commands.Context) -> None:
     if not in_same_voice_channel(ctx):
         await ctx.send("You must be in my voice channel to use this command.")
         return
-    MUSIC_QUEUES[ctx.guild.id].clear()
-    MUSIC_NOW_PLAYING.pop(ctx.guild.id, None)
+    forget_music_queue(ctx.guild.id)
+    cancel_music_prefetch(ctx.guild.id)
     if vc.is_playing() or vc.is_paused():
         vc.stop()
     await ctx.send("Stopped playback and cleared queue.")
 
 
 @bot.command(name="queue", aliases=["q"])
-async def queue_music(ctx: commands.Context) -> None:
+async def queue_music(ctx: commands.Context, page: int = 1) -> None:
     now_playing = MUSIC_NOW_PLAYING.get(ctx.guild.id)
-    queue = MUSIC_QUEUES.get(ctx.guild.id, deque())
+    queue = MUSIC_QUEUES.get(ctx.guild.id) or MusicQueue()
     if not now_playing and not queue:
         await ctx.send("Queue is empty.")
         return
@@ -4315,13 +7820,164 @@ async def queue_music(ctx: commands.Context) -> None:
     if now_playing:
         lines.append(f"Now: **{now_playing.title}**")
     if queue:
-        for i, track in enumerate(list(queue)[:10], start=1):
+        pages = (len(queue) + MUSIC_QUEUE_PAGE_SIZE - 1) // MUSIC_QUEUE_PAGE_SIZE
+        page = max(1, min(page, pages))
+        start = (page - 1) * MUSIC_QUEUE_PAGE_SIZE
+        for i, track in enumerate(queue.slice(start, start + MUSIC_QUEUE_PAGE_SIZE), start=start + 1):
             lines.append(f"{i}. {track.title}")
-        if len(queue) > 10:
-            lines.append(f"...and {len(queue) - 10} more.")
+        lines.append(f"Page `{page}/{pages}` · `{len(queue)}` queued · `{PREFIX}queue <page>`")
     await ctx.send("\n".join(lines))
 
 
+async def edit_music_queue(ctx: commands.Context) -> MusicQueue | None:
+    queue = MUSIC_QUEUES.get(ctx.guild.id)
+    if not queue:
+        await ctx.send("Queue is empty.")
+        return None
+    if not in_same_voice_channel(ctx):
+        await ctx.send("You must be in my voice channel to use this command.")
+        return None
+    return queue
+
+
+def queue_edited(guild_id: int) -> None:
+    mark_music_queues_dirty()
+    # The head may have changed, so the prefetched stream may no longer be the next track.
+    schedule_music_prefetch(guild_id)
+
+
+def music_track_identity(track: MusicTrack) -> str:
+    if track.search_query:
+        return "search:" + " ".join(track.search_query.lower().split())
+    return audio_cache_key(track.webpage_url) or track.webpage_url
+
+
+@bot.command(name="remove")
+async def remove_music(ctx: commands.Context, position: int) -> None:
+    queue = await edit_music_queue(ctx)
+    if queue is None:
+        return
+    if not 1 <= position <= len(queue):
+        await ctx.send(f"Position must be between 1 and {len(queue)}.")
+        return
+    track = queue.pop(position - 1)
+    queue_edited(ctx.guild.id)
+    await ctx.send(f"Removed **{track.title}**.")
+
+
+@bot.command(name="move")
+async def move_music(ctx: commands.Context, source: int, target: int) -> None:
+    queue = await edit_music_queue(ctx)
+    if queue is None:
+        return
+    if not (1 <= source <= len(queue) and 1 <= target <= len(queue)):
+        await ctx.send(f"Positions must be between 1 and {len(queue)}.")
+        return
+    track = queue.move(source - 1, target - 1)
+    queue_edited(ctx.guild.id)
+    await ctx.send(f"Moved **{track.title}** to position {target}.")
+
+
+@bot.command(name="shuffle")
+async def shuffle_music(ctx: commands.Context) -> None:
+    queue = await edit_music_queue(ctx)
+    if queue is None:
+        return
+    queue.shuffle()
+    queue_edited(ctx.guild.id)
+    await ctx.send(f"Shuffled `{len(queue)}` queued tracks.")
+
+
+@bot.command(name="dedupe")
+async def dedupe_music(ctx: commands.Context) -> None:
+    queue = await edit_music_queue(ctx)
+    if queue is None:
+        return
+    current = MUSIC_NOW_PLAYING.get(ctx.guild.id)
+    seen = {music_track_identity(current)} if current is not None else set()
+    removed = queue.dedupe(music_track_identity, seen)
+    if removed:
+        queue_edited(ctx.guild.id)
+    await ctx.send(f"Removed `{removed}` duplicate track(s); `{len(queue)}` left.")
+
+
+@bot.command(name="musicstats")
+@commands.guild_only()
+async def music_stats_command(ctx: commands.Context) -> None:
+    await send_chunked(
+        ctx,
+        "**Music stats**\n"
+        f"Metadata (search/URL → track, on disk): {MUSIC_METADATA_CACHE.stats_line()}\n"
+        f"Stream URLs (expiry-aware): {MUSIC_STREAM_CACHE.stats_line()}\n"
+        f"yt-dlp extractor pool: {ytdl_stats_line()}\n"
+        f"Playback: `{MUSIC_PLAYBACK_STATS['opus passthrough']}` opus passthrough / "
+        f"`{MUSIC_PLAYBACK_STATS['transcoded']}` transcoded\n"
+        f"Track handoff (song end → next play): {music_handoff_stats_line()}\n"
+        + (f"Audio file cache: {MUSIC_AUDIO_CACHE.stats_line()}\n" if MUSIC_AUDIO_CACHE_ENABLED else "")
+        + "Format strategies: "
+        + ("; ".join(format_strategy_stats_lines()) or "no stream extractions yet")
+        + "\n"
+        + guild_stream_usage_line(ctx.guild),
+    )
+
+
+@bot.command(name="musichost")
+@commands.is_owner()
+async def music_host_command(ctx: commands.Context) -> None:
+    await send_chunked(ctx, "**Music host usage**\n" + "\n".join(voice_stream_usage_lines()))
+
+
+@bot.command(name="voicestats")
+async def voice_stats_command(ctx: commands.Context) -> None:
+    histogram = VOICE_CONNECT_HISTOGRAM
+    attempts = sum(session.attempts for session in VOICE_SESSIONS.values())
+    states = Counter(session.state for session in VOICE_SESSIONS.values())
+    lines = [
+        "**Voice stats**",
+        f"Connect attempts: `{attempts}` (`{histogram.total}` ok), latency p50 `{histogram.percentile(0.5)}`, "
+        f"p95 `{histogram.percentile(0.95)}`",
+        f"Connect latency: {histogram.render()}",
+        "Sessions: " + (", ".join(f"{state} `{count}`" for state, count in sorted(states.items())) or "none"),
+    ]
+    if VOICE_CONNECT_FAILURES:
+        lines.append(
+            "Failures by region: "
+            + ", ".join(f"{region} `{count}`" for region, count in VOICE_CONNECT_FAILURES.most_common(5))
+        )
+    session = VOICE_SESSIONS.get(ctx.guild.id)
+    if session is not None:
+        retry_in = max(0.0, session.retry_at - time.monotonic())
+        recent = " ".join(
+            f"{'✓' if ok else '✗'}{latency:.1f}s" for _, ok, latency, _ in list(session.history)[-8:]
+        )
+        lines.append(
+            f"This server: `{session.state}`, `{session.failures}` consecutive failure(s)"
+            + (f", next try in `{retry_in:.0f}s`" if session.state == "backoff" and retry_in else "")
+            + (f", recent {recent}" if recent else "")
+        )
+        if session.failures and session.last_error:
+            lines.append(f"Last error: `{session.last_error}`")
+    await send_chunked(ctx, "\n".join(lines))
+
+
+@bot.command(name="sessionstats")
+@commands.is_owner()
+async def session_stats_command(ctx: commands.Context) -> None:
+    lines = ["**Session stats**"]
+    for store in SESSION_STORES:
+        lines.append(f"{store.name.capitalize()}: {store.stats_line()}, idle TTL `{store.ttl_seconds / 60:.0f}m`")
+    lines.append(
+        f"AI memory: `{AI_MEMORY_TOKEN_BUDGET}`-token budget, `{AI_MEMORY_STATS['summaries']}` summaries "
+        f"(`{AI_MEMORY_STATS['turns_summarized']}` turns folded, `{AI_MEMORY_STATS['failed']}` failed), "
+        f"`{len(AI_CHAT_CACHE)}` channel memories"
+    )
+    lines.append(
+        f"Timers: `{len(TIMERS.keys('psych'))}` psych flushes pending, `{TIMERS.fired}` fired, "
+        f"`{len(REMINDERS)}` reminders; sweep every `{SESSION_SWEEP_SECONDS}s`"
+    )
+    await send_chunked(ctx, "\n".join(lines))
+
+
 @bot.command(name="nowplaying", aliases=["np"])
 async def now_playing_music(ctx: commands.Context) -> None:
     current = MUSIC_NOW_PLAYING.get(ctx.guild.id)
@@ -4389,12 +8045,12 @@ async def aireset_command(ctx: commands.Context) -> None:
     for key in list(CONVERSATIONAL_AI_CACHE.keys()):
         if key[0] == ctx.channel.id:
             CONVERSATIONAL_AI_CACHE.pop(key, None)
-    for key in list(PSYCH_SESSIONS.keys()):
+    for key in [*PSYCH_SESSIONS.keys(), *PSYCH_SNAPSHOT_KEYS]:
         if key[0] == ctx.channel.id:
             stop_psych_session(key[0], key[1])
-    for key in list(PSYCH_PENDING_TASKS.keys()):
-        if key[0] == ctx.channel.id:
-            cancel_psych_flush(key[0], key[1])
+    for _, channel_id, user_id in TIMERS.keys("psych"):
+        if channel_id == ctx.channel.id:
+            cancel_psych_flush(channel_id, user_id)
     await ctx.send("AI memory has been cleared for this channel.", delete_after=6)
 
 
@@ -4564,7 +8220,13 @@ async def roast_command(
                 await send_chunked(ctx, fresh_cached[1] + "\n\n_(Cached result to reduce API load)_")
                 return
 
-            context = await collect_roast_context(ctx.guild, member.id)
+            profile = ready_style_profile(ctx.guild.id, member.id)
+            if profile is not None:
+                context = roast_context_from_profile(profile)
+            else:
+                context = await roast_context_from_archive(ctx.guild.id, member.id)
+                if context is None:
+                    context = await collect_roast_context(ctx.guild, member.id)
             if context.message_count < 6:
                 await ctx.send(
                     f"Not enough visible history for {member.mention}. I need a few more messages across readable channels."
@@ -4641,9 +8303,10 @@ async def aicrush_command(ctx: commands.Context, member: discord.Member) -> None
 
     async with ctx.typing():
         async with scan_lock:
-            total_messages, interaction_points, target_lines, candidate_lines = await collect_aicrush_interactions(
-                ctx.guild, member.id
-            )
+            interactions = await aicrush_interactions_from_archive(ctx.guild.id, member.id)
+            if interactions is None:
+                interactions = await collect_aicrush_interactions(ctx.guild, member.id)
+            total_messages, interaction_points, target_lines, candidate_lines = interactions
             if total_messages < 1:
                 await ctx.send(
                     f"I could not find any visible messages from {member.mention} in accessible channels."
@@ -4732,11 +8395,16 @@ async def analyze_command(ctx: commands.Context, member: discord.Member) -> None
         return
 
     async with ctx.typing():
-        user_messages = await collect_recent_user_messages(ctx.channel, member.id, 200)
-        if len(user_messages) < 20:
-            await ctx.send(f"Need more recent messages from {member.mention} in this channel.")
-            return
-        stats = user_style_stats(user_messages)
+        profile = ready_style_profile(ctx.guild.id, member.id)
+        if profile is not None:
+            user_messages = profile.sample_texts()
+            stats = profile.style().display_stats()
+        else:
+            user_messages = await collect_recent_user_messages(ctx.channel, member.id, 200)
+            if len(user_messages) < 20:
+                await ctx.send(f"Need more recent messages from {member.mention} in this channel.")
+                return
+            stats = user_style_stats(user_messages)
         prompt = (
             "Analyze this Discord user's communication style in a fun, non-clinical way.\n"
             "No medical or mental-health diagnosis.\n"
@@ -4807,7 +8475,11 @@ async def futureme_command(ctx: commands.Context) -> None:
         return
 
     async with ctx.typing():
-        user_messages = await collect_recent_user_messages(ctx.channel, ctx.author.id, 120)
+        profile = ready_style_profile(ctx.guild.id, ctx.author.id)
+        if profile is not None:
+            user_messages = profile.sample_texts()
+        else:
+            user_messages = await collect_recent_user_messages(ctx.channel, ctx.author.id, 120)
         prompt = (
             "Predict a playful 5-year future snapshot for this user.\n"
             "Must include these headings:\n"
@@ -4967,7 +8639,8 @@ async def ai_command(ctx: commands.Context, *, prompt: str | None = None) -> Non
         await ctx.send(f"Usage: `{PREFIX}ai <prompt>` or `{PREFIX}aisummary 25`")
         return
 
-    history = AI_CHAT_CACHE.get(ctx.channel.id, [])[-(AI_MAX_HISTORY * 2) :]
+    memory = AI_CHAT_CACHE.get(ctx.channel.id)
+    history = memory.messages() if memory is not None else []
     messages = [{"role": "system", "content": AI_SYSTEM_PROMPT}, *history]
     messages.append({"role": "user", "content": prompt})
 
@@ -4998,20 +8671,16 @@ async def aisummary_command(ctx: commands.Context, count: int = 25) -> None:
         await ctx.send("`count` must be between `5` and `100`.")
         return
 
-    transcript: list[str] = []
-    async for msg in ctx.channel.history(limit=count):
-        if msg.author.bot:
-            continue
-        content = msg.clean_content.strip()
-        if not content:
-            continue
-        transcript.append(f"{msg.author.display_name}: {content[:280]}")
-
+    transcript = await collect_recent_channel_transcript(
+        ctx.channel,
+        count,
+        exclude_message_ids={ctx.message.id},
+        max_chars=280,
+    )
     if not transcript:
         await ctx.send("Not enough recent user messages to summarize.")
         return
 
-    transcript.reverse()
     summary_prompt = (
         "Summarize this Discord chat in short bullet points.\n"
         "Include: key topics, decisions, and any action items.\n\n"
@@ -5362,6 +9031,9 @@ async def on_command_error(ctx: commands.Context, error: Exception) -> None:
     if isinstance(error, commands.MissingPermissions):
         await ctx.send("You do not have permission to use this command.")
         return
+    if isinstance(error, commands.NotOwner):
+        await ctx.send("Only the bot owner can use this command.")
+        return
     if isinstance(error, commands.NoPrivateMessage):
         await ctx.send("This command can only be used inside a server channel.")
         return
@@ -5390,6 +9062,10 @@ def main() -> None:
         raise RuntimeError("DISCORD_BOT_TOKEN is missing. Put it in your .env file.")
     ensure_data_files()
     reload_bad_words()
+    # Loaded before connecting so an early `remind` can never save over (or reuse ids from) the file.
+    loaded = load_reminders()
+    if loaded:
+        print(f"Reminders: {loaded} pending reminder(s) loaded.")
     bot.run(TOKEN)
 
 